@@ -0,0 +1,240 @@
+import threading
+import logging
+import json
+import glob
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics.archive import ARCHIVE_EXTENSION, ARCHIVE_FOLDER, RunArchive, list_archives
+from analytics.checkpoint import CHECKPOINT_FILENAME
+from utils.utilities import RUNS_FOLDER, records_generation
+from utils.config import configure
+
+configure()
+
+# Stance of each LLM choice on a -1 (against) to +1 (in favour) scale
+STANCE_SCORES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+STANCES = list(STANCE_SCORES)
+
+COLUMNS = [
+    "platform", "video_id", "channel", "channel_id", "published_at",
+    "views", "likes", "comments", "subscribers", "tags",
+    "political_perspective", "choice", "stored_at",
+]
+METRIC_COLUMNS = ["views", "likes", "comments", "subscribers"]
+
+def _run_folders(runs_folder: str) -> List[str]:
+    if not os.path.isdir(runs_folder):
+        return []
+    return sorted(path for path in (os.path.join(runs_folder, name) for name in os.listdir(runs_folder)) if os.path.isdir(path))
+
+def _run_signature(run_folder: str) -> float:
+    """
+    Changes whenever a video of the run completes a stage: the run's checkpoint is
+    rewritten after each one (the folder's mtime for runs without a checkpoint).
+    """
+    checkpoint_path = os.path.join(run_folder, CHECKPOINT_FILENAME)
+    return os.path.getmtime(checkpoint_path if os.path.exists(checkpoint_path) else run_folder)
+
+def _parse_choice(llm_analysis: Any) -> Optional[str]:
+    try:
+        choice = json.loads(llm_analysis).get("choice")
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return choice if choice in STANCE_SCORES else None
+
+def _record_rows(path: str) -> List[Dict[str, Any]]:
+    """One row per perspective the stored video was analysed against."""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            item = json.load(file)
+    except Exception as e:
+        logging.error(f"Error loading {path} for aggregation: {e}")
+        return []
+    return _item_rows(item, os.path.getmtime(path))
+
+def _run_rows(run_folder: str) -> List[Dict[str, Any]]:
+    """Rows of the videos of a run folder (<run>/<platform>Data/<video_id>.json)."""
+    paths = glob.glob(os.path.join(run_folder, "*Data", "*.json"))
+    return [row for path in paths for row in _record_rows(path)]
+
+def _archive_rows(archive_path: str) -> List[Dict[str, Any]]:
+    """Rows of the videos of a run archive, stored when they were last written in the run folder."""
+    try:
+        with RunArchive(archive_path) as archive:
+            return [
+                row
+                for entry, item in zip(archive.videos().values(), archive.items())
+                for row in _item_rows(item, entry.get("stored_at") or 0.0)
+            ]
+    except Exception as e:
+        logging.error(f"Error loading archive {archive_path} for aggregation: {e}")
+        return []
+
+def _item_rows(item: Dict[str, Any], stored_at: float) -> List[Dict[str, Any]]:
+    base = {
+        "platform": item.get("platform"),
+        "video_id": item.get("video_id"),
+        "channel": item.get("channel"),
+        "channel_id": item.get("channel_id"),
+        "published_at": item.get("published_at"),
+        "views": item.get("views"),
+        "likes": item.get("likes"),
+        "comments": item.get("comments"),
+        "subscribers": item.get("subscribers"),
+        "tags": item.get("tags") or [],
+        "stored_at": stored_at,
+    }
+    analyses = {item.get("political_perspective"): item.get("llm_analysis")}
+    for perspective, entry in (item.get("perspective_analyses") or {}).items():
+        analyses[perspective] = entry.get("llm_analysis")
+
+    return [
+        dict(base, political_perspective=perspective, choice=_parse_choice(llm_analysis))
+        for perspective, llm_analysis in analyses.items()
+    ]
+
+def build_analysis_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build one typed row per analysed video and perspective from stored records.
+    A video analysed in several runs for the same perspective keeps its latest analysis.
+    """
+    frame = pd.DataFrame(rows, columns=COLUMNS)
+
+    frame["published_at"] = pd.to_datetime(frame["published_at"], utc=True, errors="coerce")
+    for column in METRIC_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    frame["stance_score"] = frame["choice"].map(STANCE_SCORES)
+
+    frame = frame.sort_values("stored_at").drop_duplicates(
+        subset=["platform", "video_id", "political_perspective"], keep="last"
+    )
+    return frame.reset_index(drop=True)
+
+class AnalysisAggregator:
+    """
+    Vectorized summaries over every stored analysis: the run folders and the archives
+    of the pruned runs (see analytics.archive).
+
+    The rows of each run and archive are cached, and the record frame and all computed
+    summaries until the store changes: a run is added, archived or pruned, a run's
+    checkpoint moves on, or this process rewrites stored records. Checking costs a
+    listing of both folders and one stat per run, not a read of every record.
+    """
+
+    def __init__(self, runs_folder: str = RUNS_FOLDER, archive_folder: str = ARCHIVE_FOLDER):
+        self.runs_folder = runs_folder
+        self.archive_folder = archive_folder
+        self._signature: Optional[Tuple] = None
+        # Source (run folder or archive path) -> (its signature, its rows)
+        self._sources: Dict[str, Tuple[Any, List[Dict[str, Any]]]] = {}
+        self._frame: Optional[pd.DataFrame] = None
+        self._results: Dict[Tuple, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def _store_signature(self) -> Tuple:
+        runs = {run_folder: _run_signature(run_folder) for run_folder in _run_folders(self.runs_folder)}
+        archives = {path: os.path.getmtime(path) for path in list_archives(self.archive_folder)}
+        return records_generation(), runs, archives
+
+    def frame(self) -> pd.DataFrame:
+        """Return the record frame, reloading only the runs and archives that changed."""
+        signature = self._store_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._reload(signature)
+            return self._frame
+
+    def _reload(self, signature: Tuple):
+        generation, runs, archives = signature
+        sources = {}
+        for run_folder, run_signature in runs.items():
+            # A rewrite by this process may touch any run, an archive never changes
+            sources[run_folder] = self._source(run_folder, (generation, run_signature), _run_rows)
+        run_ids = {os.path.basename(run_folder) for run_folder in runs}
+        for path, mtime in archives.items():
+            # A restored run is read from its folder
+            if os.path.basename(path)[:-len(ARCHIVE_EXTENSION)] not in run_ids:
+                sources[path] = self._source(path, mtime, _archive_rows)
+
+        rows = [row for _, source_rows in sources.values() for row in source_rows]
+        logging.info(f"Rebuilding aggregation frame from {len(runs)} runs and {len(sources) - len(runs)} archives")
+        self._sources = sources
+        self._frame = build_analysis_frame(rows)
+        self._signature = signature
+        self._results = {}
+
+    def _source(self, path: str, signature: Any, load) -> Tuple[Any, List[Dict[str, Any]]]:
+        cached = self._sources.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached
+        return signature, load(path)
+
+    def perspectives(self) -> List[str]:
+        return sorted(self.frame()["political_perspective"].dropna().unique().tolist())
+
+    def stance_over_time(self, freq: str = "W", perspective: Optional[str] = None) -> pd.DataFrame:
+        """Count of each stance per publication period (pandas offset alias, e.g. "D", "W", "M")."""
+        return self._cached(("stance_over_time", freq, perspective), lambda frame: (
+            frame.dropna(subset=["published_at"])
+            .assign(period=lambda f: f["published_at"].dt.tz_localize(None).dt.to_period(freq).dt.start_time)
+            .pivot_table(index="period", columns="choice", values="video_id", aggfunc="count", fill_value=0)
+            .reindex(columns=STANCES, fill_value=0)
+        ), perspective)
+
+    def stance_by_channel(self, perspective: Optional[str] = None, top: int = 20) -> pd.DataFrame:
+        """Stance counts for the channels with the most analysed videos."""
+        return self._cached(("stance_by_channel", perspective, top), lambda frame: self._stance_by(frame, "channel", top), perspective)
+
+    def stance_by_tag(self, perspective: Optional[str] = None, top: int = 20) -> pd.DataFrame:
+        """Stance counts for the most frequent tags (a video counts once for each of its tags)."""
+        return self._cached(("stance_by_tag", perspective, top), lambda frame: self._stance_by(
+            frame.explode("tags").rename(columns={"tags": "tag"}).dropna(subset=["tag"]), "tag", top
+        ), perspective)
+
+    def engagement_weighted_sentiment(self, by: str = "channel", perspective: Optional[str] = None) -> pd.DataFrame:
+        """
+        Mean stance score per group weighted by engagement (views + likes + comments),
+        so widely seen videos count for more than unseen ones.
+        """
+        return self._cached(("engagement_weighted_sentiment", by, perspective), lambda frame: self._weighted(frame, by), perspective)
+
+    def _cached(self, key: Tuple, compute, perspective: Optional[str]) -> pd.DataFrame:
+        frame = self.frame()
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+        if perspective is not None:
+            frame = frame[frame["political_perspective"] == perspective]
+        frame = frame.dropna(subset=["choice"])
+        result = compute(frame) if not frame.empty else pd.DataFrame()
+        with self._lock:
+            self._results[key] = result
+        return result
+
+    @staticmethod
+    def _stance_by(frame: pd.DataFrame, column: str, top: int) -> pd.DataFrame:
+        counts = pd.crosstab(frame[column], frame["choice"]).reindex(columns=STANCES, fill_value=0)
+        counts["total"] = counts.sum(axis=1)
+        return counts.sort_values("total", ascending=False).head(top)
+
+    @staticmethod
+    def _weighted(frame: pd.DataFrame, by: str) -> pd.DataFrame:
+        engagement = frame[["views", "likes", "comments"]].fillna(0).to_numpy(dtype=np.float64).sum(axis=1)
+        # Videos without any engagement data still count, with the minimum weight
+        weights = np.maximum(engagement, 1.0)
+        weighted = pd.DataFrame({
+            by: frame[by].to_numpy(),
+            "weighted_score": frame["stance_score"].to_numpy(dtype=np.float64) * weights,
+            "weight": weights,
+        })
+        grouped = weighted.groupby(by).agg(
+            weighted_score=("weighted_score", "sum"),
+            engagement=("weight", "sum"),
+            videos=("weight", "size"),
+        )
+        grouped["weighted_sentiment"] = grouped["weighted_score"] / grouped["engagement"]
+        return grouped.drop(columns="weighted_score").sort_values("engagement", ascending=False)
@@ -1,18 +1,22 @@
-from utils.auth import get_openai_client
 import os
 import time
 import logging
-from typing import Dict, List, Any
+import json
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+from analytics.budget import completion_cost
+from analytics.profiling import run_thread_pool
+from utils.config import configure
 
-# LOGGING
-logging.basicConfig(
-    filename="app.log",  # Log file name
-    level=logging.INFO,  # Log level (INFO or higher)
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+configure()
 
-def send_to_chatgpt(prompt: str, client, model: str = "gpt-4o") -> str:
+# Input tokens allowed per request; longer transcripts are analysed in windows and merged
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 12000))
+# Windows of one transcript analysed concurrently
+PROMPT_MAP_WORKERS = int(os.getenv('PROMPT_MAP_WORKERS', 4))
+
+def send_to_chatgpt(prompt: str, client, model: str = "gpt-4o", max_tokens: int = 800, governor=None) -> str:
     """
     Send a prompt to ChatGPT and get a response.
     
@@ -20,10 +24,20 @@ def send_to_chatgpt(prompt: str, client, model: str = "gpt-4o") -> str:
         prompt: The text prompt to send to ChatGPT
         api_key: OpenAI API key
         model: The model to use (default: gpt-4o)
+        max_tokens: Maximum number of tokens in the response
+        governor: Optional BudgetGovernor charged with the cost of the request
         
     Returns:
         The response from ChatGPT
+
+    Raises:
+        BudgetExceeded: If the governor refuses the request
+        Exception: The error of the OpenAI API, once the reservation is released
     """
+    reserved = None
+    if governor:
+        prompt_tokens = count_tokens(prompt, model)
+        reserved = governor.reserve("analysis", completion_cost(prompt_tokens, max_tokens))
     
     try:
         chat_completion = client.chat.completions.create(
@@ -33,18 +47,28 @@ def send_to_chatgpt(prompt: str, client, model: str = "gpt-4o") -> str:
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3,  
-            max_tokens=800
+            max_tokens=max_tokens
         )
         
         # Extract and return the response text
         logging.info(f"Request to OpenAI API complete")
+        if governor:
+            usage = getattr(chat_completion, "usage", None)
+            used_prompt = getattr(usage, "prompt_tokens", None) or prompt_tokens
+            used_completion = getattr(usage, "completion_tokens", None) or max_tokens
+            governor.record(
+                "analysis", reserved, completion_cost(used_prompt, used_completion),
+                prompt_tokens=used_prompt, completion_tokens=used_completion
+            )
         return chat_completion
         
     except Exception as e:
-        logging.info(f"Error from OpenAI API: {str(e)}")
-        return f"Error from OpenAI API: {str(e)}"
+        if governor:
+            governor.release(reserved)
+        logging.error(f"Error from OpenAI API: {str(e)}")
+        raise
         
-def generate_chatgpt_question(post, political_perspective):
+def generate_chatgpt_question(post, political_perspective, chunks_text: Optional[str] = None):
     """
     Generate a question to analyze whether video content is positive or negative
     toward the specified political party, including references to specific chunks.
@@ -52,23 +76,13 @@ def generate_chatgpt_question(post, political_perspective):
     Args:
         post: Dictionary containing video information including transcription chunks
         political_choice: String indicating political leaning ("Left" or "Right")
+        chunks_text: Formatted chunks to include instead of the whole transcription
     
     Returns:
         String containing the formatted question with all transcription chunks
     """
-    # Get all transcription chunks
-    chunks = post.get('transcription', [])
-    chunks_text = ""
-    
-    # Format each chunk with its number and transcription
-    for chunk in chunks:
-        chunk_num = chunk.get('segment_number', 0)
-        transcription = chunk.get('transcription', 'No transcription available')
-        # start_time = round(chunk.get('start_time', 0), 2)
-        # end_time = round(chunk.get('end_time', 0), 2)
-        
-        # chunks_text += f"Chunk {chunk_num} ({start_time}s - {end_time}s): {transcription}\n\n"
-        chunks_text += f"Chunk {chunk_num}: {transcription}\n\n"
+    if chunks_text is None:
+        chunks_text = format_chunks_text(post)
     
     # Format the complete question
     question = f"""
@@ -86,6 +100,196 @@ Content chunks:
 
 {chunks_text}
 """
-    print(question)
+    return question
+
+def format_chunk_lines(post) -> List[str]:
+    """Format each transcription chunk of a post as a "Chunk <number>: <text>" paragraph."""
+    return [
+        f"Chunk {chunk.get('segment_number', 0)}: {chunk.get('transcription', 'No transcription available')}\n\n"
+        for chunk in post.get('transcription', [])
+    ]
+
+def format_chunks_text(post) -> str:
+    return "".join(format_chunk_lines(post))
+
+def generate_multi_perspective_question(post, perspectives: List[str], chunks_text: Optional[str] = None) -> str:
+    """
+    Generate a single question evaluating the content against several perspectives,
+    so the transcript is sent once per video instead of once per perspective.
+    
+    Args:
+        post: Dictionary containing video information including transcription chunks
+        perspectives: List of perspectives to evaluate
+        chunks_text: Formatted chunks to include instead of the whole transcription
+    
+    Returns:
+        String containing the formatted question with all transcription chunks
+    """
+    if chunks_text is None:
+        chunks_text = format_chunks_text(post)
+    perspectives_text = "\n".join(f"{number}. {perspective}" for number, perspective in enumerate(perspectives, start=1))
+
+    return f"""
+For each of the numbered perspectives below, please determine whether this content is positive or negative for that perspective.
+Negative content is content that opposes the perspective.
+Positive content is content that supports the perspective.
+For each perspective, which chunks were most helpful in determining whether it was positive or negative?
+Please answer in JSON format with a single field "perspectives": a list with one object per perspective, in the same order, each including:
+- "perspective" (the perspective number)
+- "choice" ("positive" or "negative" or "neutral")
+- "main" (list of the most important chunk numbers that support your decision)
+- "analysis" (string containing an explanation of your reasoning)
+
+perspectives:
+{perspectives_text}
+
+Content chunks:
+
+{chunks_text}
+"""
+
+def parse_multi_perspective_response(response_content: str, perspectives: List[str]) -> Dict[str, str]:
+    """
+    Split a multi-perspective answer into one JSON analysis string per perspective,
+    in the same format as a single-perspective answer (choice, main, analysis).
+    """
+    entries = json.loads(clean_response(response_content)).get("perspectives", [])
+
+    analyses = {}
+    for position, entry in enumerate(entries):
+        number = entry.get("perspective", position + 1)
+        try:
+            perspective = perspectives[int(number) - 1]
+        except (TypeError, ValueError, IndexError):
+            continue
+        analyses[perspective] = json.dumps({
+            "choice": entry.get("choice"),
+            "main": entry.get("main", []),
+            "analysis": entry.get("analysis", ""),
+        }, ensure_ascii=False)
+    return analyses
+
+def clean_response(response_content: str) -> str:
+    return response_content.strip().strip("```json").strip("```").strip()
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """tiktoken encoding of the model, or None when tiktoken (or its encoding files) is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logging.info(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Number of tokens in a text, estimated at four characters per token without tiktoken."""
+    encoding = _get_encoding(model or "gpt-4o")
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def split_chunk_windows(lines: List[str], budget: int, model: Optional[str] = None) -> List[List[str]]:
+    """
+    Split formatted chunks into consecutive windows of at most `budget` tokens.
+    Each chunk is tokenized once; a chunk larger than the budget gets a window of its own.
+    """
+    windows, current, used = [], [], 0
+    for line in lines:
+        tokens = count_tokens(line, model)
+        if current and used + tokens > budget:
+            windows.append(current)
+            current, used = [], 0
+        current.append(line)
+        used += tokens
+    if current or not windows:
+        windows.append(current)
+    return windows
+
+def merge_window_analyses(analyses: List[str]) -> str:
+    """
+    Merge the analyses of several windows of one transcript: the majority choice
+    (neutral on a tie), the chunks supporting it and the reasoning of each window.
+    """
+    parsed = []
+    for llm_analysis in analyses:
+        try:
+            parsed.append(json.loads(llm_analysis))
+        except (TypeError, ValueError):
+            continue
+    if not parsed:
+        raise ValueError("No window analysis could be parsed")
+
+    ranked = Counter(entry.get("choice") for entry in parsed).most_common()
+    choice = ranked[0][0] if len(ranked) == 1 or ranked[0][1] > ranked[1][1] else "neutral"
+    main = []
+    for entry in parsed:
+        if entry.get("choice") == choice:
+            main.extend(number for number in entry.get("main") or [] if number not in main)
+
+    return json.dumps({
+        "choice": choice,
+        "main": main,
+        "analysis": "\n".join(str(entry.get("analysis", "")) for entry in parsed),
+    }, ensure_ascii=False)
+
+def request_analysis(post, perspectives: List[str], client, model: str, budget: int = PROMPT_TOKEN_BUDGET, governor=None) -> Dict[str, str]:
+    """
+    Analyse a post against one or more perspectives within an input token budget.
+
+    A transcript that fits is sent in a single request. A longer one is split into
+    chunk windows that are analysed in parallel and merged per perspective. Chunks
+    keep their original numbers, so "main" always refers to real segments.
+    
+    Args:
+        post: Dictionary containing video information including transcription chunks
+        perspectives: Perspectives to evaluate; several are evaluated in one structured request
+        client: OpenAI client instance
+        model: The model to use
+        budget: Maximum number of input tokens per request
+        governor: Optional BudgetGovernor; near its limits, the budget shrinks and
+            only the beginning of a long transcript is analysed
     
-    return question
\ No newline at end of file
+    Returns:
+        Dictionary mapping each perspective to its JSON analysis (choice, main, analysis)
+
+    Raises:
+        Exception: The error of any request, so a partly analysed video is retried as a whole
+    """
+    single = len(perspectives) == 1
+    max_tokens = 800 if single else 400 * len(perspectives)
+
+    def build(chunks_text: str) -> str:
+        if single:
+            return generate_chatgpt_question(post, perspectives[0], chunks_text)
+        return generate_multi_perspective_question(post, perspectives, chunks_text)
+
+    if governor:
+        budget = governor.prompt_budget(budget)
+    windows = split_chunk_windows(format_chunk_lines(post), budget - count_tokens(build(""), model), model)
+    if governor and len(windows) > 1 and governor.under_pressure():
+        logging.info(f"Budget pressure: analysing the first of {len(windows)} chunk windows of video {post.get('video_id')}")
+        windows = windows[:1]
+
+    def analyse_window(window: List[str]) -> Dict[str, str]:
+        response = send_to_chatgpt(build("".join(window)), client, model, max_tokens, governor)
+        content = response.choices[0].message.content
+        return {perspectives[0]: clean_response(content)} if single else parse_multi_perspective_response(content, perspectives)
+
+    if len(windows) == 1:
+        return analyse_window(windows[0])
+
+    logging.info(f"Prompt over {budget} tokens, analysing {len(windows)} chunk windows for video {post.get('video_id')}")
+    with run_thread_pool(min(PROMPT_MAP_WORKERS, len(windows)), thread_name_prefix="prompt_map") as executor:
+        results = list(executor.map(analyse_window, windows))
+
+    return {
+        perspective: merge_window_analyses([result[perspective] for result in results if perspective in result])
+        for perspective in perspectives
+        if any(perspective in result for result in results)
+    }
\ No newline at end of file
@@ -0,0 +1,290 @@
+import datetime
+import logging
+import struct
+import mmap
+import json
+import time
+import zlib
+import uuid
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.utilities import RUNS_FOLDER, RUN_RETENTION_HOURS, build_segment_index, ensure_folder_exists, mark_records_changed
+from utils.config import configure
+
+configure()
+
+ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ARCHIVE_FOLDER = os.getenv('ARCHIVE_FOLDER', './data/archive')
+ARCHIVE_COMPRESSION_LEVEL = int(os.getenv('ARCHIVE_COMPRESSION_LEVEL', 10))
+
+ARCHIVE_EXTENSION = ".runarc"
+MAGIC = b"RUNARC1\n"
+# Header: MAGIC, then the codec name of every block padded to 8 bytes
+_CODEC_BYTES = 8
+# Trailer: offset and length of the index block, then the magic again
+_TRAILER = struct.Struct("<QQ")
+# Run-level files kept next to the videos
+RUN_FILES = ("checkpoint.json", "dedup_report.json", "usage.json")
+# Fields rebuilt on load (segment_index) or only useful while debugging a run (chatgpt_question)
+DROPPED_FIELDS = ("segment_index", "chatgpt_question")
+
+def _codec() -> str:
+    """zstd when the zstandard package is installed, zlib otherwise."""
+    try:
+        import zstandard  # noqa: F401
+        return "zstd"
+    except ImportError:
+        return "zlib"
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=ARCHIVE_COMPRESSION_LEVEL).compress(data)
+    return zlib.compress(data, min(9, ARCHIVE_COMPRESSION_LEVEL))
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def archive_path_of(run_folder: str, archive_folder: str = ARCHIVE_FOLDER) -> str:
+    return os.path.join(archive_folder, os.path.basename(os.path.normpath(run_folder)) + ARCHIVE_EXTENSION)
+
+def _video_files(run_folder: str) -> List[Tuple[str, str]]:
+    """(data folder, file name) of every video JSON file of a run."""
+    files = []
+    for folder in sorted(os.listdir(run_folder)):
+        data_folder = os.path.join(run_folder, folder)
+        if folder.endswith("Data") and os.path.isdir(data_folder):
+            files.extend((folder, filename) for filename in sorted(os.listdir(data_folder)) if filename.endswith(".json"))
+    return files
+
+def _run_files(run_folder: str) -> List[str]:
+    return [name for name in RUN_FILES if os.path.exists(os.path.join(run_folder, name))]
+
+def archive_run(run_folder: str, archive_folder: str = ARCHIVE_FOLDER) -> str:
+    """
+    Write a run folder's videos and run files into one archive file.
+
+    The archive is a sequence of independently compressed blocks, one per video
+    (compact JSON without the fields in DROPPED_FIELDS) and one per run file, followed
+    by a compressed index of their offsets, so one video is read by decompressing its
+    block only. Audio files and quarantined videos are not archived, and a video file
+    that cannot be read is left out (see verify_archive).
+
+    Args:
+        run_folder: Folder of the run (<RUNS_FOLDER>/<run id>)
+        archive_folder: Folder of the archives
+
+    Returns:
+        Path of the archive (<archive_folder>/<run id>.runarc)
+    """
+    codec = _codec()
+    path = archive_path_of(run_folder, archive_folder)
+    ensure_folder_exists(archive_folder)
+    index: Dict[str, Any] = {
+        "run_id": os.path.basename(os.path.normpath(run_folder)),
+        "codec": codec,
+        "archived_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "files": {},
+        "videos": {},
+    }
+
+    # Unique, so two processes archiving the same run never write into each other's file
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(MAGIC + codec.encode().ljust(_CODEC_BYTES, b"\0"))
+
+            def write_block(value: Any) -> Dict[str, int]:
+                raw = _encode(value)
+                block = _compress(raw, codec)
+                offset = file.tell()
+                file.write(block)
+                return {"offset": offset, "length": len(block), "size": len(raw)}
+
+            for name in _run_files(run_folder):
+                with open(os.path.join(run_folder, name), "r", encoding="utf-8") as run_file:
+                    index["files"][name] = dict(write_block(json.load(run_file)), stored_at=os.path.getmtime(run_file.name))
+
+            for folder, filename in _video_files(run_folder):
+                path_in_run = os.path.join(run_folder, folder, filename)
+                try:
+                    with open(path_in_run, "r", encoding="utf-8") as video_file:
+                        item = json.load(video_file)
+                except (OSError, ValueError) as e:
+                    logging.error(f"Could not archive {path_in_run}: {e}")
+                    continue
+                for field in DROPPED_FIELDS:
+                    item.pop(field, None)
+                key = f"{item.get('platform', folder[:-len('Data')])}:{item.get('video_id', filename[:-len('.json')])}"
+                index["videos"][key] = dict(
+                    write_block(item), folder=folder, file=filename, stored_at=os.path.getmtime(path_in_run),
+                    title=item.get("title"), published_at=item.get("published_at")
+                )
+
+            index_block = _compress(_encode(index), codec)
+            index_offset = file.tell()
+            file.write(index_block)
+            file.write(_TRAILER.pack(index_offset, len(index_block)))
+            file.write(MAGIC)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    logging.info(f"Archived run {run_folder} to {path}: {len(index['videos'])} videos, {os.path.getsize(path)} bytes")
+    return path
+
+class RunArchive:
+    """
+    Read-only view of a run archive through a memory map: opening it reads only the
+    index, and each video is decompressed from its own block when it is loaded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            trailer_start = len(self._map) - _TRAILER.size - len(MAGIC)
+            if self._map[:len(MAGIC)] != MAGIC or self._map[trailer_start + _TRAILER.size:] != MAGIC:
+                raise ValueError(f"{path} is not a complete run archive")
+            self.codec: str = self._map[len(MAGIC):len(MAGIC) + _CODEC_BYTES].rstrip(b"\0").decode()
+            index_offset, index_length = _TRAILER.unpack(self._map[trailer_start:trailer_start + _TRAILER.size])
+            self.index = self._read({"offset": index_offset, "length": index_length})
+        except Exception:
+            self.close()
+            raise
+        self.run_id: str = self.index["run_id"]
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self, entry: Dict[str, int]) -> Any:
+        return json.loads(_decompress(self._map[entry["offset"]:entry["offset"] + entry["length"]], self.codec))
+
+    def videos(self) -> Dict[str, Dict[str, Any]]:
+        """Index entries of the archived videos by "<platform>:<video_id>" (title and date included)."""
+        return self.index["videos"]
+
+    def load_video(self, platform: str, video_id: str) -> Optional[Dict[str, Any]]:
+        """One archived video, with its segment index rebuilt, or None if it is not in the archive."""
+        entry = self.index["videos"].get(f"{platform}:{video_id}")
+        if entry is None:
+            return None
+        item = self._read(entry)
+        if item.get("transcription"):
+            item["segment_index"] = build_segment_index(item["transcription"])
+        return item
+
+    def items(self, folder: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Every archived video, or those of one data folder (e.g. "youtubeData")."""
+        for key, entry in self.index["videos"].items():
+            if folder is None or entry["folder"] == folder:
+                platform, video_id = key.split(":", 1)
+                yield self.load_video(platform, video_id)
+
+    def load_file(self, name: str) -> Optional[Any]:
+        """An archived run file (see RUN_FILES), or None."""
+        entry = self.index["files"].get(name)
+        return self._read(entry) if entry else None
+
+def list_archives(archive_folder: str = ARCHIVE_FOLDER) -> List[str]:
+    """Paths of the run archives, newest run first."""
+    if not os.path.isdir(archive_folder):
+        return []
+    names = [name for name in os.listdir(archive_folder) if name.endswith(ARCHIVE_EXTENSION)]
+    return [os.path.join(archive_folder, name) for name in sorted(names, reverse=True)]
+
+def restore_run(archive_path: str, runs_folder: str = RUNS_FOLDER) -> str:
+    """
+    Unpack an archive into a run folder, e.g. to analyse it again or resume it.
+
+    Returns:
+        Path of the restored run folder
+    """
+    with RunArchive(archive_path) as archive:
+        run_folder = os.path.join(runs_folder, archive.run_id)
+        for name in archive.index["files"]:
+            ensure_folder_exists(run_folder)
+            with open(os.path.join(run_folder, name), "w", encoding="utf-8") as file:
+                json.dump(archive.load_file(name), file, indent=4)
+        for key, entry in archive.videos().items():
+            data_folder = os.path.join(run_folder, entry["folder"])
+            ensure_folder_exists(data_folder)
+            platform, video_id = key.split(":", 1)
+            with open(os.path.join(data_folder, entry.get("file", f"{video_id}.json")), "w", encoding="utf-8") as file:
+                json.dump(archive.load_video(platform, video_id), file, indent=4, ensure_ascii=False)
+    mark_records_changed()
+    logging.info(f"Restored archive {archive_path} to {run_folder}")
+    return run_folder
+
+def verify_archive(archive_path: str, run_folder: str) -> bool:
+    """
+    Whether an archive holds the current version of every video file and run file of
+    a run folder, with every block readable, so the folder can be deleted without
+    losing data. A run changed after it was archived (e.g. restored and resumed) fails.
+    """
+    expected_videos = {
+        (folder, filename): os.path.getmtime(os.path.join(run_folder, folder, filename))
+        for folder, filename in _video_files(run_folder)
+    }
+    expected_files = {name: os.path.getmtime(os.path.join(run_folder, name)) for name in _run_files(run_folder)}
+    try:
+        with RunArchive(archive_path) as archive:
+            archived_videos = {(entry["folder"], entry.get("file")): entry.get("stored_at") for entry in archive.videos().values()}
+            archived_files = {name: entry.get("stored_at") for name, entry in archive.index["files"].items()}
+            if archived_videos != expected_videos or archived_files != expected_files:
+                logging.info(f"Archive {archive_path} does not match run folder {run_folder}")
+                return False
+            for entry in list(archive.videos().values()) + list(archive.index["files"].values()):
+                archive._read(entry)
+    except Exception as e:
+        logging.error(f"Archive {archive_path} of run {run_folder} is unreadable: {e}")
+        return False
+    return True
+
+def archive_expired_runs(runs_folder: str = RUNS_FOLDER, max_age_hours: float = RUN_RETENTION_HOURS,
+                         archive_folder: str = ARCHIVE_FOLDER) -> List[str]:
+    """
+    Archive the run folders that prune_run_folders is about to delete, unless their
+    archive is already up to date.
+
+    Returns:
+        The expired run folders whose archive (written now or earlier) is verified, i.e. those
+        that may be pruned. A run whose archiving fails is left out, so its folder is kept
+        and archiving is retried on the next run.
+    """
+    if not os.path.exists(runs_folder):
+        return []
+    cutoff = time.time() - max_age_hours * 3600
+    archived = []
+    for name in sorted(os.listdir(runs_folder)):
+        run_folder = os.path.join(runs_folder, name)
+        if not os.path.isdir(run_folder) or os.path.getmtime(run_folder) >= cutoff:
+            continue
+        path = archive_path_of(run_folder, archive_folder)
+        if not (os.path.exists(path) and verify_archive(path, run_folder)):
+            try:
+                archive_run(run_folder, archive_folder)
+            except Exception as e:
+                logging.error(f"Archiving of run {run_folder} failed: {e}")
+                continue
+            if not verify_archive(path, run_folder):
+                continue
+        archived.append(run_folder)
+    return archived
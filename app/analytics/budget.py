@@ -0,0 +1,359 @@
+import contextlib
+import threading
+import datetime
+import hashlib
+import logging
+import sqlite3
+import json
+import time
+import os
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from utils.config import configure
+
+configure()
+
+# Spending limits in USD (0: no limit): per run, and per API key and UTC day
+BUDGET_RUN_LIMIT_USD = float(os.getenv('BUDGET_RUN_LIMIT_USD', 0))
+BUDGET_KEY_DAILY_LIMIT_USD = float(os.getenv('BUDGET_KEY_DAILY_LIMIT_USD', 0))
+# hard: calls that would exceed a limit are refused; soft: they are logged and allowed
+BUDGET_MODE = os.getenv('BUDGET_MODE', 'hard').lower()
+# Share of a limit past which prompts are shortened
+BUDGET_PRESSURE_THRESHOLD = float(os.getenv('BUDGET_PRESSURE_THRESHOLD', 0.8))
+# Prompt token budget used at full pressure (see analytics.analysis.request_analysis)
+BUDGET_MIN_PROMPT_TOKENS = int(os.getenv('BUDGET_MIN_PROMPT_TOKENS', 3000))
+
+# Prices in USD
+TRANSCRIPTION_PRICE_PER_MINUTE = float(os.getenv('TRANSCRIPTION_PRICE_PER_MINUTE', 0.006))
+LLM_INPUT_PRICE_PER_1K = float(os.getenv('LLM_INPUT_PRICE_PER_1K', 0.0025))
+LLM_OUTPUT_PRICE_PER_1K = float(os.getenv('LLM_OUTPUT_PRICE_PER_1K', 0.01))
+
+KEY_USAGE_PATH = os.getenv('KEY_USAGE_PATH', './data/usage/api_keys.db')
+# JSON ledger written before the SQLite one, imported on first use
+LEGACY_KEY_USAGE_PATH = './data/usage/api_keys.json'
+# Age past which a reservation is dropped: its process died before recording the call
+BUDGET_RESERVATION_TTL_SECONDS = float(os.getenv('BUDGET_RESERVATION_TTL_SECONDS', 900))
+USAGE_FILENAME = "usage.json"
+
+# Bit rate of the mp3 files written by the download manager, used to estimate their duration
+AUDIO_BITRATE = 192000
+
+class BudgetExceeded(Exception):
+    """A call was refused because it would exceed a spending limit."""
+
+def transcription_cost(audio_seconds: float) -> float:
+    return audio_seconds / 60 * TRANSCRIPTION_PRICE_PER_MINUTE
+
+def completion_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return prompt_tokens / 1000 * LLM_INPUT_PRICE_PER_1K + completion_tokens / 1000 * LLM_OUTPUT_PRICE_PER_1K
+
+def estimate_audio_seconds(audio_path: str) -> float:
+    """Duration of an mp3 file from its size, before it is sent for transcription."""
+    return os.path.getsize(audio_path) * 8 / AUDIO_BITRATE
+
+def _empty_usage() -> Dict[str, Any]:
+    return {"cost": 0.0, "calls": 0, "audio_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+
+def _add_usage(totals: Dict[str, Any], cost: float, usage: Dict[str, Any]):
+    totals["cost"] += cost
+    totals["calls"] += 1
+    for field, value in usage.items():
+        totals[field] = totals.get(field, 0) + (value or 0)
+
+def _write_json(path: str, data: Any):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=4)
+    os.replace(tmp_path, path)
+
+_LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    key_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    cost REAL NOT NULL DEFAULT 0,
+    calls INTEGER NOT NULL DEFAULT 0,
+    audio_seconds REAL NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (key_id, day, stage)
+);
+CREATE TABLE IF NOT EXISTS reservations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    cost REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_by_key ON reservations (key_id, day);
+"""
+
+class KeyLedger:
+    """
+    Spending per API key and UTC day, in a SQLite database (KEY_USAGE_PATH) shared by
+    every run of every process. Each reservation and each recorded call is one write
+    transaction taken before its check, so concurrent processes never both spend the
+    last of a limit nor overwrite each other's totals. Keys are stored as a short hash,
+    never in clear.
+    """
+
+    def __init__(self, path: str = KEY_USAGE_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        # Transactions are opened explicitly (see _transaction)
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_LEDGER_SCHEMA)
+        if path == KEY_USAGE_PATH and os.path.exists(LEGACY_KEY_USAGE_PATH):
+            self._import_legacy(LEGACY_KEY_USAGE_PATH)
+
+    def _import_legacy(self, legacy_path: str):
+        """Import the daily totals of a JSON ledger, under the stage "imported"."""
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as file:
+                usage = json.load(file)
+        except Exception as e:
+            logging.error(f"Could not import API key usage from {legacy_path}: {e}")
+            return
+        for key_id, days in usage.items():
+            for day, totals in days.items():
+                self._add(key_id, day, "imported", totals.get("cost", 0.0), totals, calls=totals.get("calls", 0))
+        os.replace(legacy_path, legacy_path + ".imported")
+        logging.info(f"Imported API key usage from {legacy_path}")
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Write transaction, locking the database before anything is read."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    @staticmethod
+    def key_id(api_key: Optional[str]) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else "unknown"
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+    @staticmethod
+    def _spent(connection: sqlite3.Connection, key_id: str, day: str) -> float:
+        return connection.execute("SELECT COALESCE(SUM(cost), 0) FROM usage WHERE key_id = ? AND day = ?", (key_id, day)).fetchone()[0]
+
+    @staticmethod
+    def _reserved(connection: sqlite3.Connection, key_id: str, day: str) -> float:
+        return connection.execute(
+            "SELECT COALESCE(SUM(cost), 0) FROM reservations WHERE key_id = ? AND day = ? AND created_at >= ?",
+            (key_id, day, time.time() - BUDGET_RESERVATION_TTL_SECONDS)
+        ).fetchone()[0]
+
+    def spent_today(self, key_id: str) -> float:
+        """Cost of the calls recorded today."""
+        with self._lock:
+            return self._spent(self._connection, key_id, self._today())
+
+    def committed_today(self, key_id: str) -> float:
+        """Cost of the calls recorded today and of those reserved, by every process."""
+        day = self._today()
+        with self._lock:
+            return self._spent(self._connection, key_id, day) + self._reserved(self._connection, key_id, day)
+
+    def reserve(self, key_id: str, cost: float, limit: float = 0.0, enforce: bool = True) -> Tuple[Optional[int], bool]:
+        """
+        Reserve the estimated cost of a call against today's spending of a key.
+
+        Args:
+            key_id: Hash of the API key (see key_id)
+            cost: Estimated cost of the call
+            limit: Daily limit of the key (0: no limit)
+            enforce: Refuse a reservation that would exceed the limit
+
+        Returns:
+            (id of the reservation, or None if it was refused; whether it exceeds the limit)
+        """
+        day = self._today()
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM reservations WHERE created_at < ?", (time.time() - BUDGET_RESERVATION_TTL_SECONDS,))
+            over = bool(limit) and self._spent(connection, key_id, day) + self._reserved(connection, key_id, day) + cost > limit
+            if over and enforce:
+                return None, True
+            cursor = connection.execute(
+                "INSERT INTO reservations (key_id, day, cost, created_at) VALUES (?, ?, ?, ?)", (key_id, day, cost, time.time())
+            )
+            return cursor.lastrowid, over
+
+    def release(self, reservation_id: Optional[int]):
+        """Drop a reservation whose call failed."""
+        if reservation_id is None:
+            return
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+
+    def add(self, key_id: str, stage: str, cost: float, usage: Dict[str, Any], reservation_id: Optional[int] = None):
+        """Record the actual cost and usage of a call, in place of its reservation."""
+        self._add(key_id, self._today(), stage, cost, usage, calls=1, reservation_id=reservation_id)
+
+    def _add(self, key_id: str, day: str, stage: str, cost: float, usage: Dict[str, Any], calls: int, reservation_id: Optional[int] = None):
+        with self._transaction() as connection:
+            if reservation_id is not None:
+                connection.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+            connection.execute(
+                """
+                INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key_id, day, stage) DO UPDATE SET
+                    cost = cost + excluded.cost,
+                    calls = calls + excluded.calls,
+                    audio_seconds = audio_seconds + excluded.audio_seconds,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens
+                """,
+                (key_id, day, stage, cost, calls, usage.get("audio_seconds") or 0.0,
+                 usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0)
+            )
+
+_LEDGER: Optional[KeyLedger] = None
+_LEDGER_LOCK = threading.Lock()
+
+def get_key_ledger() -> KeyLedger:
+    global _LEDGER
+    with _LEDGER_LOCK:
+        if _LEDGER is None:
+            _LEDGER = KeyLedger()
+        return _LEDGER
+
+class Reservation(NamedTuple):
+    """Estimated cost of a call reserved by BudgetGovernor.reserve, and its reservation in the key ledger."""
+    estimate: float
+    ledger_id: Optional[int] = None
+
+class BudgetGovernor:
+    """
+    Cost governor of one run. Every paid call (remote transcription, LLM request) is
+    estimated and reserved before it is made, then recorded at its actual cost, in running
+    totals per run (persisted in <run_folder>/usage.json) and per API key and day.
+
+    A call that would exceed a limit raises BudgetExceeded in hard mode, so the video is
+    quarantined and a resume with more budget retries it; in soft mode it is only logged.
+    As spending approaches a limit, the governor shortens prompts; since the collectors
+    process videos by priority (see analytics.scheduling), a limit cuts off the least engaging.
+    """
+
+    def __init__(
+        self,
+        run_folder: Optional[str] = None,
+        api_key: Optional[str] = None,
+        run_limit: float = BUDGET_RUN_LIMIT_USD,
+        key_limit: float = BUDGET_KEY_DAILY_LIMIT_USD,
+        mode: str = BUDGET_MODE,
+        ledger: Optional[KeyLedger] = None
+    ):
+        self.path = os.path.join(run_folder, USAGE_FILENAME) if run_folder else None
+        self.key_id = KeyLedger.key_id(api_key)
+        self.run_limit = run_limit
+        self.key_limit = key_limit
+        self.hard = mode != "soft"
+        self.ledger = ledger or get_key_ledger()
+        self._lock = threading.Lock()
+        # Reserved in this run; the key's reservations, by every run, are kept in the ledger
+        self._reserved = 0.0
+        self._usage: Dict[str, Any] = {"total": _empty_usage(), "stages": {}, "exceeded": 0}
+        # A resumed run keeps counting from its earlier usage
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self._usage = json.load(file)
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.run_limit or self.key_limit)
+
+    @property
+    def spent(self) -> float:
+        with self._lock:
+            return self._usage["total"]["cost"]
+
+    def pressure(self) -> float:
+        """Share of the tightest limit already spent or reserved (0 without limits)."""
+        with self._lock:
+            committed = self._usage["total"]["cost"] + self._reserved
+        key_committed = self.ledger.committed_today(self.key_id) if self.key_limit else 0.0
+        ratios = []
+        if self.run_limit:
+            ratios.append(committed / self.run_limit)
+        if self.key_limit:
+            ratios.append(key_committed / self.key_limit)
+        return max(ratios, default=0.0)
+
+    def check(self):
+        """Refuse new work once a hard limit is reached, e.g. before downloading a video."""
+        if self.hard and self.limited and self.pressure() >= 1.0:
+            raise BudgetExceeded(f"Budget exhausted ({self.spent:.4f} USD spent in this run)")
+
+    def reserve(self, stage: str, estimate: float) -> Reservation:
+        """
+        Reserve the estimated cost of a call before it is made.
+
+        Raises:
+            BudgetExceeded: In hard mode, if the call would exceed a limit
+        """
+        with self._lock:
+            over_run = bool(self.run_limit) and self._usage["total"]["cost"] + self._reserved + estimate > self.run_limit
+            ledger_id, over_key = None, False
+            if not (over_run and self.hard):
+                ledger_id, over_key = self.ledger.reserve(self.key_id, estimate, self.key_limit, enforce=self.hard)
+            if over_run or over_key:
+                self._usage["exceeded"] += 1
+                limit = "run" if over_run else "API key daily"
+                message = f"{stage} call of ~{estimate:.4f} USD would exceed the {limit} limit"
+                if self.hard:
+                    raise BudgetExceeded(message)
+                logging.warning(f"Soft budget: {message}")
+            self._reserved += estimate
+        return Reservation(estimate, ledger_id)
+
+    def release(self, reserved: Reservation):
+        """Give back a reservation whose call failed."""
+        with self._lock:
+            self._reserved -= reserved.estimate
+        self.ledger.release(reserved.ledger_id)
+
+    def record(self, stage: str, reserved: Reservation, cost: float, **usage):
+        """Replace a reservation by the actual cost and usage of the call."""
+        with self._lock:
+            self._reserved -= reserved.estimate
+            _add_usage(self._usage["total"], cost, usage)
+            _add_usage(self._usage["stages"].setdefault(stage, _empty_usage()), cost, usage)
+        self.ledger.add(self.key_id, stage, cost, usage, reservation_id=reserved.ledger_id)
+
+    def prompt_budget(self, budget: int) -> int:
+        """Prompt token budget under the current pressure: shrinks linearly past the threshold."""
+        pressure = self.pressure()
+        if pressure <= BUDGET_PRESSURE_THRESHOLD:
+            return budget
+        share = min(1.0, (pressure - BUDGET_PRESSURE_THRESHOLD) / max(1e-9, 1.0 - BUDGET_PRESSURE_THRESHOLD))
+        return max(BUDGET_MIN_PROMPT_TOKENS, int(budget - share * (budget - BUDGET_MIN_PROMPT_TOKENS)))
+
+    def under_pressure(self) -> bool:
+        return self.pressure() > BUDGET_PRESSURE_THRESHOLD
+
+    def report(self) -> Dict[str, Any]:
+        """Usage of the run so far, with its limits."""
+        with self._lock:
+            report = json.loads(json.dumps(self._usage))
+        report["limits"] = {"run": self.run_limit, "key_daily": self.key_limit, "mode": "hard" if self.hard else "soft"}
+        return report
+
+    def save(self):
+        """Persist the run's usage (the API key totals are committed call by call)."""
+        report = self.report()
+        if self.path:
+            _write_json(self.path, report)
@@ -0,0 +1,109 @@
+import threading
+import logging
+import json
+import time
+import os
+from typing import Any, Dict, Iterable, Optional
+from utils.config import configure
+
+configure()
+
+CHANNEL_CACHE_PATH = os.getenv('CHANNEL_CACHE_PATH', './data/channel_cache.json')
+# Age after which cached channel statistics are fetched again (seconds)
+CHANNEL_CACHE_TTL = float(os.getenv('CHANNEL_CACHE_TTL', 6 * 3600))
+
+class ChannelCache:
+    """
+    Persistent cache of channel statistics (subscribers, total videos) by platform and
+    channel id, shared by every run of the process. The YouTube collector resolves the
+    channels of a search from it before any video-level request, and TikTok feeds
+    refresh it with the author statistics they carry. Channels the platform no longer
+    returns (deleted, terminated) are recorded as unresolvable, so they are not requested
+    again for each of their videos. Entries expire after ttl seconds.
+    """
+
+    def __init__(self, path: str = CHANNEL_CACHE_PATH, ttl: float = CHANNEL_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._channels: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    self._channels = json.load(file)
+            except (OSError, ValueError) as e:
+                logging.error(f"Could not load channel cache {path}: {e}")
+
+    @staticmethod
+    def _key(platform: str, channel_id: str) -> str:
+        return f"{platform}:{channel_id}"
+
+    def get(self, platform: str, channel_id: str) -> Optional[Dict[str, Any]]:
+        """Statistics of a channel ({"subscribers", "total_videos"}), or None if unknown or expired."""
+        entry = self._entry(platform, channel_id)
+        if entry is None or entry.get("unresolvable"):
+            return None
+        return {"subscribers": entry["subscribers"], "total_videos": entry["total_videos"]}
+
+    def unresolvable(self, platform: str, channel_id: str) -> bool:
+        """Whether the platform recently returned nothing for this channel."""
+        entry = self._entry(platform, channel_id)
+        return bool(entry and entry.get("unresolvable"))
+
+    def _entry(self, platform: str, channel_id: str) -> Optional[Dict[str, Any]]:
+        """Unexpired entry of a channel."""
+        with self._lock:
+            entry = self._channels.get(self._key(platform, channel_id))
+        if entry is None or time.time() - entry["fetched_at"] > self.ttl:
+            return None
+        return entry
+
+    def get_many(self, platform: str, channel_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Statistics of the cached, unexpired channels among channel_ids."""
+        found = {}
+        for channel_id in channel_ids:
+            statistics = self.get(platform, channel_id)
+            if statistics is not None:
+                found[channel_id] = statistics
+        return found
+
+    def put(self, platform: str, channel_id: str, subscribers: Optional[int], total_videos: Optional[int]):
+        if not channel_id:
+            return
+        with self._lock:
+            self._channels[self._key(platform, channel_id)] = {
+                "subscribers": subscribers, "total_videos": total_videos, "fetched_at": time.time()
+            }
+
+    def put_unresolvable(self, platform: str, channel_id: str):
+        """Record a channel the platform did not return, until the entry expires."""
+        if not channel_id:
+            return
+        with self._lock:
+            self._channels[self._key(platform, channel_id)] = {
+                "subscribers": None, "total_videos": None, "fetched_at": time.time(), "unresolvable": True
+            }
+
+    def save(self):
+        """Persist the cache, dropping expired entries."""
+        with self._lock:
+            now = time.time()
+            self._channels = {key: entry for key, entry in self._channels.items() if now - entry["fetched_at"] <= self.ttl}
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._channels, file)
+            os.replace(tmp_path, self.path)
+
+_CACHE: Optional[ChannelCache] = None
+_CACHE_LOCK = threading.Lock()
+
+def get_channel_cache() -> ChannelCache:
+    """Process-wide channel cache, loaded on first use."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ChannelCache()
+        return _CACHE
@@ -0,0 +1,129 @@
+import threading
+import logging
+import shutil
+import json
+import os
+from typing import Any, Dict, List, Optional
+from utils.config import configure
+
+configure()
+
+# Per-video stages of a fetch run, in order
+STAGES = ("searched", "enriched", "downloaded", "transcribed", "analysed")
+
+CHECKPOINT_FILENAME = "checkpoint.json"
+QUARANTINE_FOLDER = "quarantine"
+
+class RunCheckpoint:
+    """
+    Progress of a fetch run, persisted in <run_folder>/checkpoint.json after every change:
+    the run's query and, per video, the stages it has completed.
+
+    A video that fails is quarantined: its JSON file moves from the data folder to
+    <run_folder>/quarantine/ and its error is recorded, so the rest of the batch goes on.
+
+    Listeners (e.g. analytics.progress.FetchProgress) are told of every completed
+    stage and failure as it is recorded.
+    """
+
+    def __init__(self, run_folder: str):
+        self.run_folder = run_folder
+        self.path = os.path.join(run_folder, CHECKPOINT_FILENAME)
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {"query": None, "searched": [], "videos": {}}
+        self._listeners: List[Any] = []
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self._state = json.load(file)
+
+    @property
+    def query(self) -> Optional[Dict[str, Any]]:
+        return self._state["query"]
+
+    def set_query(self, query: Dict[str, Any]):
+        with self._lock:
+            self._state["query"] = query
+            self._save()
+
+    def searched(self, platform: str) -> bool:
+        """True once the platform's search has finished and its results are saved."""
+        with self._lock:
+            searched = self._state["searched"]
+            # Runs checkpointed before multi-platform fetches stored a single flag
+            return searched is True or platform in (searched or [])
+
+    def mark_searched(self, platform: str):
+        with self._lock:
+            if self._state["searched"] is True:
+                return
+            self._state["searched"] = list(self._state["searched"] or []) + [platform]
+            self._save()
+
+    def done(self, video_id: str, stage: str) -> bool:
+        with self._lock:
+            return stage in self._state["videos"].get(video_id, {}).get("stages", [])
+
+    def mark(self, video_id: str, stage: str):
+        with self._lock:
+            video = self._state["videos"].setdefault(video_id, {"stages": [], "error": None})
+            if stage not in video["stages"]:
+                video["stages"].append(stage)
+            self._save()
+        for listener in self._listeners:
+            listener.on_stage(video_id, stage)
+
+    def subscribe(self, listener):
+        """
+        Tell a listener of the stages already completed (a resumed run), then of every
+        new stage and failure. The listener has on_stage(video_id, stage) and
+        on_failure(video_id, error) methods.
+        """
+        with self._lock:
+            completed = [(video_id, stage) for video_id, video in self._state["videos"].items() for stage in video["stages"]]
+            self._listeners.append(listener)
+        for video_id, stage in completed:
+            listener.on_stage(video_id, stage)
+
+    def next_stage(self, video_id: str) -> Optional[str]:
+        """First stage the video has not completed yet."""
+        return next((stage for stage in STAGES if not self.done(video_id, stage)), None)
+
+    def quarantine(self, video_id: str, data_folder: str, error: BaseException, stage: Optional[str] = None):
+        """
+        Record the failure of a video and move its JSON file out of the data folder.
+        The failed stage defaults to the first one the video has not completed.
+        """
+        stage = stage or self.next_stage(video_id)
+        logging.error(f"Quarantining video {video_id}, {stage} failed: {error}")
+        source = os.path.join(data_folder, f"{video_id}.json")
+        if os.path.exists(source):
+            quarantine_folder = os.path.join(self.run_folder, QUARANTINE_FOLDER)
+            os.makedirs(quarantine_folder, exist_ok=True)
+            shutil.move(source, os.path.join(quarantine_folder, f"{video_id}.json"))
+        with self._lock:
+            video = self._state["videos"].setdefault(video_id, {"stages": [], "error": None})
+            video["error"] = {"stage": stage, "type": type(error).__name__, "message": str(error), "data_folder": data_folder}
+            self._save()
+        for listener in self._listeners:
+            listener.on_failure(video_id, dict(video["error"]))
+
+    def quarantined(self) -> Dict[str, Dict[str, Any]]:
+        """Errors of the quarantined videos, by video id."""
+        with self._lock:
+            return {video_id: dict(video["error"]) for video_id, video in self._state["videos"].items() if video.get("error")}
+
+    def release_quarantine(self):
+        """Move every quarantined video back to its data folder so a resume retries it."""
+        for video_id, error in self.quarantined().items():
+            source = os.path.join(self.run_folder, QUARANTINE_FOLDER, f"{video_id}.json")
+            if os.path.exists(source):
+                shutil.move(source, os.path.join(error["data_folder"], f"{video_id}.json"))
+            with self._lock:
+                self._state["videos"][video_id]["error"] = None
+                self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self._state, file, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -1,72 +1,380 @@
-import streamlit as st
+import logging
 import time
+import json
 import os
-from typing import List, Dict, Any, Optional
-from yt_dlp.utils import DownloadError
+from dataclasses import dataclass, asdict, field
+from typing import Callable, List, Dict, Any, Optional, Union
 
-from utils.utilities import load_json_data, update_json_files
-from analytics.analysis import generate_chatgpt_question, send_to_chatgpt
-from analytics.youtube import fetch_youtube_data
-from analytics.tiktok import fetch_tiktok_data
+from utils.utilities import (
+    load_json_data,
+    update_json_files,
+    get_llm_json_values,
+    is_debug_mode,
+    build_segment_index,
+    resolve_segment_offsets,
+    create_run_folder,
+    prune_run_folders,
+    data_folders,
+    run_folder_of,
+)
+from analytics.result_cache import ResultCache, make_query_key
+from analytics.checkpoint import RunCheckpoint
+from analytics.progress import FetchProgress
+from analytics.search_index import get_search_index, SEARCH_INDEX_ENABLED
+from analytics.dedup import DedupRun, get_dedup_index, video_key, DEDUP_ENABLED
+from analytics.transcription_backends import TranscriptionBackend, get_transcription_backend, TRANSCRIPTION_BACKEND
+from analytics.analysis import generate_chatgpt_question, request_analysis
+from analytics.budget import BudgetGovernor, KeyLedger
+from analytics.scheduling import PriorityScheduler
+from analytics.archive import archive_expired_runs, archive_path_of, restore_run, ARCHIVE_ENABLED, ARCHIVE_EXTENSION
+from analytics.profiling import RunProfiler, run_thread_pool
+
+# Shared by every session (and CLI job) in this process
+_RESULT_CACHE = ResultCache()
+
+# Data folder of each platform inside a run folder
+DATA_FOLDERS = {"TikTok": "tiktokData", "YouTube": "youtubeData"}
+
+# Pause between LLM requests to avoid rate limits (seconds)
+LLM_REQUEST_DELAY = float(os.getenv('LLM_REQUEST_DELAY', 1))
+# Videos analysed at the same time while the collectors go on transcribing
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', 2))
+
+def query_platforms(platform: Union[str, List[str], None]) -> List[str]:
+    """Platforms of a query: "YouTube", "TikTok,YouTube" or ["TikTok", "YouTube"], in a stable order."""
+    names = platform.split(",") if isinstance(platform, str) else (platform or [])
+    return sorted({name.strip() for name in names if name and name.strip()})
+
+@dataclass
+class FetchQuery:
+    """Parameters of one fetch, as entered in the input form or listed in a CLI jobs file."""
+    topic: str
+    platform: Union[str, List[str]]
+    political_perspective: str
+    specific_words: str = ""
+    min_likes: int = 0
+    min_followers: int = 0
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    transcription_backend: Optional[str] = None
+
+    def cache_key(self, client=None):
+        """Result cache key of the query run with a client's API key (see make_query_key)."""
+        return make_query_key(
+            self.topic, ",".join(query_platforms(self.platform)), self.start_date, self.end_date, self.min_likes, self.min_followers,
+            self.specific_words, self.political_perspective, self.transcription_backend or TRANSCRIPTION_BACKEND,
+            KeyLedger.key_id(getattr(client, "api_key", None))
+        )
+
+@dataclass
+class FetchResult:
+    """
+    Outcome of a fetch: the run's data folder, the fetched, analyzed items, the dedup report,
+    the errors of the videos quarantined during the run (by video id), the run's API usage
+    and, for a profiled run, its profile summary (see analytics.profiling).
+    """
+    data_folder: Optional[str]
+    items: List[Dict[str, Any]]
+    dedup_report: Optional[Dict[str, Any]] = None
+    quarantined: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    usage: Optional[Dict[str, Any]] = None
+    profile: Optional[Dict[str, Any]] = None
+
+def run_query(query: FetchQuery, client, profile: bool = False) -> FetchResult:
+    """Streamlit-free entry point: run a FetchQuery with the given OpenAI client."""
+    return fetch_social_media_data(client=client, profile=profile, **asdict(query))
 
 def fetch_social_media_data(
     topic: str,
     client,
-    platform: str,
+    platform: Union[str, List[str]],
     start_date: Optional[str],
     end_date: Optional[str],
     min_likes: int,
     min_followers: int,
     specific_words: str,
-    political_perspective: str
-) -> List[Dict[str, Any]]:
+    political_perspective: str,
+    transcription_backend: Optional[str] = None,
+    progress: Optional[FetchProgress] = None,
+    profile: bool = False
+) -> FetchResult:
     """
     Fetch social media data from selected platforms and add LLM analysis.
+    Does not depend on Streamlit, so it can run from the UI, the CLI or scripts.
+    Each video is analysed as soon as it is transcribed; pass a FetchProgress to
+    follow the stage counters and receive the videos as they complete.
     
     Args:
         topic: The topic to search for
         client: OpenAI client instance
-        platform: Platform to fetch from ("TikTok" or "YouTube")
+        platform: Platform to fetch from ("TikTok" or "YouTube"), or a list of them to fetch from several at once
         start_date: Start date for search (YouTube only)
         end_date: End date for search (YouTube only)
         min_likes: Minimum number of likes
         min_followers: Minimum number of followers
         specific_words: Specific keywords to search for
         political_perspective: Political perspective for analysis
+        transcription_backend: "openai", "local" or "hybrid" (default: TRANSCRIPTION_BACKEND)
+        progress: Optional live progress of the fetch; a cached result fills it at once
+        profile: Profile the run (never served from the result cache): the sampled stacks and
+            their summary are saved in the run folder and the summary returned in FetchResult.profile
     
     Returns:
-        List of dictionaries containing the fetched and analyzed data
+        FetchResult with the run's data folder (the run folder for several platforms)
+        and the list of fetched and analyzed items
     
     Raises:
         DownloadError: If there's an issue with downloading content
         Exception: For other errors during data fetching
     """
-    collected_data = []
-    
-    # Fetch data based on platform
-    if platform == "TikTok":
-        collected_data = _fetch_tiktok_data(topic, client, min_likes, min_followers, specific_words)
-    elif platform == "YouTube":
-        collected_data = _fetch_youtube_data(topic, client, start_date, end_date, min_likes, min_followers, specific_words)
-    
-    # Add LLM analysis to each item
-    _add_llm_analysis(collected_data, political_perspective, client)
-    
-    # Update JSON files with analysis
-    if collected_data and hasattr(st.session_state, 'data_folder'):
-        update_json_files(collected_data, st.session_state.data_folder)
-    
-    return collected_data
+    query = FetchQuery(
+        topic=topic,
+        platform=platform,
+        political_perspective=political_perspective,
+        specific_words=specific_words,
+        min_likes=min_likes,
+        min_followers=min_followers,
+        start_date=start_date,
+        end_date=end_date,
+        transcription_backend=transcription_backend
+    )
+
+    if profile:
+        return _run_fetch(query, client, progress=progress, profile=True)
+
+    # Identical queries from any session share one computation and its cached result.
+    # The owner's progress is always kept, so the sessions joining it can follow it.
+    shared_progress = progress or FetchProgress()
+    computed = []
+
+    def compute() -> FetchResult:
+        computed.append(True)
+        return _run_fetch(query, client, progress=shared_progress)
+
+    result = _RESULT_CACHE.get_or_compute(
+        query.cache_key(client), compute, context=shared_progress,
+        on_join=(lambda owner_progress: owner_progress.attach(progress)) if progress else None
+    )
+    if progress and not computed:
+        # A cached result, or one computed for another session
+        progress.complete(result.items)
+
+    # The cached list is shared between sessions, so each caller gets its own item dicts
+    return FetchResult(result.data_folder, [dict(item) for item in result.items], result.dedup_report, result.quarantined, result.usage)
+
+def resume_run(run_folder: str, client, progress: Optional[FetchProgress] = None, profile: bool = False) -> FetchResult:
+    """
+    Resume an interrupted or partly failed run in its own folder.
+    Quarantined videos are retried and every video only redoes the stages it has not completed.
+    A run that was pruned is first restored from its archive (see analytics.archive).
+
+    Args:
+        run_folder: Folder of the run to resume (<RUNS_FOLDER>/<run id>), or its archive (.runarc)
+        client: OpenAI client instance
+        progress: Optional live progress of the resumed run
+        profile: Profile the resumed run (see fetch_social_media_data)
+
+    Returns:
+        FetchResult of the whole run
+
+    Raises:
+        ValueError: If the folder has no checkpoint of a fetch run
+    """
+    if run_folder.endswith(ARCHIVE_EXTENSION):
+        run_folder = restore_run(run_folder)
+    elif not os.path.isdir(run_folder) and os.path.exists(archive_path_of(run_folder)):
+        run_folder = restore_run(archive_path_of(run_folder), os.path.dirname(os.path.normpath(run_folder)))
+    checkpoint = RunCheckpoint(run_folder)
+    if checkpoint.query is None:
+        raise ValueError(f"No fetch run checkpoint in {run_folder}")
+
+    query = FetchQuery(**checkpoint.query)
+    logging.info(f"Resuming run {run_folder}: {query}")
+    checkpoint.release_quarantine()
+    result = _run_fetch(query, client, checkpoint, progress, profile)
+    # Later identical queries get the completed run instead of an earlier partial one
+    _RESULT_CACHE.invalidate(query.cache_key(client))
+    return result
+
+def _run_fetch(
+    query: FetchQuery,
+    client,
+    checkpoint: Optional[RunCheckpoint] = None,
+    progress: Optional[FetchProgress] = None,
+    profile: bool = False
+) -> FetchResult:
+    """
+    Run the crawl and analysis in an isolated run folder, or continue the checkpointed run.
+    Re-uploads of known videos reuse their transcript and analysis (see analytics.dedup).
+
+    The collectors of the selected platforms run concurrently (TikTok is a browser
+    session, YouTube HTTP requests) and share the download manager, the transcription
+    backend and the pool analysing each video once it is transcribed. The result of a
+    multi-platform run is merged, cross-platform re-uploads collapsing onto their original.
+
+    With profile, the run is sampled by a RunProfiler whose output is saved in the run
+    folder, even when the run fails.
+    """
+    if progress:
+        progress.start()
+    if checkpoint is None:
+        # Expired runs are kept as compressed archives: only those whose archive is verified are deleted
+        if ARCHIVE_ENABLED:
+            prune_run_folders(only=archive_expired_runs())
+        else:
+            prune_run_folders()
+        checkpoint = RunCheckpoint(create_run_folder())
+        checkpoint.set_query(asdict(query))
+    if not profile:
+        return _collect_and_analyse(query, client, checkpoint, progress)
+
+    profiler = RunProfiler().start()
+    try:
+        result = _collect_and_analyse(query, client, checkpoint, progress)
+    finally:
+        profiler.stop()
+        summary = profiler.save(checkpoint.run_folder)
+    result.profile = summary
+    return result
+
+def _collect_and_analyse(
+    query: FetchQuery,
+    client,
+    checkpoint: RunCheckpoint,
+    progress: Optional[FetchProgress] = None
+) -> FetchResult:
+    """Crawl, transcribe and analyse the videos of a query into its checkpointed run folder."""
+    if progress:
+        checkpoint.subscribe(progress)
+    run_folder = checkpoint.run_folder
+    dedup = DedupRun(get_dedup_index()) if DEDUP_ENABLED else None
+    # Estimates, limits and records the cost of every paid call of the run (see analytics.budget)
+    governor = BudgetGovernor(run_folder, getattr(client, "api_key", None))
+    transcription_backend = get_transcription_backend(query.transcription_backend, client, governor)
+    folders = {
+        platform: os.path.join(run_folder, DATA_FOLDERS[platform])
+        for platform in query_platforms(query.platform) if platform in DATA_FOLDERS
+    }
+
+    analysis_pool = run_thread_pool(ANALYSIS_WORKERS, thread_name_prefix="analysis")
+
+    def collect(platform: str):
+        data_folder = folders[platform]
+
+        def analyse_video(video_id: str):
+            """Analyse a video as soon as it is transcribed, and publish it."""
+            analysis_pool.submit(
+                _analyse_transcribed_video,
+                video_id, data_folder, query.political_perspective, client, dedup, checkpoint, progress, governor
+            )
+
+        if platform == "TikTok":
+            _fetch_tiktok_data(
+                query.topic, client, query.min_likes, query.min_followers, query.specific_words,
+                run_folder, dedup, transcription_backend, checkpoint, analyse_video, governor
+            )
+        else:
+            _fetch_youtube_data(
+                query.topic, client, query.start_date, query.end_date, query.min_likes, query.min_followers,
+                query.specific_words, run_folder, dedup, transcription_backend, checkpoint, analyse_video, governor
+            )
+
+    try:
+        with run_thread_pool(max(1, len(folders)), thread_name_prefix="collector") as collectors:
+            futures = [collectors.submit(collect, platform) for platform in folders]
+        errors = [future.exception() for future in futures if future.exception()]
+    finally:
+        # The videos analysed during the crawl are saved before the results are loaded
+        analysis_pool.shutdown(wait=True)
+        governor.save()
+    if errors:
+        raise errors[0]
 
-def _fetch_tiktok_data(topic: str, client, min_likes: int, min_followers: int, specific_words: str) -> List[Dict[str, Any]]:
-    """Fetch data from TikTok."""
-    st.session_state.data_folder = "./data/tiktokData"
+    items_by_platform = {platform: load_json_data(data_folder) for platform, data_folder in folders.items()}
+
+    quarantined = checkpoint.quarantined()
+    if quarantined and not any(items_by_platform.values()) and all(error["type"] == "DownloadError" for error in quarantined.values()):
+        # Nothing could be downloaded at all: most likely expired cookies rather than bad videos
+        from yt_dlp.utils import DownloadError
+        raise DownloadError(f"Every download of run {run_folder} failed")
     
+    for platform, items in items_by_platform.items():
+        # Videos analysed during the crawl are skipped; the others (e.g. transcribed before a resume) are analysed now,
+        # highest priority first
+        _add_llm_analysis(PriorityScheduler().order(items), query.political_perspective, client, dedup, checkpoint, folders[platform], governor)
+        # Update JSON files with analysis
+        if items:
+            update_json_files(items, folders[platform])
+
+    collected_data = _merge_platform_results(items_by_platform)
+    if progress:
+        for item in collected_data:
+            if checkpoint.done(item.get("video_id", "unknown"), "analysed"):
+                progress.publish(item)
+
+    # Transcripts stay searchable after the run folder is pruned
+    all_items = [item for items in items_by_platform.values() for item in items]
+    if SEARCH_INDEX_ENABLED and all_items:
+        _index_for_search(all_items, run_folder)
+
+    dedup_report = None
+    if dedup:
+        dedup.index.save()
+        dedup_report = dedup.report()
+        with open(os.path.join(run_folder, "dedup_report.json"), 'w', encoding='utf-8') as file:
+            json.dump(dedup_report, file, indent=4)
+
+    # A single platform's result lives in its data folder, a multi-platform one in the run folder
+    data_folder = next(iter(folders.values())) if len(folders) == 1 else run_folder
+    governor.save()
+    return FetchResult(data_folder, collected_data, dedup_report, quarantined, governor.report())
+
+def _merge_platform_results(items_by_platform: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge the videos of every platform into one result set. A video found to be a
+    re-upload (see analytics.dedup) of a video of another platform in the same result is dropped.
+    """
+    if len(items_by_platform) < 2:
+        return next(iter(items_by_platform.values()), [])
+
+    merged = [item for items in items_by_platform.values() for item in items]
+    platforms = {video_key(item): item.get("platform") for item in merged}
+    return [
+        item for item in merged
+        if platforms.get(item.get("duplicate_of"), item.get("platform")) == item.get("platform")
+    ]
+
+def _index_for_search(items: List[Dict[str, Any]], run_folder: str) -> None:
+    """Add the run's videos to the full-text search index; a failure never fails the fetch."""
     try:
-        fetch_tiktok_data(topic, client, min_likes, min_followers, specific_words)
-        return load_json_data(st.session_state.data_folder)
-    except (DownloadError, Exception):
-        raise
+        get_search_index().index_items(items, run_folder)
+    except Exception as e:
+        logging.error(f"Search indexing of run {run_folder} failed: {e}")
+
+def _fetch_tiktok_data(
+    topic: str,
+    client,
+    min_likes: int,
+    min_followers: int,
+    specific_words: str,
+    run_folder: str,
+    dedup: Optional[DedupRun] = None,
+    transcription_backend: Optional[TranscriptionBackend] = None,
+    checkpoint: Optional[RunCheckpoint] = None,
+    on_video: Optional[Callable[[str], None]] = None,
+    governor: Optional[BudgetGovernor] = None
+) -> None:
+    """Fetch data from TikTok into the given run folder."""
+    data_folder = os.path.join(run_folder, "tiktokData")
+    audio_folder = os.path.join(run_folder, "audio")
+    
+    # Imported per fetch: TikTokApi loads Playwright, which only TikTok runs need
+    from analytics.tiktok import fetch_tiktok_data
+
+    fetch_tiktok_data(
+        topic, client, min_likes, min_followers, specific_words, data_folder, audio_folder,
+        dedup, transcription_backend, checkpoint, on_video, governor
+    )
 
 def _fetch_youtube_data(
     topic: str, 
@@ -75,18 +383,58 @@ def _fetch_youtube_data(
     end_date: Optional[str], 
     min_likes: int, 
     min_followers: int, 
-    specific_words: str
-) -> List[Dict[str, Any]]:
-    """Fetch data from YouTube."""
-    st.session_state.data_folder = "./data/youtubeData"
+    specific_words: str,
+    run_folder: str,
+    dedup: Optional[DedupRun] = None,
+    transcription_backend: Optional[TranscriptionBackend] = None,
+    checkpoint: Optional[RunCheckpoint] = None,
+    on_video: Optional[Callable[[str], None]] = None,
+    governor: Optional[BudgetGovernor] = None
+) -> None:
+    """Fetch data from YouTube into the given run folder."""
+    data_folder = os.path.join(run_folder, "youtubeData")
+    audio_folder = os.path.join(run_folder, "audio")
     
+    from analytics.youtube import fetch_youtube_data
+
+    fetch_youtube_data(
+        topic, client, start_date, end_date, min_likes, min_followers, specific_words,
+        data_folder, audio_folder, dedup, transcription_backend, checkpoint, on_video, governor
+    )
+
+def _analyse_transcribed_video(
+    video_id: str,
+    data_folder: str,
+    political_perspective: str,
+    client,
+    dedup: Optional[DedupRun],
+    checkpoint: RunCheckpoint,
+    progress: Optional[FetchProgress] = None,
+    governor: Optional[BudgetGovernor] = None
+) -> None:
+    """
+    Analyse one video right after its transcription, save it and publish it to the progress.
+    A failed analysis is only logged: the video is analysed again with the rest of the batch.
+    """
     try:
-        fetch_youtube_data(topic, client, start_date, end_date, min_likes, min_followers, specific_words)
-        return load_json_data(st.session_state.data_folder)
-    except (DownloadError, Exception):
-        raise
+        with open(os.path.join(data_folder, f"{video_id}.json"), 'r', encoding='utf-8') as file:
+            item = json.load(file)
+        _add_llm_analysis([item], political_perspective, client, dedup, checkpoint, data_folder, governor)
+    except Exception as e:
+        logging.error(f"Analysis of video {video_id} failed during the crawl: {e}")
+        return
+    if progress and checkpoint.done(video_id, "analysed"):
+        progress.publish(item)
 
-def _add_llm_analysis(data: List[Dict[str, Any]], political_perspective: str, client) -> None:
+def _add_llm_analysis(
+    data: List[Dict[str, Any]],
+    political_perspective: str,
+    client,
+    dedup: Optional[DedupRun] = None,
+    checkpoint: Optional[RunCheckpoint] = None,
+    data_folder: Optional[str] = None,
+    governor: Optional[BudgetGovernor] = None
+) -> None:
     """
     Add LLM analysis to each data item.
     
@@ -94,26 +442,125 @@ def _add_llm_analysis(data: List[Dict[str, Any]], political_perspective: str, cl
         data: List of data items to analyze
         political_perspective: Political perspective for analysis
         client: OpenAI client instance
+        dedup: Optional dedup run; duplicates reuse the stored analysis of their canonical video
+        checkpoint: Optional run checkpoint; analysed items are saved to data_folder and
+            recorded one by one, and items analysed before a resume are skipped
+        data_folder: Folder of the items' JSON files, used with the checkpoint
+        governor: Optional budget governor of the run, charged for each request
     """
     llm_model_id = os.getenv('LLM_MODEL_ID')
     
     for item in data:
-        # Generate question for ChatGPT
-        question = generate_chatgpt_question(item, political_perspective)
-        item["chatgpt_question"] = question
+        video_id = item.get("video_id", "unknown")
+        if checkpoint and checkpoint.done(video_id, "analysed"):
+            continue
+
+        item["political_perspective"] = political_perspective
+        # The prompt duplicates the transcript, so it is only persisted when debugging
+        if is_debug_mode():
+            item["chatgpt_question"] = generate_chatgpt_question(item, political_perspective)
         
+        # Re-uploads (and videos already analysed) reuse the stored analysis
+        if dedup and dedup.reuse_analysis(item, political_perspective):
+            item["important_chunks"] = _resolve_important_chunks(item)
         # Get LLM analysis if client is available
-        if client:
+        elif client:
             try:
-                response = send_to_chatgpt(question, client, llm_model_id)
-                response_content = response.choices[0].message.content
-                cleaned_response = response_content.strip("```json").strip("```").strip()
-                item["llm_analysis"] = cleaned_response
+                item["llm_analysis"] = request_analysis(item, [political_perspective], client, llm_model_id, governor=governor)[political_perspective]
+                item["important_chunks"] = _resolve_important_chunks(item)
+                if dedup:
+                    dedup.register_analysis(item, political_perspective)
                 
                 # Add delay to avoid rate limits
-                time.sleep(1)
+                time.sleep(LLM_REQUEST_DELAY)
                 
             except Exception as e:
                 item["llm_analysis"] = f"Error: {str(e)}"
+                # Not recorded as analysed, so resuming the run retries it
+                continue
         else:
-            item["llm_analysis"] = "ChatGPT analysis not enabled"
\ No newline at end of file
+            item["llm_analysis"] = "ChatGPT analysis not enabled"
+            continue
+
+        if checkpoint and data_folder:
+            update_json_files([item], data_folder)
+            checkpoint.mark(video_id, "analysed")
+
+def analyse_perspectives(data_folder: str, perspectives: List[str], client) -> List[Dict[str, Any]]:
+    """
+    Analyse an already-fetched dataset against several perspectives, without fetching again.
+
+    Each video's transcript is sent once, in a single request evaluating every perspective
+    that has no stored analysis yet. Results are stored per perspective under
+    item["perspective_analyses"][perspective] = {"llm_analysis", "important_chunks"}
+    and written back to the video JSON files.
+    
+    Args:
+        data_folder: Folder of the fetched video JSON files (or run folder of a multi-platform fetch)
+        perspectives: Perspectives to evaluate
+        client: OpenAI client instance
+    
+    Returns:
+        List of the updated video items
+    """
+    llm_model_id = os.getenv('LLM_MODEL_ID')
+    perspectives = list(dict.fromkeys(p.strip() for p in perspectives if p and p.strip()))
+    index = get_dedup_index() if DEDUP_ENABLED else None
+    items_by_folder = {folder: load_json_data(folder) for folder in data_folders(data_folder)}
+    # Charged to the run the dataset was fetched in
+    governor = BudgetGovernor(run_folder_of(data_folder), getattr(client, "api_key", None))
+
+    for item in (item for items in items_by_folder.values() for item in items):
+        analyses = item.setdefault("perspective_analyses", {})
+        canonical_key = item.get("duplicate_of") or video_key(item)
+
+        # The fetch-time analysis and analyses stored for this video (or its original) are reused
+        if item.get("political_perspective") and not str(item.get("llm_analysis", "Error")).startswith(("Error", "ChatGPT")):
+            analyses.setdefault(item["political_perspective"], _perspective_entry(item, item["llm_analysis"]))
+        for perspective in perspectives:
+            stored = index.get_analysis(canonical_key, perspective) if index and perspective not in analyses else None
+            if stored is not None:
+                analyses[perspective] = _perspective_entry(item, stored)
+
+        missing = [perspective for perspective in perspectives if perspective not in analyses]
+        if not missing or not client:
+            continue
+
+        try:
+            parsed = request_analysis(item, missing, client, llm_model_id, governor=governor)
+        except Exception as e:
+            logging.error(f"Multi-perspective analysis failed for {canonical_key}: {e}")
+            continue
+
+        for perspective, llm_analysis in parsed.items():
+            analyses[perspective] = _perspective_entry(item, llm_analysis)
+            if index:
+                index.set_analysis(canonical_key, perspective, llm_analysis)
+
+        # Add delay to avoid rate limits
+        time.sleep(LLM_REQUEST_DELAY)
+
+    for folder, items in items_by_folder.items():
+        if items:
+            update_json_files(items, folder)
+    if index:
+        index.save()
+    governor.save()
+    return _merge_platform_results(items_by_folder)
+
+def _perspective_entry(item: Dict[str, Any], llm_analysis: str) -> Dict[str, Any]:
+    return {"llm_analysis": llm_analysis, "important_chunks": _resolve_important_chunks(item, llm_analysis)}
+
+def _resolve_important_chunks(item: Dict[str, Any], llm_analysis: Optional[str] = None) -> List[int]:
+    """
+    Resolve the segment numbers highlighted by the LLM ("main") to offsets
+    in the item's transcription, so rendering is a direct lookup per chunk.
+    Uses the item's own analysis unless another one is given.
+    """
+    try:
+        _, main, _ = get_llm_json_values(llm_analysis if llm_analysis is not None else item.get("llm_analysis", ""))
+    except (ValueError, AttributeError):
+        return []
+
+    segment_index = item.get("segment_index") or build_segment_index(item.get("transcription", []))
+    return resolve_segment_offsets(segment_index, main)
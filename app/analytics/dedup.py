@@ -0,0 +1,364 @@
+from collections import defaultdict
+import subprocess
+import threading
+import hashlib
+import logging
+import sqlite3
+import random
+import shutil
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+from analytics.archive import RunArchive, archive_path_of
+from utils.utilities import run_folder_of
+from utils.config import configure
+
+configure()
+
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+DEDUP_INDEX_PATH = os.getenv('DEDUP_INDEX_PATH', './data/dedup_index.db')
+# JSON index written before the SQLite one, imported on first use
+LEGACY_DEDUP_INDEX_PATH = './data/dedup_index.json'
+AUDIO_MATCH_THRESHOLD = float(os.getenv('DEDUP_AUDIO_THRESHOLD', 0.9))  # share of matching fingerprint bits
+TRANSCRIPT_MATCH_THRESHOLD = float(os.getenv('DEDUP_TRANSCRIPT_THRESHOLD', 0.8))  # estimated Jaccard similarity
+
+# MinHash parameters: NUM_PERM hash functions split into LSH bands of BAND_ROWS rows
+NUM_PERM = 64
+BAND_ROWS = 4
+SHINGLE_WORDS = 5
+MIN_WORDS = 10  # shorter transcripts (music, silence) are never matched
+
+# Audio LSH: the top AUDIO_BAND_BITS bits of AUDIO_BANDS fingerprint frames, AUDIO_BAND_STRIDE apart.
+# At the match threshold (10% of bits differ) a frame's top 16 bits agree 18% of the time,
+# so a true re-upload shares at least one band in all but ~2e-6 of cases.
+AUDIO_BANDS = 64
+AUDIO_BAND_STRIDE = 2
+AUDIO_BAND_BITS = 16
+
+_PRIME = (1 << 61) - 1
+_random = random.Random(42)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+def audio_fingerprint(audio_path: str) -> Optional[List[int]]:
+    """
+    Chromaprint fingerprint of an audio file, computed with the `fpcalc` tool.
+    Returns None when fpcalc is not installed or fails.
+    """
+    fpcalc = shutil.which("fpcalc")
+    if not fpcalc or not audio_path or not os.path.exists(audio_path):
+        return None
+    try:
+        result = subprocess.run([fpcalc, "-raw", "-json", audio_path], capture_output=True, text=True, timeout=60)
+        return json.loads(result.stdout).get("fingerprint") or None
+    except Exception as e:
+        logging.info(f"Audio fingerprint failed for {audio_path}: {e}")
+        return None
+
+def fingerprint_similarity(first: List[int], second: List[int]) -> float:
+    """Share of identical bits over the aligned part of two chromaprint fingerprints."""
+    length = min(len(first), len(second))
+    if not length:
+        return 0.0
+    differing_bits = sum(bin((a ^ b) & 0xFFFFFFFF).count("1") for a, b in zip(first[:length], second[:length]))
+    return 1.0 - differing_bits / (32 * length)
+
+def transcript_text(transcription: List[Dict[str, Any]]) -> str:
+    return " ".join(chunk.get("transcription", "") for chunk in transcription)
+
+def transcript_minhash(text: str) -> Optional[List[int]]:
+    """MinHash signature over word shingles of a transcript, or None if it is too short to compare."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") for shingle in shingles]
+    return [min((a * value + b) % _PRIME for value in hashes) for a, b in _PERMUTATIONS]
+
+def minhash_similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+def _bands(signature: List[int]) -> List[str]:
+    return [
+        f"{start}:" + ",".join(map(str, signature[start:start + BAND_ROWS]))
+        for start in range(0, NUM_PERM, BAND_ROWS)
+    ]
+
+def _audio_bands(fingerprint: List[int]) -> List[str]:
+    """LSH bands of a chromaprint fingerprint, aligned from its start like fingerprint_similarity."""
+    positions = range(0, min(len(fingerprint), AUDIO_BANDS * AUDIO_BAND_STRIDE), AUDIO_BAND_STRIDE)
+    return [f"{position}:{(fingerprint[position] & 0xFFFFFFFF) >> (32 - AUDIO_BAND_BITS)}" for position in positions]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS canonicals (
+    key TEXT PRIMARY KEY,
+    platform TEXT,
+    video_id TEXT,
+    audio_seconds REAL,
+    fingerprint TEXT,
+    minhash TEXT,
+    -- JSON file of the video holding the transcript (read from the run's archive once the run is pruned)
+    transcript_path TEXT
+);
+CREATE TABLE IF NOT EXISTS transcript_bands (band TEXT, key TEXT, PRIMARY KEY (band, key)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS audio_bands (band TEXT, key TEXT, PRIMARY KEY (band, key)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS analyses (
+    key TEXT,
+    perspective TEXT,
+    llm_analysis TEXT,
+    PRIMARY KEY (key, perspective)
+);
+"""
+
+_CANONICAL_COLUMNS = ("key", "platform", "video_id", "audio_seconds", "fingerprint", "minhash", "transcript_path")
+
+def load_transcript(transcript_path: Optional[str], platform: Optional[str], video_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Transcript of a video from its JSON file, or from its run's archive once the run
+    folder is pruned. None if neither holds it any more.
+    """
+    if not transcript_path:
+        return None
+    try:
+        if os.path.exists(transcript_path):
+            with open(transcript_path, 'r', encoding='utf-8') as file:
+                return json.load(file).get("transcription")
+        archive_path = archive_path_of(run_folder_of(os.path.dirname(transcript_path)))
+        if os.path.exists(archive_path):
+            with RunArchive(archive_path) as archive:
+                return (archive.load_video(platform, video_id) or {}).get("transcription")
+    except Exception as e:
+        logging.error(f"Could not load the transcript of {platform}:{video_id} from {transcript_path}: {e}")
+    return None
+
+class DedupIndex:
+    """
+    Persistent index (SQLite) of canonical videos: their audio fingerprint, transcript
+    MinHash, the JSON file holding their transcript and their LLM analyses (one per
+    perspective). Audio and transcript candidates are found through LSH bands, so a
+    lookup reads a few rows instead of every canonical, and every change is a small
+    transaction instead of a rewrite of the whole index.
+    """
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        if path == DEDUP_INDEX_PATH and os.path.exists(LEGACY_DEDUP_INDEX_PATH):
+            self._import_legacy(LEGACY_DEDUP_INDEX_PATH)
+
+    def _import_legacy(self, legacy_path: str):
+        """Import the canonicals and analyses of a JSON index; their transcripts are not kept."""
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+        except Exception as e:
+            logging.error(f"Could not import dedup index {legacy_path}: {e}")
+            return
+        for entry in entries:
+            self.add_canonical(entry["key"], dict(entry, transcript_path=None))
+            for perspective, llm_analysis in (entry.get("analyses") or {}).items():
+                self.set_analysis(entry["key"], perspective, llm_analysis)
+        os.replace(legacy_path, legacy_path + ".imported")
+        logging.info(f"Imported {len(entries)} canonicals from {legacy_path}")
+
+    def save(self):
+        """Every change is committed as it is made; kept for the callers that save after a run."""
+        with self._lock:
+            self._connection.commit()
+
+    def add_canonical(self, key: str, entry: Dict[str, Any]):
+        """Register a canonical video; re-registering a known video keeps the analyses it already has."""
+        fingerprint, minhash = entry.get("fingerprint"), entry.get("minhash")
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM transcript_bands WHERE key = ?", (key,))
+            self._connection.execute("DELETE FROM audio_bands WHERE key = ?", (key,))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO canonicals VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.get("platform"), entry.get("video_id"), entry.get("audio_seconds"),
+                 json.dumps(fingerprint) if fingerprint else None, json.dumps(minhash) if minhash else None,
+                 entry.get("transcript_path"))
+            )
+            if minhash:
+                self._connection.executemany("INSERT OR IGNORE INTO transcript_bands VALUES (?, ?)", [(band, key) for band in _bands(minhash)])
+            if fingerprint:
+                self._connection.executemany("INSERT OR IGNORE INTO audio_bands VALUES (?, ?)", [(band, key) for band in _audio_bands(fingerprint)])
+
+    def _entries(self, where: str, params: List[Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {', '.join(_CANONICAL_COLUMNS)} FROM canonicals WHERE {where}", params).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(zip(_CANONICAL_COLUMNS, row))
+            entry["fingerprint"] = json.loads(entry["fingerprint"]) if entry["fingerprint"] else None
+            entry["minhash"] = json.loads(entry["minhash"]) if entry["minhash"] else None
+            entries.append(entry)
+        return entries
+
+    def _candidates(self, table: str, bands: List[str]) -> List[Dict[str, Any]]:
+        if not bands:
+            return []
+        placeholders = ", ".join("?" * len(bands))
+        return self._entries(f"key IN (SELECT key FROM {table} WHERE band IN ({placeholders}))", bands)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entries = self._entries("key = ?", [key])
+        return entries[0] if entries else None
+
+    def transcript(self, entry: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Transcript of a canonical, read through its reference (see load_transcript)."""
+        return load_transcript(entry.get("transcript_path"), entry.get("platform"), entry.get("video_id"))
+
+    def match_audio(self, fingerprint: Optional[List[int]]) -> Optional[Dict[str, Any]]:
+        if not fingerprint:
+            return None
+        candidates = self._candidates("audio_bands", _audio_bands(fingerprint))
+        best = max(candidates, key=lambda entry: fingerprint_similarity(fingerprint, entry["fingerprint"]), default=None)
+        if best and fingerprint_similarity(fingerprint, best["fingerprint"]) >= AUDIO_MATCH_THRESHOLD:
+            return best
+        return None
+
+    def match_transcript(self, signature: Optional[List[int]]) -> Optional[Dict[str, Any]]:
+        if not signature:
+            return None
+        candidates = self._candidates("transcript_bands", _bands(signature))
+        best = max(candidates, key=lambda entry: minhash_similarity(signature, entry["minhash"]), default=None)
+        if best and minhash_similarity(signature, best["minhash"]) >= TRANSCRIPT_MATCH_THRESHOLD:
+            return best
+        return None
+
+    def get_analysis(self, key: str, perspective: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT llm_analysis FROM analyses WHERE key = ? AND perspective = ?", (key, perspective)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_analysis(self, key: str, perspective: str, llm_analysis: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO analyses SELECT key, ?, ? FROM canonicals WHERE key = ?", (perspective, llm_analysis, key)
+            )
+
+    def canonical_count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM canonicals").fetchone()[0]
+
+def video_key(video_data: Dict[str, Any]) -> str:
+    return f"{video_data.get('platform', 'unknown')}:{video_data.get('video_id', 'unknown')}"
+
+class DedupRun:
+    """
+    Deduplication for one fetch run: links re-uploads to their canonical video,
+    copies its transcript/analysis over and tallies the cost saved.
+    """
+
+    def __init__(self, index: DedupIndex):
+        self.index = index
+        self._lock = threading.Lock()
+        self.clusters: Dict[str, List[str]] = defaultdict(list)
+        self.transcriptions_saved = 0
+        self.audio_seconds_saved = 0.0
+        self.llm_calls_saved = 0
+
+    def reuse_transcription(self, video_data: Dict[str, Any], fingerprint: Optional[List[int]]) -> bool:
+        """
+        Copy a known transcript into video_data: the video's own from an earlier run, or
+        the canonical's when the audio matches a known video. Returns True if transcription can be skipped.
+        """
+        key = video_key(video_data)
+        # The video itself seen in an earlier run, or a re-upload with matching audio
+        canonical = self.index.get(key) or self.index.match_audio(fingerprint)
+        transcription = self.index.transcript(canonical) if canonical else None
+        if transcription is None:
+            return False
+
+        video_data["transcription"] = transcription
+        video_data["audio_seconds"] = canonical.get("audio_seconds")
+        with self._lock:
+            if canonical["key"] != key:
+                video_data["duplicate_of"] = canonical["key"]
+                self.clusters[canonical["key"]].append(key)
+            self.transcriptions_saved += 1
+            self.audio_seconds_saved += canonical.get("audio_seconds") or 0.0
+        logging.info(f"Reusing transcription of {canonical['key']} for {key}, transcription skipped")
+        return True
+
+    def register_transcription(self, video_data: Dict[str, Any], fingerprint: Optional[List[int]], transcript_path: Optional[str] = None):
+        """
+        After a transcription: link the video to a canonical with a near-identical
+        transcript, or register it as a new canonical whose transcript is read from
+        transcript_path, the video's JSON file, when a re-upload needs it.
+
+        A linked video takes the canonical's transcript in place of its own: the analysis
+        it reuses refers to the canonical's segment numbers, which a separate transcription
+        of the same speech splits differently.
+        """
+        transcription = video_data.get("transcription", [])
+        signature = transcript_minhash(transcript_text(transcription))
+        canonical = self.index.match_transcript(signature)
+        canonical_transcription = None
+        if canonical is not None and canonical["key"] != video_key(video_data):
+            canonical_transcription = self.index.transcript(canonical)
+        if canonical_transcription is not None:
+            video_data["transcription"] = canonical_transcription
+            video_data["duplicate_of"] = canonical["key"]
+            with self._lock:
+                self.clusters[canonical["key"]].append(video_key(video_data))
+            logging.info(f"{video_key(video_data)} is a near-duplicate of {canonical['key']} (transcript match)")
+            return
+
+        self.index.add_canonical(video_key(video_data), {
+            "platform": video_data.get("platform"),
+            "video_id": video_data.get("video_id"),
+            "fingerprint": fingerprint,
+            "minhash": signature,
+            "transcript_path": transcript_path,
+            "audio_seconds": video_data.get("audio_seconds"),
+        })
+
+    def reuse_analysis(self, item: Dict[str, Any], perspective: str) -> bool:
+        """
+        Copy a stored analysis for this perspective into the item: the canonical's for a
+        duplicate, or the video's own from an earlier run. Returns True on success.
+        """
+        llm_analysis = self.index.get_analysis(item.get("duplicate_of") or video_key(item), perspective)
+        if llm_analysis is None:
+            return False
+        item["llm_analysis"] = llm_analysis
+        with self._lock:
+            self.llm_calls_saved += 1
+        return True
+
+    def register_analysis(self, item: Dict[str, Any], perspective: str):
+        """Store a fresh analysis on the item's canonical so later duplicates can reuse it."""
+        if str(item.get("llm_analysis", "")).startswith("Error"):
+            return
+        self.index.set_analysis(item.get("duplicate_of") or video_key(item), perspective, item["llm_analysis"])
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clusters": {canonical: list(duplicates) for canonical, duplicates in self.clusters.items()},
+                "duplicates": sum(len(duplicates) for duplicates in self.clusters.values()),
+                "transcriptions_saved": self.transcriptions_saved,
+                "audio_seconds_saved": round(self.audio_seconds_saved, 1),
+                "llm_calls_saved": self.llm_calls_saved,
+            }
+
+_INDEX: Optional[DedupIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+def get_dedup_index() -> DedupIndex:
+    """Process-wide dedup index, loaded on first use."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = DedupIndex()
+        return _INDEX
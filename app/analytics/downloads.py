@@ -0,0 +1,149 @@
+import threading
+import logging
+import yt_dlp
+import os
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from yt_dlp.utils import DownloadError
+from utils.config import configure
+
+configure()
+
+COOKIES_FOLDER = os.getenv('COOKIES_FOLDER')
+# Simultaneous downloads allowed against one host, across all fetches of the process
+DOWNLOAD_HOST_CONCURRENCY = int(os.getenv('DOWNLOAD_HOST_CONCURRENCY', 2))
+# Keep the audio files once their transcription is saved (they are deleted by default)
+KEEP_AUDIO = os.getenv('KEEP_AUDIO', 'false').lower() in ('1', 'true', 'yes')
+
+# Format selection of each platform, in one selector: yt-dlp takes the first available
+# format, so a video without an audio-only stream needs no second download attempt.
+# 230 is a low-res YouTube video format with audio.
+PLATFORM_FORMATS = {
+    "youtube": os.getenv('YOUTUBE_AUDIO_FORMAT', 'bestaudio/230/best'),
+    "tiktok": os.getenv('TIKTOK_AUDIO_FORMAT', 'bestaudio/best'),
+}
+
+def url_host(url: str) -> str:
+    """Host of a video URL without its www./m. prefix, e.g. youtube.com."""
+    host = (urlparse(url).hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+def url_platform(url: str) -> str:
+    return "tiktok" if "tiktok" in url_host(url) else "youtube"
+
+class DownloadManager:
+    """
+    Downloads the audio of videos as mp3 files.
+
+    Each worker thread keeps one yt_dlp.YoutubeDL instance per platform and output
+    folder (YoutubeDL is not thread-safe), so the extractors and their HTTP sessions
+    are reused from one video to the next. Downloads from the same host are limited to
+    DOWNLOAD_HOST_CONCURRENCY at a time.
+    """
+
+    def __init__(self, host_concurrency: int = DOWNLOAD_HOST_CONCURRENCY):
+        self.host_concurrency = max(1, host_concurrency)
+        self._local = threading.local()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def download(self, url: str, output_path: str, video_id: str) -> str:
+        """
+        Download the audio of a video to <output_path>/<video_id>.mp3.
+
+        Args:
+            url: URL of the video
+            output_path: Folder of the audio file
+            video_id: Id of the video, used as the file name
+
+        Returns:
+            Path of the mp3 file
+
+        Raises:
+            DownloadError: If no format of the video could be downloaded
+        """
+        logging.info(f"Downloading audio: {url}")
+        os.makedirs(output_path, exist_ok=True)
+        audio_file = os.path.join(output_path, f"{video_id}.mp3")
+        ydl = self._extractor(url_platform(url), output_path)
+
+        self._local.final_path = None
+        with self._host_semaphore(url_host(url)):
+            ydl.download([url])
+
+        # yt-dlp names the file after its own id of the video, reported by the post hook
+        final_path = self._local.final_path
+        if not final_path or not os.path.exists(final_path):
+            raise DownloadError(f"Audio download produced no file for {url}")
+        if os.path.abspath(final_path) != os.path.abspath(audio_file):
+            os.replace(final_path, audio_file)
+        logging.info(f"Audio downloaded: {audio_file}")
+        return audio_file
+
+    def _extractor(self, platform: str, output_path: str):
+        """The calling thread's YoutubeDL instance for a platform and output folder."""
+        extractors = getattr(self._local, "extractors", None)
+        if extractors is None:
+            extractors = self._local.extractors = {}
+        key = (platform, os.path.abspath(output_path))
+        if key not in extractors:
+            # A new run folder: the instances writing to the previous one are done
+            for old_key in [old_key for old_key in extractors if old_key[1] != key[1]]:
+                self._close(extractors.pop(old_key))
+            extractors[key] = yt_dlp.YoutubeDL({
+                'format': PLATFORM_FORMATS.get(platform, 'bestaudio/best'),
+                'paths': {'home': output_path},
+                'outtmpl': '%(id)s.%(ext)s',
+                'postprocessors': [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'mp3',
+                    'preferredquality': '192',
+                }],
+                'post_hooks': [self._record_path],
+                'cookiefile': COOKIES_FOLDER,
+                'quiet': True,
+                'noprogress': True,
+            })
+        return extractors[key]
+
+    def _record_path(self, path: str):
+        self._local.final_path = path
+
+    def _host_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.host_concurrency)
+            return self._semaphores[host]
+
+    @staticmethod
+    def _close(ydl):
+        try:
+            ydl.close()
+        except Exception as e:
+            logging.warning(f"Error closing downloader: {e}")
+
+def release_audio(audio_file: Optional[str]):
+    """Delete an audio file whose transcription is saved, unless KEEP_AUDIO is set."""
+    if KEEP_AUDIO or not audio_file:
+        return
+    try:
+        os.remove(audio_file)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning(f"Could not delete audio file {audio_file}: {e}")
+
+_MANAGER: Optional[DownloadManager] = None
+_MANAGER_LOCK = threading.Lock()
+
+def get_download_manager() -> DownloadManager:
+    """Process-wide download manager, shared by every fetch."""
+    global _MANAGER
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            _MANAGER = DownloadManager()
+        return _MANAGER
@@ -0,0 +1,237 @@
+import threading
+import logging
+import os
+import xml.etree.ElementTree as ElementTree
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.config import configure
+
+configure()
+
+RAG_FOLDER = os.getenv('RAG_FOLDER')
+
+# GraphRAG output tables (graphrag 2.x names first, then the older create_final_* ones)
+TABLE_FILENAMES = {
+    "entities": ("entities.parquet", "create_final_entities.parquet"),
+    "relationships": ("relationships.parquet", "create_final_relationships.parquet"),
+    "communities": ("communities.parquet", "create_final_communities.parquet"),
+    "community_reports": ("community_reports.parquet", "create_final_community_reports.parquet"),
+}
+GRAPHML_FILENAME = "graph.graphml"
+
+def graph_output_folder(rag_folder: Optional[str] = RAG_FOLDER) -> Optional[str]:
+    return os.path.join(rag_folder, "output") if rag_folder else None
+
+class GraphIndex:
+    """
+    In-memory index of a GraphRAG graph: entities by name, weighted adjacency lists
+    sorted by weight, entities ranked by degree and communities with their members,
+    so neighbourhood, top-entity and community queries are lookups.
+    """
+
+    def __init__(
+        self,
+        entities: Dict[str, Dict[str, Any]],
+        edges: Iterable[Tuple[str, str, float, str]],
+        communities: Dict[Any, Dict[str, Any]]
+    ):
+        self.entities = entities
+        self.communities = communities
+        self._names = {title.casefold(): title for title in entities}
+
+        adjacency: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.relationship_count = 0
+        for source, target, weight, description in edges:
+            for entity, neighbour in ((source, target), (target, source)):
+                if entity not in entities:
+                    entities[entity] = {"title": entity, "type": None, "description": ""}
+                    self._names[entity.casefold()] = entity
+                adjacency[entity].append({"title": neighbour, "weight": weight, "description": description})
+            self.relationship_count += 1
+        for neighbours in adjacency.values():
+            neighbours.sort(key=lambda neighbour: neighbour["weight"], reverse=True)
+        self._adjacency = dict(adjacency)
+
+        for title, entity in entities.items():
+            if not entity.get("degree"):
+                entity["degree"] = len(self._adjacency.get(title, ()))
+        self._ranked = sorted(entities, key=lambda title: (entities[title]["degree"], entities[title].get("frequency") or 0), reverse=True)
+
+        self._entity_communities: Dict[str, List[Any]] = defaultdict(list)
+        for community_id, community in communities.items():
+            for title in community["entities"]:
+                self._entity_communities[title].append(community_id)
+        self._ranked_communities = sorted(
+            communities, key=lambda community_id: (communities[community_id].get("rank") or 0, len(communities[community_id]["entities"])), reverse=True
+        )
+
+    def entity(self, name: str) -> Optional[Dict[str, Any]]:
+        """Entity by name, case-insensitive."""
+        title = self._names.get(name.casefold())
+        return self.entities[title] if title is not None else None
+
+    def neighbours(self, name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Entities related to an entity, strongest relationship first."""
+        title = self._names.get(name.casefold())
+        neighbours = self._adjacency.get(title, [])[:limit]
+        return [dict(neighbour, type=self.entities[neighbour["title"]].get("type")) for neighbour in neighbours]
+
+    def top_entities(self, limit: int = 20, entity_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most connected entities, optionally of one type."""
+        ranked = (self.entities[title] for title in self._ranked)
+        if entity_type:
+            ranked = (entity for entity in ranked if entity.get("type") == entity_type)
+        result = []
+        for entity in ranked:
+            result.append(entity)
+            if len(result) >= limit:
+                break
+        return result
+
+    def entity_types(self) -> List[str]:
+        return sorted({entity["type"] for entity in self.entities.values() if entity.get("type")})
+
+    def communities_of(self, name: str) -> List[Dict[str, Any]]:
+        """Communities an entity belongs to, lowest (broadest) level first."""
+        title = self._names.get(name.casefold())
+        found = [self.communities[community_id] for community_id in self._entity_communities.get(title, [])]
+        return sorted(found, key=lambda community: community.get("level") or 0)
+
+    def community(self, community_id: Any) -> Optional[Dict[str, Any]]:
+        return self.communities.get(community_id)
+
+    def top_communities(self, limit: int = 20, level: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Communities by report rank, then size, optionally of one level."""
+        ranked = (self.communities[community_id] for community_id in self._ranked_communities)
+        if level is not None:
+            ranked = (community for community in ranked if community.get("level") == level)
+        return [community for _, community in zip(range(limit), ranked)]
+
+def _first_existing(folder: str, filenames: Iterable[str]) -> Optional[str]:
+    return next((os.path.join(folder, name) for name in filenames if os.path.exists(os.path.join(folder, name))), None)
+
+def _graph_files(folder: str) -> List[str]:
+    paths = [_first_existing(folder, filenames) for filenames in TABLE_FILENAMES.values()]
+    paths.append(_first_existing(folder, [GRAPHML_FILENAME]))
+    return [path for path in paths if path]
+
+def graph_signature(folder: str) -> Tuple:
+    """Changes whenever GraphRAG rewrites one of its output files."""
+    signature = []
+    for path in _graph_files(folder):
+        stat = os.stat(path)
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def _as_list(value: Any) -> List[Any]:
+    return [] if value is None else list(value)
+
+def _load_tables(folder: str) -> Optional[GraphIndex]:
+    """Build the index from the parquet tables, or return None without an entities table."""
+    entities_path = _first_existing(folder, TABLE_FILENAMES["entities"])
+    if entities_path is None:
+        return None
+    import pandas as pd
+
+    entities_frame = pd.read_parquet(entities_path)
+    entities, titles_by_id = {}, {}
+    for row in entities_frame.to_dict("records"):
+        title = row.get("title") or row.get("name")
+        if not title:
+            continue
+        titles_by_id[row.get("id")] = title
+        entities[title] = {
+            "title": title,
+            "type": row.get("type"),
+            "description": row.get("description") or "",
+            "degree": int(row.get("degree") or 0),
+            "frequency": int(row.get("frequency") or 0),
+        }
+
+    edges = []
+    relationships_path = _first_existing(folder, TABLE_FILENAMES["relationships"])
+    if relationships_path:
+        for row in pd.read_parquet(relationships_path).to_dict("records"):
+            edges.append((row["source"], row["target"], float(row.get("weight") or 1.0), row.get("description") or ""))
+
+    reports = {}
+    reports_path = _first_existing(folder, TABLE_FILENAMES["community_reports"])
+    if reports_path:
+        for row in pd.read_parquet(reports_path).to_dict("records"):
+            reports[row.get("community")] = row
+
+    communities = {}
+    communities_path = _first_existing(folder, TABLE_FILENAMES["communities"])
+    if communities_path:
+        for row in pd.read_parquet(communities_path).to_dict("records"):
+            community_id = row.get("community", row.get("id"))
+            report = reports.get(community_id, {})
+            communities[community_id] = {
+                "id": community_id,
+                "level": int(row.get("level") or 0),
+                "title": report.get("title") or row.get("title") or f"Community {community_id}",
+                "summary": report.get("summary") or "",
+                "rank": float(report.get("rank") or 0.0),
+                "entities": [titles_by_id[entity_id] for entity_id in _as_list(row.get("entity_ids")) if entity_id in titles_by_id],
+            }
+
+    return GraphIndex(entities, edges, communities)
+
+def _load_graphml(path: str) -> GraphIndex:
+    """Build the index from GraphRAG's graphml snapshot (no tables: no communities)."""
+    namespace = "{http://graphml.graphdrawing.org/xmlns}"
+    key_names: Dict[str, str] = {}
+    entities: Dict[str, Dict[str, Any]] = {}
+    edges = []
+
+    for _, element in ElementTree.iterparse(path):
+        tag = element.tag.replace(namespace, "")
+        if tag == "key":
+            key_names[element.get("id")] = element.get("attr.name") or element.get("id")
+        elif tag in ("node", "edge"):
+            data = {key_names.get(item.get("key"), item.get("key")): item.text for item in element.findall(f"{namespace}data")}
+            if tag == "node":
+                title = element.get("id")
+                entities[title] = {
+                    "title": title,
+                    "type": data.get("type"),
+                    "description": data.get("description") or "",
+                    "degree": int(float(data.get("degree") or 0)),
+                    "frequency": int(float(data.get("frequency") or 0)),
+                }
+            else:
+                edges.append((element.get("source"), element.get("target"), float(data.get("weight") or 1.0), data.get("description") or ""))
+            element.clear()
+
+    return GraphIndex(entities, edges, {})
+
+_CACHE: Dict[str, Tuple[Tuple, GraphIndex]] = {}
+_CACHE_LOCK = threading.Lock()
+
+def get_graph_index(folder: Optional[str] = None) -> Optional[GraphIndex]:
+    """
+    Index of the GraphRAG output in folder (default: <RAG_FOLDER>/output), parsed once
+    and reused until GraphRAG rewrites its output. None if there is no graph yet.
+    """
+    folder = folder or graph_output_folder()
+    if not folder or not os.path.isdir(folder):
+        return None
+
+    with _CACHE_LOCK:
+        signature = graph_signature(folder)
+        if not signature:
+            return None
+        cached = _CACHE.get(folder)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        index = _load_tables(folder)
+        if index is None:
+            graphml_path = _first_existing(folder, [GRAPHML_FILENAME])
+            if graphml_path is None:
+                return None
+            index = _load_graphml(graphml_path)
+        logging.info(f"Graph index of {folder}: {len(index.entities)} entities, {index.relationship_count} relationships, {len(index.communities)} communities")
+        _CACHE[folder] = (signature, index)
+        return index
@@ -0,0 +1,210 @@
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+import json
+import time
+import sys
+import os
+from typing import Any, Dict, List, Optional
+from utils.config import configure
+
+configure()
+
+# Interval between two samples of the run's threads (seconds)
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.01))
+# Frames kept per sampled stack, innermost first
+PROFILE_MAX_DEPTH = int(os.getenv('PROFILE_MAX_DEPTH', 64))
+
+PROFILE_FOLDED_FILENAME = "profile.folded"
+PROFILE_SUMMARY_FILENAME = "profile.json"
+
+# Component a sample is charged to: the first pattern found in its stack, from the innermost frame
+COMPONENTS = (
+    ("ffmpeg", ("postprocessor/ffmpeg.py", "pydub", "ffmpeg")),
+    ("openai", ("/openai/", "/httpx/", "/httpcore/")),
+    ("tiktok", ("/TikTokApi/", "/playwright/")),
+    ("yt-dlp", ("/yt_dlp/",)),
+    ("json", ("/json/",)),
+    ("http", ("/requests/", "/urllib3/", "/http/client.py", "/ssl.py", "/socket.py")),
+    ("transcription", ("/faster_whisper/", "/whisper_s2t/", "/torch/", "/transformers/")),
+    ("app", ("/analytics/", "/utils/")),
+    # Threads waiting for other threads: futures, joins, locks
+    ("sync", ("/concurrent/futures/", "/threading.py", "/queue.py")),
+)
+
+def _thread_cpu_seconds(native_id: int) -> Optional[float]:
+    """CPU time of a thread from /proc (Linux), or None where it is unavailable."""
+    try:
+        with open(f"/proc/self/task/{native_id}/stat", 'r') as file:
+            fields = file.read().rsplit(")", 1)[1].split()
+        # utime and stime, in clock ticks (fields 14 and 15 of stat)
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _component(filenames: List[str]) -> str:
+    for filename in filenames:
+        normalized = filename.replace("\\", "/")
+        for component, patterns in COMPONENTS:
+            if any(pattern in normalized for pattern in patterns):
+                return component
+    return "other"
+
+def _is_idle_worker(filenames: List[str], labels: List[str]) -> bool:
+    """A pool thread waiting for its next task is not doing any of the run's work."""
+    return labels[0].startswith("_worker (") and filenames[0].replace("\\", "/").endswith("concurrent/futures/thread.py")
+
+# Profiler of the run the current thread works for, set by RunProfiler.start and register
+_CURRENT = threading.local()
+
+def current_profiler() -> Optional["RunProfiler"]:
+    return getattr(_CURRENT, "profiler", None)
+
+def run_thread_pool(max_workers: int, thread_name_prefix: str = "") -> ThreadPoolExecutor:
+    """
+    ThreadPoolExecutor for the work of a run: when the calling thread belongs to a profiled
+    run, each worker registers with its profiler as it starts, and so do the pools it opens.
+    """
+    profiler = current_profiler()
+    return ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix=thread_name_prefix,
+        initializer=profiler.register if profiler else None
+    )
+
+class RunProfiler:
+    """
+    Sampling profiler of one fetch run.
+
+    A background thread samples the stacks of the run's threads (the thread that starts
+    it, and the workers of the pools opened by run_thread_pool from those threads) every
+    `interval` seconds, so the other sessions' fetches and the process' own workers
+    (server, semantic index) stay out of the profile. Each sample counts
+    as wall-clock time of its thread, and as CPU time when the thread's CPU clock moved
+    since the previous sample (Linux); otherwise the thread was waiting (I/O, a lock,
+    a subprocess such as ffmpeg, or an idle event loop between two awaits).
+
+    The stacks are written in the folded format of flamegraph.pl and speedscope, and
+    summarized by component (yt-dlp, ffmpeg, TikTok, OpenAI, JSON...) and hotspot.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL, max_depth: int = PROFILE_MAX_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: Counter = Counter()
+        self._components: Dict[str, Counter] = defaultdict(Counter)
+        self._self_cpu: Counter = Counter()
+        self._self_wall: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Thread objects rather than idents: an ident is reused once its thread exits
+        self._threads = set()
+        self._threads_lock = threading.Lock()
+        self.samples = 0
+        self.started_at = self.stopped_at = None
+
+    def start(self) -> "RunProfiler":
+        self._cpu_clocks: Dict[int, float] = {}
+        self.register()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name="run-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def register(self):
+        """Sample the calling thread from now on, and the pools it opens with run_thread_pool."""
+        with self._threads_lock:
+            self._threads.add(threading.current_thread())
+        _CURRENT.profiler = self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+        if current_profiler() is self:
+            _CURRENT.profiler = None
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        with self._threads_lock:
+            run_threads = set(self._threads)
+        for ident, frame in sys._current_frames().items():
+            thread = threads.get(ident)
+            if thread not in run_threads:
+                continue
+            on_cpu = self._advance_cpu_clock(thread)
+
+            labels, filenames = [], []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(_frame_label(frame))
+                filenames.append(frame.f_code.co_filename)
+                frame = frame.f_back
+            if not labels or _is_idle_worker(filenames, labels):
+                continue
+            # Thread names group the pools (collector_0, analysis_1...) by their prefix
+            thread_name = thread.name.rsplit("_", 1)[0]
+            self._stacks[";".join([thread_name] + labels[::-1] + ["[cpu]" if on_cpu else "[wait]"])] += 1
+            component = _component(filenames)
+            self._components[component]["wall"] += 1
+            self._self_wall[labels[0]] += 1
+            if on_cpu:
+                self._components[component]["cpu"] += 1
+                self._self_cpu[labels[0]] += 1
+            self.samples += 1
+
+    def _advance_cpu_clock(self, thread: threading.Thread) -> bool:
+        """Whether the thread used CPU since its previous sample (True where it cannot be measured)."""
+        native_id = getattr(thread, "native_id", None)
+        clock = _thread_cpu_seconds(native_id) if native_id else None
+        if clock is None:
+            return True
+        previous = self._cpu_clocks.get(native_id, clock)
+        self._cpu_clocks[native_id] = clock
+        return clock > previous
+
+    def folded(self) -> str:
+        """Sampled stacks in the folded format: "frame;frame;frame count" per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def summary(self, top: int = 15) -> Dict[str, Any]:
+        """Wall and CPU seconds per component, and the functions most often on top of the stack."""
+        to_seconds = lambda count: round(count * self.interval, 3)
+        components = sorted(self._components.items(), key=lambda entry: entry[1]["wall"], reverse=True)
+        return {
+            "duration_s": round((self.stopped_at or time.perf_counter()) - self.started_at, 3),
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "components": [
+                {"component": name, "wall_s": to_seconds(counts["wall"]), "cpu_s": to_seconds(counts["cpu"]),
+                 "wait_s": to_seconds(counts["wall"] - counts["cpu"])}
+                for name, counts in components
+            ],
+            "cpu_hotspots": [{"function": name, "cpu_s": to_seconds(count)} for name, count in self._self_cpu.most_common(top)],
+            "wall_hotspots": [{"function": name, "wall_s": to_seconds(count)} for name, count in self._self_wall.most_common(top)],
+        }
+
+    def save(self, folder: str) -> Dict[str, Any]:
+        """
+        Write the folded stacks and the summary into folder.
+
+        Returns:
+            The summary, with the path of the folded stacks file under "folded_path"
+        """
+        os.makedirs(folder, exist_ok=True)
+        folded_path = os.path.join(folder, PROFILE_FOLDED_FILENAME)
+        with open(folded_path, 'w', encoding='utf-8') as file:
+            file.write(self.folded())
+        summary = dict(self.summary(), folded_path=folded_path)
+        with open(os.path.join(folder, PROFILE_SUMMARY_FILENAME), 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=4)
+        logging.info(f"Run profile saved to {folder}: {self.samples} samples")
+        return summary
@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from analytics.checkpoint import STAGES
+
+# Stage counters shown while a fetch runs
+PROGRESS_STAGES = ("searched", "downloaded", "transcribed", "analysed")
+
+class FetchProgress:
+    """
+    Live progress of one fetch, fed by the pipeline thread and polled by the UI.
+
+    It listens to the run's RunCheckpoint (see RunCheckpoint.subscribe) for the
+    stages each video completes and failures, and receives every video as soon as it
+    is analysed, so results can be shown before the whole batch is done. Another
+    session waiting on the same fetch follows it through attach.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Set[str]] = {stage: set() for stage in STAGES}
+        self._failed: Set[str] = set()
+        self._items: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._followers: List["FetchProgress"] = []
+        self.started_at = time.monotonic()
+        self.first_result_at: Optional[float] = None
+
+    def start(self):
+        """Mark the start of the fetch, which may come well after the progress was created."""
+        with self._lock:
+            self.started_at = time.monotonic()
+            self.first_result_at = None
+
+    def attach(self, follower: "FetchProgress"):
+        """Feed another progress with this fetch's stages, failures and videos: those so far, then the next ones."""
+        with self._lock:
+            for stage, video_ids in self._stages.items():
+                for video_id in video_ids:
+                    follower.on_stage(video_id, stage)
+            for video_id in self._failed:
+                follower.on_failure(video_id, {})
+            for item in self._items:
+                follower.publish(item)
+            self._followers.append(follower)
+
+    def on_stage(self, video_id: str, stage: str):
+        with self._lock:
+            self._stages.setdefault(stage, set()).add(video_id)
+            self._failed.discard(video_id)
+            for follower in self._followers:
+                follower.on_stage(video_id, stage)
+
+    def on_failure(self, video_id: str, error: Dict[str, Any]):
+        with self._lock:
+            self._failed.add(video_id)
+            for follower in self._followers:
+                follower.on_failure(video_id, error)
+
+    def publish(self, item: Dict[str, Any]):
+        """Record a completed video; publishing it again replaces the earlier version."""
+        with self._lock:
+            video_id = item.get("video_id", "unknown")
+            if video_id in self._positions:
+                self._items[self._positions[video_id]] = dict(item)
+            else:
+                self._positions[video_id] = len(self._items)
+                self._items.append(dict(item))
+                if self.first_result_at is None:
+                    self.first_result_at = time.monotonic()
+            for follower in self._followers:
+                follower.publish(item)
+
+    def complete(self, items: List[Dict[str, Any]]):
+        """Record the videos of a fetch that finished elsewhere (e.g. a cached result) as done."""
+        for item in items:
+            for stage in PROGRESS_STAGES:
+                self.on_stage(item.get("video_id", "unknown"), stage)
+            self.publish(item)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of videos past each stage of PROGRESS_STAGES, and of failed videos."""
+        with self._lock:
+            counts = {stage: len(self._stages.get(stage, ())) for stage in PROGRESS_STAGES}
+            counts["failed"] = len(self._failed)
+            return counts
+
+    def items_since(self, position: int) -> List[Dict[str, Any]]:
+        """Videos completed after the first `position` ones, in completion order."""
+        with self._lock:
+            return list(self._items[position:])
+
+    @property
+    def time_to_first_result(self) -> Optional[float]:
+        """Seconds from the start of the fetch to its first completed video."""
+        return self.first_result_at - self.started_at if self.first_result_at is not None else None
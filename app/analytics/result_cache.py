@@ -0,0 +1,133 @@
+import threading
+import logging
+import time
+import os
+import re
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from utils.config import configure
+
+
+configure()
+
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', 3600))  # seconds
+
+def make_query_key(
+    topic: str,
+    platform: str,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    min_likes: int,
+    min_followers: int,
+    specific_words: str,
+    political_perspective: str,
+    transcription_backend: Optional[str] = None,
+    api_key_id: Optional[str] = None
+) -> Tuple:
+    """
+    Build a normalized cache key for a fetch query, so that queries differing
+    only in case, whitespace or keyword order share the same result.
+    api_key_id, a fingerprint of the caller's API key, keeps the results of
+    different keys (accounts, budgets) apart.
+    """
+    keywords = sorted({word.strip().lower() for word in re.split(r'[、,]', specific_words or "") if word.strip()})
+    return (
+        (topic or "").strip().lower(),
+        platform,
+        str(start_date) if start_date else None,
+        str(end_date) if end_date else None,
+        int(min_likes),
+        int(min_followers),
+        tuple(keywords),
+        " ".join((political_perspective or "").split()).lower(),
+        (transcription_backend or "").lower() or None,
+        api_key_id,
+    )
+
+class _InFlight:
+    """A computation in progress that concurrent identical requests wait on."""
+
+    def __init__(self, context: Any = None):
+        self.done = threading.Event()
+        # Given by the owner for the requests that join it, e.g. its live progress
+        self.context = context
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class ResultCache:
+    """
+    Process-wide cache of fetch results keyed by the normalized query.
+
+    Entries expire after `ttl_seconds`. Concurrent requests for a key that is
+    being computed wait for that computation instead of starting their own.
+    Failed computations are not cached.
+    """
+
+    def __init__(self, ttl_seconds: int = RESULT_CACHE_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._in_flight: Dict[Hashable, _InFlight] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        context: Any = None,
+        on_join: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """
+        Cached value of a key, computing it unless it is cached or being computed.
+
+        Args:
+            key: Normalized query (see make_query_key)
+            compute: Computes the value when this request owns the computation
+            context: Shared with the requests that join this one's computation
+            on_join: Called with the owner's context when this request joins a computation in progress
+        """
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(key)
+            if entry is not None:
+                logging.info(f"Result cache hit for query {key}")
+                return entry[1]
+
+            pending = self._in_flight.get(key)
+            is_owner = pending is None
+            if is_owner:
+                pending = _InFlight(context)
+                self._in_flight[key] = pending
+
+        if not is_owner:
+            logging.info(f"Waiting on in-flight computation for query {key}")
+            if on_join:
+                on_join(pending.context)
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = compute()
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, pending.value)
+            return pending.value
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending.done.set()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
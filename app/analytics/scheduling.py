@@ -0,0 +1,147 @@
+import datetime
+import hashlib
+import logging
+import shutil
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dateutil.parser import isoparse
+from analytics.schema import metric_array
+from utils.utilities import run_folder_of
+from utils.config import configure
+
+configure()
+
+def parse_weights(text: str) -> Dict[str, float]:
+    """Parse "views=1,likes=0.5" into {"views": 1.0, "likes": 0.5}; empty text gives no weights."""
+    weights = {}
+    for part in text.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            weights[name.strip()] = float(value)
+    return weights
+
+# Weights of the priority score: any metric field of analytics.schema, plus "recency"
+PRIORITY_WEIGHTS = parse_weights(os.getenv('PRIORITY_WEIGHTS', 'views=1,likes=1,subscribers=0.5,recency=0.5'))
+# Age at which a video's recency is worth half that of a video published now
+PRIORITY_RECENCY_HALF_LIFE_DAYS = float(os.getenv('PRIORITY_RECENCY_HALF_LIFE_DAYS', 30))
+# Videos processed in full, highest score first (0: every video)
+PRIORITY_HEAD_SIZE = int(os.getenv('PRIORITY_HEAD_SIZE', 0))
+# Share of the videos past the head that are processed, sampled at random
+PRIORITY_TAIL_SAMPLE_RATE = float(os.getenv('PRIORITY_TAIL_SAMPLE_RATE', 1.0))
+
+# Videos left out by tail sampling, kept in the run folder for reference
+SKIPPED_FOLDER = "skipped"
+
+class PriorityScheduler:
+    """
+    Orders the videos of a batch by a priority score before their expensive stages
+    (download, transcription, analysis), so a run cut short by an interruption or a
+    budget limit has processed its most influential videos first.
+
+    The score is a weighted sum of the video's counts, each log-scaled and normalized
+    by the largest in the batch, and of its recency, halving every half_life_days.
+    The head_size best videos are always processed; past them, only a tail_sample_rate
+    share of the tail is, sampled by video id so a resumed run picks the same videos.
+    """
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        half_life_days: float = PRIORITY_RECENCY_HALF_LIFE_DAYS,
+        head_size: int = PRIORITY_HEAD_SIZE,
+        tail_sample_rate: float = PRIORITY_TAIL_SAMPLE_RATE
+    ):
+        self.weights = PRIORITY_WEIGHTS if weights is None else weights
+        self.half_life_days = half_life_days
+        self.head_size = head_size
+        self.tail_sample_rate = tail_sample_rate
+
+    @property
+    def samples(self) -> bool:
+        return bool(self.head_size) and self.tail_sample_rate < 1.0
+
+    def recency(self, record: Dict[str, Any], now: datetime.datetime) -> float:
+        try:
+            published = isoparse(record["published_at"])
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=datetime.timezone.utc)
+        age_days = max(0.0, (now - published).total_seconds() / 86400)
+        return 0.5 ** (age_days / self.half_life_days) if self.half_life_days > 0 else 0.0
+
+    def scores(self, records: List[Dict[str, Any]]) -> List[float]:
+        """Priority score of each record, relative to the rest of the batch."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        metrics = [field for field in self.weights if field != "recency"]
+        scaled = {field: np.log1p(np.maximum(metric_array(records, field), 0)) for field in metrics}
+        maxima = {field: float(values.max(initial=0.0)) or 1.0 for field, values in scaled.items()}
+
+        scores = []
+        for position, record in enumerate(records):
+            score = sum(self.weights[field] * float(scaled[field][position]) / maxima[field] for field in metrics)
+            if self.weights.get("recency"):
+                score += self.weights["recency"] * self.recency(record, now)
+            scores.append(score)
+        return scores
+
+    def order(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Records by descending score (unchanged without weights)."""
+        if not self.weights:
+            return list(records)
+        scores = self.scores(records)
+        return [records[position] for position in sorted(range(len(records)), key=lambda position: -scores[position])]
+
+    def sampled(self, video_id: str) -> bool:
+        """Whether a tail video is processed: a stable draw from its id."""
+        draw = int(hashlib.sha256(video_id.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return draw < self.tail_sample_rate
+
+    def plan(self, data_folder: str, filenames: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Split the video files of a data folder into those to process, in priority order,
+        and the tail videos left out by sampling.
+
+        Args:
+            data_folder: Folder of the video JSON files
+            filenames: JSON file names of the videos
+
+        Returns:
+            (files to process, skipped files)
+        """
+        records = []
+        for filename in filenames:
+            try:
+                with open(os.path.join(data_folder, filename), 'r', encoding='utf-8') as file:
+                    record = json.load(file)
+            except (OSError, ValueError):
+                record = {}
+            records.append(dict(record, _filename=filename))
+
+        ordered = [record["_filename"] for record in self.order(records)]
+        if not self.samples:
+            return ordered, []
+        head, tail = ordered[:self.head_size], ordered[self.head_size:]
+        kept, skipped = [], []
+        for filename in tail:
+            (kept if self.sampled(filename.split('.')[0]) else skipped).append(filename)
+        return head + kept, skipped
+
+    def schedule(self, data_folder: str, filenames: List[str]) -> List[str]:
+        """
+        Plan a data folder's videos and move the skipped ones to <run_folder>/skipped/.
+
+        Returns:
+            Files to process, highest priority first
+        """
+        selected, skipped = self.plan(data_folder, filenames)
+        if skipped:
+            logging.info(f"Priority sampling: {len(selected)} videos processed, {len(skipped)} tail videos skipped")
+            skipped_folder = os.path.join(run_folder_of(data_folder), SKIPPED_FOLDER)
+            os.makedirs(skipped_folder, exist_ok=True)
+            for filename in skipped:
+                shutil.move(os.path.join(data_folder, filename), os.path.join(skipped_folder, filename))
+        return selected
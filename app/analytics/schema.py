@@ -0,0 +1,60 @@
+from typing import Any, Dict, List, Optional, TypedDict
+
+import numpy as np
+
+# Engagement metrics stored as int, or None when the platform does not report them
+METRIC_FIELDS = ("views", "likes", "comments", "shares", "saves", "subscribers", "total_videos")
+
+class VideoRecord(TypedDict, total=False):
+    """Record schema shared by the YouTube and TikTok collectors."""
+    platform: str
+    title: Optional[str]
+    description: str
+    published_at: str
+    channel: str
+    channel_id: str
+    video_id: str
+    url: str
+    views: Optional[int]
+    likes: Optional[int]
+    comments: Optional[int]
+    shares: Optional[int]
+    saves: Optional[int]
+    tags: List[str]
+    subscribers: Optional[int]
+    total_videos: Optional[int]
+
+def to_count(value: Any) -> Optional[int]:
+    """
+    Convert a raw metric to an int, or None when it is missing or not a count.
+    YouTube reports counts as strings ("123") and omits hidden ones.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+def normalize_metrics(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert every metric field present in the record to int/None, in place. Returns the record."""
+    for field in METRIC_FIELDS:
+        if field in record:
+            record[field] = to_count(record[field])
+    return record
+
+def meets_thresholds(record: Dict[str, Any], min_likes: int, min_followers: int) -> bool:
+    """Check the likes/followers minimums on a normalized record (missing counts as 0)."""
+    return (record.get("likes") or 0) >= min_likes and (record.get("subscribers") or 0) >= min_followers
+
+def metric_array(records: List[Dict[str, Any]], field: str) -> np.ndarray:
+    """Metric column of normalized records as an int64 array (missing counts as 0)."""
+    return np.fromiter(((record.get(field) or 0) for record in records), dtype=np.int64, count=len(records))
+
+def filter_records(records: List[Dict[str, Any]], min_likes: int, min_followers: int) -> List[Dict[str, Any]]:
+    """Vectorized equivalent of meets_thresholds over a list of normalized records."""
+    keep = (metric_array(records, "likes") >= min_likes) & (metric_array(records, "subscribers") >= min_followers)
+    return [record for record, kept in zip(records, keep) if kept]
@@ -0,0 +1,218 @@
+import threading
+import logging
+import sqlite3
+import glob
+import json
+import time
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.config import configure
+from utils.utilities import RUNS_FOLDER
+
+configure()
+
+SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', './data/search_index.db')
+SEARCH_INDEX_ENABLED = os.getenv('SEARCH_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Indexed text fields of a video besides its transcript segments
+TEXT_FIELDS = ("title", "description", "tags")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    key TEXT PRIMARY KEY,
+    platform TEXT,
+    video_id TEXT,
+    title TEXT,
+    channel TEXT,
+    url TEXT,
+    published_at TEXT,
+    run_folder TEXT,
+    indexed_at REAL
+);
+-- One row per indexed text: a transcript segment or a title/description/tags field
+CREATE TABLE IF NOT EXISTS segment_text (
+    id INTEGER PRIMARY KEY,
+    key TEXT,
+    field TEXT,
+    segment_number INTEGER,
+    start_time REAL,
+    end_time REAL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS segment_text_key ON segment_text (key);
+-- Inverted index over segment_text, kept in sync by SearchIndex.index_items
+CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5(
+    text,
+    content = 'segment_text',
+    content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+
+_RESULT_COLUMNS = (
+    "key", "field", "segment_number", "start_time", "end_time", "snippet",
+    "platform", "video_id", "title", "channel", "url", "published_at",
+)
+
+def to_match_query(text: str) -> str:
+    """
+    Turn a search box entry into an FTS5 query: "quoted phrases" are kept as phrases,
+    other words are matched literally (a trailing * matches a prefix) and all must occur.
+    """
+    terms = []
+    for token in re.findall(r'"[^"]*"|\S+', text):
+        if token.startswith('"') and token.endswith('"') and len(token) > 1:
+            phrase = token[1:-1].strip()
+            if phrase:
+                terms.append('"' + phrase.replace('"', '""') + '"')
+            continue
+        word = token.replace('"', '')
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        if word:
+            terms.append('"' + word + '"' + ('*' if prefix else ''))
+    return " ".join(terms)
+
+def segment_url(url: Optional[str], platform: Optional[str], start_time: Optional[float]) -> Optional[str]:
+    """Link to the moment a segment starts (YouTube), or to the video itself."""
+    if not url or start_time is None or platform != "youtube":
+        return url
+    return f"{url}{'&' if '?' in url else '?'}t={int(start_time)}s"
+
+class SearchIndex:
+    """
+    Persistent full-text index (SQLite FTS5) of the transcript segments, titles,
+    descriptions and tags of every fetched video. It outlives the run folders,
+    so videos stay searchable after their run is pruned.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def index_items(self, items: Iterable[Dict[str, Any]], run_folder: Optional[str] = None) -> int:
+        """
+        Index (or re-index) videos in one transaction. Returns the number of videos indexed.
+        """
+        video_rows, segment_rows, keys = [], [], []
+        now = time.time()
+        for item in items:
+            key = f"{item.get('platform', 'unknown')}:{item.get('video_id', 'unknown')}"
+            keys.append((key,))
+            video_rows.append((
+                key, item.get("platform"), item.get("video_id"), item.get("title"), item.get("channel"),
+                item.get("url"), item.get("published_at"), run_folder, now,
+            ))
+            for field in TEXT_FIELDS:
+                value = item.get(field)
+                text = " ".join(value) if isinstance(value, list) else value
+                if text:
+                    segment_rows.append((text, key, field, None, None, None))
+            for chunk in item.get("transcription") or []:
+                if chunk.get("transcription"):
+                    segment_rows.append((
+                        chunk["transcription"], key, "transcript",
+                        chunk.get("segment_number"), chunk.get("start_time"), chunk.get("end_time"),
+                    ))
+
+        with self._lock, self._connection:
+            # Earlier versions of these videos leave the inverted index before their rows are replaced
+            self._connection.executemany(
+                "INSERT INTO segments (segments, rowid, text) SELECT 'delete', id, text FROM segment_text WHERE key = ?", keys
+            )
+            self._connection.executemany("DELETE FROM segment_text WHERE key = ?", keys)
+            self._connection.executemany("INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", video_rows)
+            first_id = self._connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM segment_text").fetchone()[0]
+            self._connection.executemany(
+                "INSERT INTO segment_text (text, key, field, segment_number, start_time, end_time) VALUES (?, ?, ?, ?, ?, ?)",
+                segment_rows
+            )
+            # One set-based insert instead of a trigger per row
+            self._connection.execute("INSERT INTO segments (rowid, text) SELECT id, text FROM segment_text WHERE id >= ?", (first_id,))
+        logging.info(f"Search index: {len(video_rows)} videos, {len(segment_rows)} text rows indexed")
+        return len(video_rows)
+
+    def search(self, query: str, limit: int = 50, platform: Optional[str] = None, field: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Best matching segments for a query, most relevant (BM25) first.
+
+        Args:
+            query: Words and "quoted phrases" to look for; word* matches a prefix
+            limit: Maximum number of results
+            platform: Only return videos of this platform ("youtube" or "tiktok")
+            field: Only search this field ("transcript", "title", "description" or "tags")
+
+        Returns:
+            List of results with the video's metadata, the matching field, segment number,
+            start/end time, a highlighted snippet and a link to the segment
+        """
+        match = to_match_query(query)
+        if not match:
+            return []
+
+        sql = """
+            SELECT segment_text.key, segment_text.field, segment_text.segment_number,
+                   segment_text.start_time, segment_text.end_time,
+                   snippet(segments, 0, '**', '**', '…', 16),
+                   videos.platform, videos.video_id, videos.title, videos.channel, videos.url, videos.published_at
+            FROM segments
+            JOIN segment_text ON segment_text.id = segments.rowid
+            JOIN videos ON videos.key = segment_text.key
+            WHERE segments MATCH ?
+        """
+        params: List[Any] = [match]
+        if platform:
+            sql += " AND videos.platform = ?"
+            params.append(platform)
+        if field:
+            sql += " AND segment_text.field = ?"
+            params.append(field)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+
+        results = [dict(zip(_RESULT_COLUMNS, row)) for row in rows]
+        for result in results:
+            result["url"] = segment_url(result["url"], result["platform"], result["start_time"])
+        return results
+
+    def video_count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+def index_stored_runs(index: "SearchIndex", runs_folder: str = RUNS_FOLDER) -> int:
+    """Index the video records of every run still on disk. Returns the number of videos indexed."""
+    indexed = 0
+    for data_folder in glob.glob(os.path.join(runs_folder, "*", "*Data")):
+        items = []
+        for path in glob.glob(os.path.join(data_folder, "*.json")):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    items.append(json.load(file))
+            except Exception as e:
+                logging.error(f"Error loading {path} for indexing: {e}")
+        if items:
+            indexed += index.index_items(items, os.path.dirname(data_folder))
+    return indexed
+
+_INDEX: Optional[SearchIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+def get_search_index() -> SearchIndex:
+    """Process-wide search index, opened on first use."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = SearchIndex()
+        return _INDEX
@@ -0,0 +1,336 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+import glob
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from analytics.search_index import segment_url
+from utils.utilities import RUNS_FOLDER
+from utils.config import configure
+
+configure()
+
+SEMANTIC_INDEX_ENABLED = os.getenv('SEMANTIC_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SEMANTIC_INDEX_FOLDER = os.getenv('SEMANTIC_INDEX_FOLDER', './data/semantic_index')
+# Small sentence-embedding model run on the CPU
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 32))
+
+# Random-hyperplane LSH: SEMANTIC_LSH_TABLES tables of SEMANTIC_LSH_BITS-bit codes
+SEMANTIC_LSH_TABLES = int(os.getenv('SEMANTIC_LSH_TABLES', 8))
+SEMANTIC_LSH_BITS = int(os.getenv('SEMANTIC_LSH_BITS', 12))
+# Fewer candidates than this: neighbouring buckets are probed too, then every segment is scanned
+SEMANTIC_MIN_CANDIDATES = int(os.getenv('SEMANTIC_MIN_CANDIDATES', 200))
+_LSH_SEED = 1234
+# Rows of the vector matrix scored at once by a full scan
+_SCAN_ROWS = 65536
+
+META_FILENAME = "meta.json"
+VECTORS_FILENAME = "vectors.f16"
+CODES_FILENAME = "codes.u32"
+SEGMENTS_FILENAME = "segments.jsonl"
+
+class TransformerEmbedder:
+    """Mean-pooled, L2-normalized sentence embeddings of a Hugging Face model, loaded on first use."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._tokenizer = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            # Imported here: torch and transformers are only needed once something is embedded
+            from transformers import AutoModel, AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._model = AutoModel.from_pretrained(self.model_name).eval()
+            logging.info(f"Embedding model {self.model_name} loaded")
+
+    @property
+    def dim(self) -> int:
+        with self._lock:
+            self._load()
+            return self._model.config.hidden_size
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embeddings of texts as a float32 (len(texts), dim) matrix of unit rows."""
+        import torch
+
+        with self._lock:
+            self._load()
+            batches = []
+            for start in range(0, len(texts), self.batch_size):
+                tokens = self._tokenizer(
+                    texts[start:start + self.batch_size], padding=True, truncation=True, max_length=256, return_tensors="pt"
+                )
+                with torch.no_grad():
+                    hidden = self._model(**tokens).last_hidden_state
+                mask = tokens["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                batches.append(torch.nn.functional.normalize(pooled, dim=1).numpy())
+        return np.concatenate(batches).astype(np.float32) if batches else np.zeros((0, 0), dtype=np.float32)
+
+class SemanticIndex:
+    """
+    Persistent vector index of transcript segments, for "more like this" queries across
+    every fetched video.
+
+    Segment embeddings are appended to a float16 matrix on disk (vectors.f16), read
+    through a memory map, with one metadata line per segment (segments.jsonl). A query
+    scores only the candidates sharing a bucket with it in one of the random-hyperplane
+    LSH tables (codes.u32, the buckets being rebuilt in memory at load), probing
+    neighbouring buckets and finally scanning the whole matrix when they are too few.
+    """
+
+    def __init__(
+        self,
+        folder: str = SEMANTIC_INDEX_FOLDER,
+        embedder=None,
+        tables: int = SEMANTIC_LSH_TABLES,
+        bits: int = SEMANTIC_LSH_BITS
+    ):
+        self.folder = folder
+        self.embedder = embedder or TransformerEmbedder()
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+        meta_path = os.path.join(folder, META_FILENAME)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        model_name = getattr(self.embedder, "model_name", None)
+        if meta and meta.get("model") != model_name:
+            raise ValueError(f"Semantic index {folder} was built with {meta.get('model')}, not {model_name}")
+        self.dim = meta.get("dim") or self.embedder.dim
+        self.tables = meta.get("tables", tables)
+        self.bits = meta.get("bits", bits)
+        if not meta:
+            with open(meta_path, 'w', encoding='utf-8') as file:
+                json.dump({"model": model_name, "dim": self.dim, "tables": self.tables, "bits": self.bits}, file)
+
+        rng = np.random.default_rng(_LSH_SEED)
+        self._planes = rng.standard_normal((self.tables, self.bits, self.dim)).astype(np.float32)
+        self._powers = (1 << np.arange(self.bits)).astype(np.uint32)
+        self._load()
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.folder, filename)
+
+    def _load(self):
+        self.segments: List[Dict[str, Any]] = []
+        damaged = False
+        if os.path.exists(self._path(SEGMENTS_FILENAME)):
+            with open(self._path(SEGMENTS_FILENAME), 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        self.segments.append(json.loads(line))
+                    except ValueError:
+                        damaged = True
+                        break
+        row_bytes = self.dim * 2
+        vector_rows = os.path.getsize(self._path(VECTORS_FILENAME)) // row_bytes if os.path.exists(self._path(VECTORS_FILENAME)) else 0
+        code_rows = os.path.getsize(self._path(CODES_FILENAME)) // (4 * self.tables) if os.path.exists(self._path(CODES_FILENAME)) else 0
+        # An append interrupted midway leaves the files of different lengths: the shortest one wins
+        self.count = min(len(self.segments), vector_rows, code_rows)
+        if damaged or len(self.segments) > self.count:
+            del self.segments[self.count:]
+            self._rewrite_segments()
+        for filename, size in ((VECTORS_FILENAME, row_bytes), (CODES_FILENAME, 4 * self.tables)):
+            if os.path.exists(self._path(filename)) and os.path.getsize(self._path(filename)) != self.count * size:
+                with open(self._path(filename), 'r+b') as file:
+                    file.truncate(self.count * size)
+
+        self._rows = {(segment["key"], segment["segment_number"]): row for row, segment in enumerate(self.segments)}
+        self._keys = {segment["key"] for segment in self.segments}
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(self.tables)]
+        if self.count:
+            codes = np.fromfile(self._path(CODES_FILENAME), dtype=np.uint32).reshape(self.count, self.tables)
+            self._add_to_buckets(codes, 0)
+        self._vectors = None
+
+    def _rewrite_segments(self):
+        with open(self._path(SEGMENTS_FILENAME), 'w', encoding='utf-8') as file:
+            for segment in self.segments:
+                file.write(json.dumps(segment, ensure_ascii=False) + "\n")
+
+    def _add_to_buckets(self, codes: np.ndarray, first_row: int):
+        for table in range(self.tables):
+            column = codes[:, table]
+            order = np.argsort(column, kind="stable")
+            values, starts = np.unique(column[order], return_index=True)
+            for value, rows in zip(values.tolist(), np.split(order + first_row, starts[1:])):
+                self._buckets[table].setdefault(value, []).extend(rows.tolist())
+
+    def _codes(self, vectors: np.ndarray) -> np.ndarray:
+        """LSH code of each vector in each table, as a (len(vectors), tables) uint32 matrix."""
+        bits = np.einsum("nd,tbd->ntb", vectors, self._planes) > 0
+        return (bits.astype(np.uint32) * self._powers).sum(axis=2).astype(np.uint32)
+
+    def _matrix(self) -> np.ndarray:
+        """Memory map of the vectors, reopened when segments were added since."""
+        if self._vectors is None or self._vectors.shape[0] != self.count:
+            self._vectors = np.memmap(self._path(VECTORS_FILENAME), dtype=np.float16, mode="r", shape=(self.count, self.dim)) if self.count else np.zeros((0, self.dim), dtype=np.float16)
+        return self._vectors
+
+    def add_video(self, item: Dict[str, Any]) -> int:
+        """
+        Embed and index the transcript segments of a video, unless it is already indexed.
+
+        Returns:
+            Number of segments added
+        """
+        key = f"{item.get('platform', 'unknown')}:{item.get('video_id', 'unknown')}"
+        chunks = [chunk for chunk in item.get("transcription") or [] if (chunk.get("transcription") or "").strip()]
+        with self._lock:
+            if key in self._keys or not chunks:
+                return 0
+
+        vectors = self.embedder.encode([chunk["transcription"].strip() for chunk in chunks])
+        codes = self._codes(vectors)
+        segments = [{
+            "key": key,
+            "platform": item.get("platform"),
+            "video_id": item.get("video_id"),
+            "title": item.get("title"),
+            "channel": item.get("channel"),
+            "url": item.get("url"),
+            "segment_number": chunk.get("segment_number"),
+            "start_time": chunk.get("start_time"),
+            "end_time": chunk.get("end_time"),
+            "text": chunk["transcription"].strip(),
+        } for chunk in chunks]
+
+        with self._lock:
+            if key in self._keys:
+                return 0
+            first_row = self.count
+            with open(self._path(VECTORS_FILENAME), 'ab') as file:
+                file.write(vectors.astype(np.float16).tobytes())
+            with open(self._path(CODES_FILENAME), 'ab') as file:
+                file.write(codes.tobytes())
+            with open(self._path(SEGMENTS_FILENAME), 'a', encoding='utf-8') as file:
+                for segment in segments:
+                    file.write(json.dumps(segment, ensure_ascii=False) + "\n")
+            for offset, segment in enumerate(segments):
+                self._rows[(key, segment["segment_number"])] = first_row + offset
+            self.segments.extend(segments)
+            self._keys.add(key)
+            self._add_to_buckets(codes, first_row)
+            self.count += len(segments)
+        return len(segments)
+
+    def _candidates(self, codes: np.ndarray) -> np.ndarray:
+        found = set()
+        for table, code in enumerate(codes.tolist()):
+            found.update(self._buckets[table].get(code, ()))
+        if len(found) < SEMANTIC_MIN_CANDIDATES:
+            # Multi-probe: the buckets one bit away from the query's
+            for table, code in enumerate(codes.tolist()):
+                for bit in range(self.bits):
+                    found.update(self._buckets[table].get(code ^ (1 << bit), ()))
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+    def _nearest(self, vector: np.ndarray, limit: int, exclude_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            matrix = self._matrix()
+            count = self.count
+            candidates = np.sort(self._candidates(self._codes(vector[None, :])[0]))
+            if len(candidates) < min(count, SEMANTIC_MIN_CANDIDATES):
+                # Too few candidates for a good ranking: every segment is scored
+                scores = np.concatenate([
+                    matrix[start:start + _SCAN_ROWS].astype(np.float32) @ vector for start in range(0, count, _SCAN_ROWS)
+                ]) if count else np.zeros(0, dtype=np.float32)
+                rows = np.arange(count)
+            else:
+                scores = matrix[candidates].astype(np.float32) @ vector
+                rows = candidates
+            segments = self.segments
+
+        if exclude_key is not None and len(rows):
+            keep = np.fromiter((segments[row]["key"] != exclude_key for row in rows.tolist()), dtype=bool, count=len(rows))
+            rows, scores = rows[keep], scores[keep]
+        if len(rows) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+
+        results = []
+        for row, score in zip(rows[order].tolist(), scores[order].tolist()):
+            result = dict(segments[row], score=round(score, 4))
+            result["url"] = segment_url(result["url"], result["platform"], result["start_time"])
+            results.append(result)
+        return results
+
+    def more_like_segment(self, platform: str, video_id: str, segment_number: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Segments of other videos closest in meaning to a segment of a video (none if it is not indexed)."""
+        key = f"{platform}:{video_id}"
+        with self._lock:
+            row = self._rows.get((key, segment_number))
+            vector = np.asarray(self._matrix()[row], dtype=np.float32) if row is not None else None
+        if vector is None:
+            return []
+        return self._nearest(vector, limit, exclude_key=key)
+
+    def more_like_text(self, text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Segments closest in meaning to a free text."""
+        if not text.strip():
+            return []
+        return self._nearest(self.embedder.encode([text.strip()])[0], limit)
+
+    def video_count(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+def index_stored_runs(index: SemanticIndex, runs_folder: str = RUNS_FOLDER) -> int:
+    """Index the transcripts of every run still on disk. Returns the number of segments added."""
+    added = 0
+    for path in glob.glob(os.path.join(runs_folder, "*", "*Data", "*.json")):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                added += index.add_video(json.load(file))
+        except Exception as e:
+            logging.error(f"Error indexing {path} for similarity search: {e}")
+    return added
+
+_INDEX: Optional[SemanticIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+def get_semantic_index() -> SemanticIndex:
+    """Process-wide semantic index, opened on first use."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = SemanticIndex()
+        return _INDEX
+
+# One worker: segments are embedded off the collectors' threads, one video at a time
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_UNAVAILABLE = False
+
+def index_video(item: Dict[str, Any]):
+    """Queue a transcribed video for embedding; failures are logged, never raised."""
+    global _EXECUTOR
+    if not SEMANTIC_INDEX_ENABLED or _UNAVAILABLE:
+        return
+    with _INDEX_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic-index")
+    _EXECUTOR.submit(_index_video, dict(item))
+
+def _index_video(item: Dict[str, Any]):
+    global _UNAVAILABLE
+    try:
+        get_semantic_index().add_video(item)
+    except ImportError as e:
+        # Without torch/transformers the index stays off for the rest of the process
+        _UNAVAILABLE = True
+        logging.error(f"Semantic index disabled, embedding model unavailable: {e}")
+    except Exception as e:
+        logging.error(f"Semantic indexing of video {item.get('video_id')} failed: {e}")
@@ -3,41 +3,66 @@ import os
 import re
 import logging
 from pathlib import Path
-from dotenv import load_dotenv
-from yt_dlp.utils import DownloadError
-from analytics.transcript import transcription_function
+from analytics.transcript import transcribe_videos
+from analytics.scheduling import PriorityScheduler
+from analytics.channel_cache import get_channel_cache
+from typing import List
+from analytics.schema import VideoRecord, normalize_metrics, filter_records
 import subprocess
 from TikTokApi import TikTokApi
 import asyncio
 from datetime import datetime
 from utils.utilities import ensure_folder_exists, delete_files, process_json_to_txt
+from utils.config import configure
 
-# LOGGING
-logging.basicConfig(
-    filename="app.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+configure()
 
-load_dotenv(override=True)
 TIKTOK_MAX_RESULTS = int(os.getenv('TIKTOK_MAX_RESULTS', 10))  # Ensure it's an int with a default fallback
 RAG_FOLDER = os.getenv('RAG_FOLDER')
 
-def fetch_tiktok_data(topic, client, min_likes=0, min_followers=0, specific_words="None"):
+def fetch_tiktok_data(topic, client, min_likes=0, min_followers=0, specific_words="None",
+                      tiktok_data_folder="./data/tiktokData", audio_data_folder="./data/audio/tiktok_audio/audio", dedup=None,
+                      transcription_backend=None, checkpoint=None, on_video=None, governor=None, scheduler=None):
+    """
+    Fetch TikTok videos of a hashtag meeting the likes, followers and keyword criteria,
+    save each as <video_id>.json in tiktok_data_folder and transcribe it.
+
+    With a checkpoint, the stages completed by each video are recorded, a resumed run
+    only redoes the incomplete ones, and a failing video is quarantined instead of
+    aborting the batch.
+
+    on_video(video_id), if given, is called as soon as each video is transcribed.
+    Videos are transcribed in the order of the scheduler (default: a PriorityScheduler,
+    see analytics.scheduling), which may skip part of the tail. governor (analytics.budget)
+    is charged for the paid calls.
+    """
     logging.info("Entered fetch TikTok data function.")
-    tiktok_data_folder = Path("./data/tiktokData")
-    audio_data_folder = Path("./data/audio/tiktok_audio/audio")
+    tiktok_data_folder = Path(tiktok_data_folder)
+    audio_data_folder = Path(audio_data_folder)
 
     # Ensure folders exist
     ensure_folder_exists(tiktok_data_folder)
     ensure_folder_exists(audio_data_folder)
 
+    if checkpoint and checkpoint.searched("tiktok"):
+        logging.info("Resuming run, search skipped.")
+    else:
+        _search_tiktok_videos(topic, min_likes, min_followers, specific_words, tiktok_data_folder, audio_data_folder, checkpoint)
+
+    filenames = [filename for filename in os.listdir(tiktok_data_folder) if filename.endswith('.json')]
+    filenames = (scheduler or PriorityScheduler()).schedule(str(tiktok_data_folder), filenames)
+
+    transcribe_videos(tiktok_data_folder, filenames, audio_data_folder, client, dedup, transcription_backend,
+                      checkpoint, governor, on_video)
+
+def _search_tiktok_videos(topic, min_likes, min_followers, specific_words, tiktok_data_folder, audio_data_folder, checkpoint=None):
+    """Search the hashtag feed and save the videos meeting the criteria (a new run, or a resumed run whose search never finished)."""
     # Clean old data
     delete_files(tiktok_data_folder)
     delete_files(audio_data_folder)
 
     # Fetch videos
+    videos = None
     try:
         logging.info(f"Sending request to tiktok api with max results {TIKTOK_MAX_RESULTS} and topic {topic}")
         videos = asyncio.run(fetch_tiktok_videos(topic, int(TIKTOK_MAX_RESULTS)))
@@ -49,56 +74,55 @@ def fetch_tiktok_data(topic, client, min_likes=0, min_followers=0, specific_word
         return
     logging.info(f"Fetched videos: {videos}")
 
+    # The feed's author statistics refresh the channel cache, which fills them in when the feed omits them
+    channel_cache = get_channel_cache()
+    for video in videos:
+        if video.get("subscribers") is not None:
+            channel_cache.put("tiktok", video.get("channel_id"), video["subscribers"], video.get("total_videos"))
+        else:
+            video.update(channel_cache.get("tiktok", video.get("channel_id", "")) or {})
+
+    candidates = filter_records(videos, min_likes, min_followers)
+    logging.info(f"{len(candidates)} of {len(videos)} videos meet the likes and followers minimums")
+    specific_words_list = [word.strip() for word in re.split(r'[、,]', specific_words)]
+
     # Process videos with respect to TIKTOK_MAX_RESULTS
     saved_count = 0  # Track the number of saved videos
 
-    for video in videos:
+    for video in candidates:
         if saved_count >= TIKTOK_MAX_RESULTS:
             logging.info("saved count reached") ###
             break
 
-        likes = video.get("likes", 0)
-        subscribers = video.get("subscribers", 0)
         description = video.get("description", "").lower()  # Normalize case for comparison
 
-        # Check conditions
-        meets_likes = likes >= min_likes
-        meets_followers = subscribers >= min_followers
-
-        specific_words_list = [word.strip() for word in re.split(r'[、,]', specific_words)]
         # Check if at least one word from `specific_words` is in the description
         if specific_words_list:
             contains_keyword = True if specific_words.lower() == "none" else any(word in description or f"#{word}" in description for word in specific_words_list)
         else:
             contains_keyword = True  # If no words specified, don't filter on this
-        logging.info(f"meets_likes: {meets_likes}")
-        logging.info(f"meets_followers: {meets_followers}")
         logging.info(f"contains_keyword: {contains_keyword}")
 
         # Save only if all conditions are met
-        if meets_likes and meets_followers and contains_keyword:
+        if contains_keyword:
             video_id = video.get("video_id", "unknown")
             file_path = tiktok_data_folder / f"{video_id}.json"
 
             with open(file_path, "w", encoding="utf-8") as f:
                 json.dump(video, f, ensure_ascii=False, indent=4)
+            if checkpoint:
+                # The feed already carries the video and author statistics
+                checkpoint.mark(video_id, "searched")
+                checkpoint.mark(video_id, "enriched")
 
             saved_count += 1  # Increase count only when a video is saved
 
     logging.info(f"Saved {saved_count} videos to {tiktok_data_folder}")
+    channel_cache.save()
+    if checkpoint:
+        checkpoint.mark_searched("tiktok")
 
-    for filename in os.listdir(tiktok_data_folder):
-        if filename.endswith('.json'):
-            video_id = filename.split('.')[0]
-            try:
-                transcription_function(tiktok_data_folder, filename, audio_data_folder, client)
-            except DownloadError:
-                raise
-            except Exception as e:
-                raise
-            logging.info(f"Process of video {video_id} concluded.")
-
-async def fetch_tiktok_videos(word: str, n: int):
+async def fetch_tiktok_videos(word: str, n: int) -> List[VideoRecord]:
     results = []
     ms_token = os.getenv("MS_TOKEN")
     logging.info("Entered TiktokApi function.")
@@ -125,10 +149,10 @@ async def fetch_tiktok_videos(word: str, n: int):
                 "shares": video_dict.get("stats", {}).get("shareCount", 0),
                 "saves": video_dict.get("stats", {}).get("collectCount", 0),
                 "tags": [tag["hashtagName"] for tag in video_dict.get("textExtra", []) if tag.get("type") == 1],
-                "subscribers": video_dict.get("authorStats", {}).get("followerCount", 0),
-                "total_videos": video_dict.get("authorStats", {}).get("videoCount", 0),
+                "subscribers": video_dict.get("authorStats", {}).get("followerCount"),
+                "total_videos": video_dict.get("authorStats", {}).get("videoCount"),
             }
-            results.append(result)
+            results.append(normalize_metrics(result))
     return results
 
 # if __name__ == "__main__":
@@ -1,96 +1,20 @@
-from yt_dlp.utils import DownloadError
-from dotenv import load_dotenv
 import logging
-import yt_dlp
 import json
 import os
 
-# LOGGING
-logging.basicConfig(
-    filename="app.log",  # Log file name
-    level=logging.INFO,  # Log level (INFO or higher)
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
-load_dotenv(override=True)
-TRANSCRIPTION_MODEL_ID = os.getenv('TRANSCRIPTION_MODEL_ID')
-COOKIES_FOLDER = os.getenv('COOKIES_FOLDER')
-
-# Function to download audio from YouTube using yt-dlp command
-def download_audio_from_youtube(url, output_path, filename="audio.mp3"):
-    logging.info(f"Downloading audio from youtube: {url}")
-    if not os.path.exists(output_path):
-        os.makedirs(output_path)
-    audio_file = os.path.join(output_path, filename)
-
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': audio_file,
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }],
-    }
+from utils.utilities import build_segment_index
+from analytics.dedup import audio_fingerprint
+from analytics.downloads import get_download_manager, release_audio
+from analytics.semantic_index import index_video
+from analytics.transcription_backends import OpenAITranscriptionBackend
+from analytics.profiling import run_thread_pool
+from utils.config import configure
 
-    ydl_opts['cookiefile'] = COOKIES_FOLDER
-
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        logging.info(f"Audio downloaded using bestaudio: {audio_file}")
-        return audio_file
-    except Exception as e:
-        logging.warning(f"Primary audio download failed: {e}")
-
-    fallback_file = os.path.join(output_path, "fallback_video.%(ext)s")
-    ydl_opts_fallback = {
-        'format': '230',  # A low-res video format with audio
-        'outtmpl': fallback_file,
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }],
-    }
+configure()
 
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts_fallback) as ydl:
-            ydl.download([url])
-        # Rename output file to desired name (yt-dlp may save it with video title)
-        for file in os.listdir(output_path):
-            if file.endswith(".mp3") and "fallback_video" in file:
-                os.rename(os.path.join(output_path, file), audio_file)
-                break
-        logging.info(f"Audio extracted from fallback video: {audio_file}")
-        return audio_file
-    except Exception as e:
-        logging.error(f"Fallback video download failed: {e}")
-        return None
-
-    # except DownloadError as e:
-    #     logging.info(f"Download failed: {e}. Possible cause: Expired cookies. Try updating your cookies file.")
-    #     raise
-    # except Exception as e:
-    #     logging.info(f"An unexpected error occurred: {e}")
-    #     raise
-    
-
-def transcribe_audio_openAI(audio_file_path, client):
-    logging.info(f"Making request to openAI for audio file {audio_file_path}")
-    audio_file= open(audio_file_path, "rb")
-    model = TRANSCRIPTION_MODEL_ID
-    logging.info(f"using model: {TRANSCRIPTION_MODEL_ID}")
-    transcription = client.audio.transcriptions.create(
-        file=audio_file,
-        model=model,
-        response_format="verbose_json",
-        timestamp_granularities=["segment"]
-    )
-    logging.info(f"OpenAI request completed")
-
-    return transcription
+def download_audio(url, output_path, video_id):
+    """Download the audio of a video to <output_path>/<video_id>.mp3 through the shared download manager."""
+    return get_download_manager().download(url, output_path, video_id)
 
 def extract_transcription_data(transcription_verbose):
     logging.info(f"Extracting transcription")
@@ -105,10 +29,76 @@ def extract_transcription_data(transcription_verbose):
     
     return transcription_data
 
-# Main function
-def transcription_function(youtube_data_folder, filename, audio_path, client):
+def transcribe_videos(data_folder, filenames, audio_path, client, dedup=None, transcription_backend=None,
+                      checkpoint=None, governor=None, on_video=None):
+    """
+    Download and transcribe the videos of a data folder, in the order of filenames.
+
+    The downloaded files are sent to the backend in batches of its concurrency through
+    transcribe_batch, so a local process pool runs one file per worker and the hybrid
+    backend sends the files beyond its free workers to the remote API. A batch is
+    transcribed while the next one is downloaded.
+
+    Each transcription is saved in the video's JSON file, with its segment index, and
+    on_video(video_id), if given, is called once it is. With a checkpoint, videos already
+    transcribed are skipped and a failing video is quarantined instead of aborting the
+    batch; without one, the first failure is raised.
+    """
+    backend = transcription_backend or OpenAITranscriptionBackend(client)
+
+    def fail(video_id, error):
+        if not checkpoint:
+            raise error
+        checkpoint.quarantine(video_id, str(data_folder), error)
+
+    def transcribe_and_save(batch):
+        transcriptions = backend.transcribe_batch([video["audio_file"] for video in batch])
+        for video, transcription in zip(batch, transcriptions):
+            try:
+                if isinstance(transcription, Exception):
+                    raise transcription
+                _save_transcription(video, transcription, dedup, checkpoint, on_video)
+            except Exception as e:
+                fail(video["video_id"], e)
+
+    with run_thread_pool(1, thread_name_prefix="transcription_batch") as transcriber:
+        batch, in_flight = [], None
+        for filename in filenames:
+            video_id = filename.split('.')[0]
+            if checkpoint and checkpoint.done(video_id, "transcribed"):
+                logging.info(f"Video {video_id} already transcribed, skipped.")
+                continue
+            try:
+                video = _download_video(data_folder, filename, audio_path, dedup, checkpoint, governor)
+                if video["transcribed"]:
+                    _save_transcription(video, None, dedup, checkpoint, on_video)
+                    continue
+            except Exception as e:
+                fail(video_id, e)
+                continue
+            batch.append(video)
+            if len(batch) >= backend.concurrency:
+                # At most one batch is downloaded ahead of the one being transcribed
+                if in_flight:
+                    in_flight.result()
+                in_flight = transcriber.submit(transcribe_and_save, batch)
+                batch = []
+        if in_flight:
+            in_flight.result()
+        if batch:
+            transcribe_and_save(batch)
+
+def _download_video(data_folder, filename, audio_path, dedup=None, checkpoint=None, governor=None):
+    """
+    Download the audio of a video, unless a resumed run already has it, and reuse the
+    transcription of a known re-upload.
+
+    Returns:
+        The video's state: its data, JSON and audio paths, audio fingerprint and whether
+        it is already transcribed
+    """
     video_id = filename.split('.')[0]
-    json_filepath = os.path.join(youtube_data_folder, f"{video_id}.json")
+    json_filepath = os.path.join(data_folder, f"{video_id}.json")
 
     if os.path.exists(json_filepath):
         with open(json_filepath, 'r', encoding='utf-8') as f:
@@ -117,24 +107,49 @@ def transcription_function(youtube_data_folder, filename, audio_path, client):
         logging.info(f"Warning: {json_filepath} not found. Creating a new JSON.")
         video_data = {}
 
-    youtube_url = video_data.get("url", "No URL found")
-
-    # Step 1: Download the audio using yt-dlp
-    try:
-        audio_file = download_audio_from_youtube(youtube_url, audio_path, filename=video_id + ".mp3")
-    except DownloadError:
-        raise
-    except Exception:
-        raise
-
-    # Step 2: Get the transcription with segment granularity
-    transcription = transcribe_audio_openAI(audio_file + ".mp3", client)
-    transcription_data = extract_transcription_data(transcription)
-    video_data["transcription"] = transcription_data
+    url = video_data.get("url", "No URL found")
+
+    # Nothing is downloaded once a hard spending limit is reached
+    if governor:
+        governor.check()
+
+    audio_file = os.path.join(audio_path, video_id + ".mp3")
+    if not (checkpoint and checkpoint.done(video_id, "downloaded") and os.path.exists(audio_file)):
+        audio_file = download_audio(url, audio_path, video_id)
+        if checkpoint:
+            checkpoint.mark(video_id, "downloaded")
+
+    fingerprint = audio_fingerprint(audio_file) if dedup else None
+    return {
+        "video_id": video_id,
+        "data": video_data,
+        "json_filepath": json_filepath,
+        "audio_file": audio_file,
+        "fingerprint": fingerprint,
+        "transcribed": bool(dedup and dedup.reuse_transcription(video_data, fingerprint)),
+    }
 
-    # Step 3: Save the updated JSON
-    with open(json_filepath, 'w', encoding='utf-8') as f:
+def _save_transcription(video, transcription, dedup=None, checkpoint=None, on_video=None):
+    """Store a video's transcription (None: reused from a re-upload) in its JSON file and release its audio."""
+    video_data = video["data"]
+    if transcription is not None:
+        transcription_data = extract_transcription_data(transcription)
+        video_data["transcription"] = transcription_data
+        video_data["audio_seconds"] = getattr(transcription, "duration", None) or max(
+            (chunk["end_time"] for chunk in transcription_data), default=0.0
+        )
+        if dedup:
+            dedup.register_transcription(video_data, video["fingerprint"], os.path.abspath(video["json_filepath"]))
+    video_data["segment_index"] = build_segment_index(video_data["transcription"])
+
+    with open(video["json_filepath"], 'w', encoding='utf-8') as f:
         json.dump(video_data, f, indent=4, ensure_ascii=False)
-    logging.info(f"Update of transcription in the json file for video: {video_id}")
-
-
+    if checkpoint:
+        checkpoint.mark(video["video_id"], "transcribed")
+    # The transcription is saved, the audio is no longer needed
+    release_audio(video["audio_file"])
+    # Its segments are embedded in the background for similarity search
+    index_video(video_data)
+    logging.info(f"Update of transcription in the json file for video: {video['video_id']}")
+    if on_video:
+        on_video(video["video_id"])
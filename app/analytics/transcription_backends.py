@@ -0,0 +1,252 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from types import SimpleNamespace
+import multiprocessing
+import abc
+import threading
+import logging
+import os
+from typing import Any, Dict, List, Optional
+from analytics.budget import estimate_audio_seconds, transcription_cost
+from analytics.profiling import run_thread_pool
+from utils.config import configure
+
+configure()
+
+TRANSCRIPTION_MODEL_ID = os.getenv('TRANSCRIPTION_MODEL_ID')
+TRANSCRIPTION_BACKEND = os.getenv('TRANSCRIPTION_BACKEND', 'openai')  # openai, local or hybrid
+LOCAL_WHISPER_MODEL = os.getenv('LOCAL_WHISPER_MODEL', 'small')
+LOCAL_WHISPER_COMPUTE_TYPE = os.getenv('LOCAL_WHISPER_COMPUTE_TYPE', 'int8')  # quantized CPU inference
+LOCAL_WHISPER_WORKERS = int(os.getenv('LOCAL_WHISPER_WORKERS', 2))
+LOCAL_WHISPER_THREADS = int(os.getenv('LOCAL_WHISPER_THREADS', 4))  # CPU threads per worker process
+LOCAL_WHISPER_BATCH_SIZE = int(os.getenv('LOCAL_WHISPER_BATCH_SIZE', 8))
+# Files sent to the OpenAI audio API at the same time by one run
+OPENAI_TRANSCRIPTION_CONCURRENCY = int(os.getenv('OPENAI_TRANSCRIPTION_CONCURRENCY', 4))
+
+TRANSCRIPTION_BACKENDS = ("openai", "local", "hybrid")
+
+def transcribe_audio_openAI(audio_file_path, client):
+    logging.info(f"Making request to openAI for audio file {audio_file_path}")
+    model = TRANSCRIPTION_MODEL_ID
+    logging.info(f"using model: {TRANSCRIPTION_MODEL_ID}")
+    with open(audio_file_path, "rb") as audio_file:
+        transcription = client.audio.transcriptions.create(
+            file=audio_file,
+            model=model,
+            response_format="verbose_json",
+            timestamp_granularities=["segment"]
+        )
+    logging.info(f"OpenAI request completed")
+
+    return transcription
+
+class TranscriptionBackend(abc.ABC):
+    """
+    Turns an audio file into a verbose transcription: an object with `segments`
+    (each with id, start, end, text) and `duration`, as returned by the OpenAI
+    audio API and read by extract_transcription_data.
+
+    Callers send files in batches of `concurrency` through transcribe_batch, the
+    number of files the backend can transcribe at once.
+    """
+    name = "base"
+    concurrency = 1
+
+    @abc.abstractmethod
+    def transcribe(self, audio_path: str):
+        """Transcription of one audio file."""
+
+    def transcribe_batch(self, audio_paths: List[str]) -> List[Any]:
+        """
+        Transcribe several files.
+
+        Returns:
+            For each file, in order, its transcription or the exception it failed with,
+            so one failed file does not fail the batch
+        """
+        return [_capture(self.transcribe, audio_path) for audio_path in audio_paths]
+
+def _capture(function, *args) -> Any:
+    try:
+        return function(*args)
+    except Exception as e:
+        return e
+
+class OpenAITranscriptionBackend(TranscriptionBackend):
+    """Remote transcription through the OpenAI audio API, charged to an optional BudgetGovernor."""
+    name = "openai"
+
+    def __init__(self, client, governor=None, concurrency: int = OPENAI_TRANSCRIPTION_CONCURRENCY):
+        self.client = client
+        self.governor = governor
+        self.concurrency = max(1, concurrency)
+
+    def transcribe(self, audio_path: str):
+        if self.governor is None:
+            return transcribe_audio_openAI(audio_path, self.client)
+
+        reserved = self.governor.reserve("transcription", transcription_cost(estimate_audio_seconds(audio_path)))
+        try:
+            transcription = transcribe_audio_openAI(audio_path, self.client)
+        except Exception:
+            self.governor.release(reserved)
+            raise
+        seconds = getattr(transcription, "duration", None) or estimate_audio_seconds(audio_path)
+        self.governor.record("transcription", reserved, transcription_cost(seconds), audio_seconds=seconds)
+        return transcription
+
+    def transcribe_batch(self, audio_paths: List[str]) -> List[Any]:
+        """Send the files as concurrent requests (see TranscriptionBackend.transcribe_batch)."""
+        if len(audio_paths) < 2:
+            return super().transcribe_batch(audio_paths)
+        with run_thread_pool(min(self.concurrency, len(audio_paths)), thread_name_prefix="transcription") as executor:
+            return list(executor.map(lambda audio_path: _capture(self.transcribe, audio_path), audio_paths))
+
+# Model of the current local worker process, loaded once by _init_local_worker
+_WORKER_PIPELINE = None
+
+def _init_local_worker(model_size: str, compute_type: str, cpu_threads: int):
+    global _WORKER_PIPELINE
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+    model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+    _WORKER_PIPELINE = BatchedInferencePipeline(model=model)
+
+def _transcribe_in_worker(audio_path: str, batch_size: int) -> Dict[str, Any]:
+    segments, info = _WORKER_PIPELINE.transcribe(audio_path, batch_size=batch_size)
+    return {
+        "duration": info.duration,
+        # Numbered from 0 like the OpenAI segments, so chunk numbers mean the same for both backends
+        "segments": [
+            {"id": index, "start": segment.start, "end": segment.end, "text": segment.text}
+            for index, segment in enumerate(segments)
+        ],
+    }
+
+def _as_verbose_transcription(result: Dict[str, Any]):
+    return SimpleNamespace(
+        duration=result["duration"],
+        segments=[SimpleNamespace(**segment) for segment in result["segments"]],
+    )
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Local CPU transcription with a quantized Whisper model (faster-whisper).
+    Each worker process loads the model once and runs batched inference on its files;
+    files are spread across the process pool.
+    """
+    name = "local"
+
+    def __init__(
+        self,
+        model_size: str = LOCAL_WHISPER_MODEL,
+        compute_type: str = LOCAL_WHISPER_COMPUTE_TYPE,
+        workers: int = LOCAL_WHISPER_WORKERS,
+        cpu_threads: int = LOCAL_WHISPER_THREADS,
+        batch_size: int = LOCAL_WHISPER_BATCH_SIZE
+    ):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        # Spawned workers do not inherit the app's threads or open sockets
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_local_worker,
+            initargs=(model_size, compute_type, cpu_threads),
+        )
+        # Free worker slots, used by the hybrid backend to route overflow to the remote API
+        self.slots = threading.BoundedSemaphore(self.workers)
+
+    @property
+    def concurrency(self) -> int:
+        return self.workers
+
+    def submit(self, audio_path: str) -> Future:
+        """Queue a file on the process pool; the future's result is passed to _as_verbose_transcription."""
+        logging.info(f"Transcribing {audio_path} locally")
+        return self._pool.submit(_transcribe_in_worker, audio_path, self.batch_size)
+
+    def transcribe(self, audio_path: str):
+        return _as_verbose_transcription(self.submit(audio_path).result())
+
+    def transcribe_batch(self, audio_paths: List[str]) -> List[Any]:
+        """Queue every file at once, so each worker process takes one (see TranscriptionBackend.transcribe_batch)."""
+        futures = [self.submit(audio_path) for audio_path in audio_paths]
+        return [_capture(lambda future: _as_verbose_transcription(future.result()), future) for future in futures]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+class HybridTranscriptionBackend(TranscriptionBackend):
+    """
+    Local transcription while a local worker is free, remote transcription for the
+    overflow and for files the local engine fails on. In a batch, the files beyond the
+    free local workers go to the remote API while the local ones are transcribed.
+    """
+    name = "hybrid"
+
+    def __init__(self, local: LocalWhisperBackend, remote: TranscriptionBackend):
+        self.local = local
+        self.remote = remote
+
+    @property
+    def concurrency(self) -> int:
+        return self.local.concurrency + self.remote.concurrency
+
+    def transcribe(self, audio_path: str):
+        result = self.transcribe_batch([audio_path])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def transcribe_batch(self, audio_paths: List[str]) -> List[Any]:
+        local_paths, overflow = [], []
+        for audio_path in audio_paths:
+            (local_paths if self.local.slots.acquire(blocking=False) else overflow).append(audio_path)
+        if overflow:
+            logging.info(f"{len(overflow)} of {len(audio_paths)} files sent to the remote API, every local worker is busy")
+
+        results = {}
+        try:
+            futures = {audio_path: self.local.submit(audio_path) for audio_path in local_paths}
+            # The overflow is transcribed remotely while the local workers run
+            results.update(zip(overflow, self.remote.transcribe_batch(overflow)))
+            for audio_path, future in futures.items():
+                results[audio_path] = _capture(lambda: _as_verbose_transcription(future.result()))
+        finally:
+            for _ in local_paths:
+                self.local.slots.release()
+
+        failed = [audio_path for audio_path in local_paths if isinstance(results[audio_path], Exception)]
+        for audio_path in failed:
+            logging.warning(f"Local transcription of {audio_path} failed, using the remote API: {results[audio_path]}")
+        results.update(zip(failed, self.remote.transcribe_batch(failed)))
+        return [results[audio_path] for audio_path in audio_paths]
+
+_LOCAL_BACKEND: Optional[LocalWhisperBackend] = None
+_LOCAL_BACKEND_LOCK = threading.Lock()
+
+def _shared_local_backend() -> LocalWhisperBackend:
+    """The local engine's process pool is started once and shared by every run."""
+    global _LOCAL_BACKEND
+    with _LOCAL_BACKEND_LOCK:
+        if _LOCAL_BACKEND is None:
+            _LOCAL_BACKEND = LocalWhisperBackend()
+        return _LOCAL_BACKEND
+
+def get_transcription_backend(name: Optional[str], client, governor=None) -> TranscriptionBackend:
+    """
+    Return the transcription backend for a run.
+
+    Args:
+        name: "openai", "local" or "hybrid"; None uses TRANSCRIPTION_BACKEND
+        client: OpenAI client, used by the remote and hybrid backends
+        governor: Optional BudgetGovernor charged with the remote transcriptions
+    """
+    name = (name or TRANSCRIPTION_BACKEND).lower()
+    if name == "openai":
+        return OpenAITranscriptionBackend(client, governor)
+    if name == "local":
+        return _shared_local_backend()
+    if name == "hybrid":
+        return HybridTranscriptionBackend(_shared_local_backend(), OpenAITranscriptionBackend(client, governor))
+    raise ValueError(f"Unknown transcription backend: {name} (expected one of {', '.join(TRANSCRIPTION_BACKENDS)})")
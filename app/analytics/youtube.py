@@ -1,23 +1,23 @@
 from dateutil.relativedelta import relativedelta
+from dateutil.parser import isoparse
 from yt_dlp.utils import DownloadError
-from dotenv import load_dotenv
 import json as json_module
 import requests
 import datetime
 import logging
+import math
 import os
 import re
 
 from utils.utilities import delete_files, ensure_folder_exists
-from analytics.transcript import transcription_function 
+from analytics.transcript import transcribe_videos
+from analytics.scheduling import PriorityScheduler
+from analytics.channel_cache import get_channel_cache
+from analytics.schema import to_count, meets_thresholds
+from analytics.profiling import run_thread_pool
+from utils.config import configure
 
-# LOGGING
-logging.basicConfig(
-    filename="app.log",  # Log file name
-    level=logging.INFO,  # Log level (INFO or higher)
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+configure()
 
 """
 Queries YouTube for videos with "Trump" or #Trump in the title.
@@ -36,16 +36,20 @@ and check the description manually, as YouTube's API does not directly support s
 
 # send example of saved data, and example of frontend visualization (pdf)
 
-load_dotenv(override=True)
 YT_GOOGLE_DEV_API_KEY = os.getenv('YT_GOOGLE_DEV_API_KEY')
 YT_MAX_RESULTS = os.getenv('YT_MAX_RESULTS')
+YT_SEARCH_SHARDS = int(os.getenv('YT_SEARCH_SHARDS', 4))  # concurrent date sub-windows per search
 RAG_FOLDER = os.getenv('RAG_FOLDER')
 
 SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
 VIDEO_URL = "https://www.googleapis.com/youtube/v3/videos"
 CHANNEL_URL = "https://www.googleapis.com/youtube/v3/channels"
+# Channel ids per channels request (the API allows at most 50)
+CHANNEL_BATCH_SIZE = 50
 
-def fetch_youtube_data(topic, client, start_date, end_date, min_likes, min_followers, specific_words):
+def fetch_youtube_data(topic, client, start_date, end_date, min_likes, min_followers, specific_words,
+                       youtube_data_folder="./data/youtubeData", audio_data_folder="./data/audio/yt_audio/audio", dedup=None,
+                       transcription_backend=None, checkpoint=None, on_video=None, governor=None, scheduler=None):
     """Fetch YouTube videos information following the indications regarding:
         - topic
         - range date of publication (start date - end date)
@@ -54,53 +58,105 @@ def fetch_youtube_data(topic, client, start_date, end_date, min_likes, min_follo
         - specific words to be present (at least one) in the title together with the topic
 
        The videos information is saved inside a json file for each video named <video_id>.json
-       and inside the folder ./data/youtubeData
+       and inside youtube_data_folder (./data/youtubeData unless a run folder is given)
+
+       With a checkpoint, the stages completed by each video are recorded, a resumed run
+       only redoes the incomplete ones, and a failing video is quarantined instead of
+       aborting the batch.
+
+       on_video(video_id), if given, is called as soon as each video is transcribed.
+       The channels of the search are resolved first, from the channel cache or in batched
+       requests, so videos of channels below min_followers cost no further request.
+       Every video is enriched before any is transcribed, so the scheduler (default: a
+       PriorityScheduler, see analytics.scheduling) can order them by views, likes,
+       subscribers and recency, and skip part of the tail. governor (analytics.budget)
+       is charged for the paid calls.
 
        # TODO: this location will have to change probably to the RAG input folder location
     """
 
     # Folders Initialization
-    
-    youtube_data_folder = "./data/youtubeData"
-    audio_data_folder = "./data/audio/yt_audio/audio"
 
-    ensure_folder_exists("./data")
     ensure_folder_exists(youtube_data_folder)
     ensure_folder_exists(audio_data_folder)
 
-    delete_files(youtube_data_folder)
-    delete_files(audio_data_folder)
-    
-    # Calculate dates with proper timezone awareness
-    now_utc = datetime.datetime.now(datetime.timezone.utc)
-    start_date = now_utc - relativedelta(years=5)
-    end_date = now_utc - datetime.timedelta(weeks=1)
-    logging.info(f"start date: {start_date}, end date: {end_date}")
+    status = True
+    if not (checkpoint and checkpoint.searched("youtube")):
+        delete_files(youtube_data_folder)
+        delete_files(audio_data_folder)
+
+        # Search window: the requested dates, or by default from 5 years ago to 1 week ago
+        start_date, end_date = resolve_search_window(start_date, end_date)
+        logging.info(f"start date: {start_date}, end date: {end_date}")
+
+        logging.info("Searching for videos given the features.")
+        videos = sharded_video_search(YT_GOOGLE_DEV_API_KEY, SEARCH_URL, topic, specific_words, start_date, end_date, max_results=YT_MAX_RESULTS)
+        status = videos is not None
+        for video_id, video_data in (videos or {}).items():
+            video_filename = os.path.join(youtube_data_folder, f"{video_id}.json")
+            with open(video_filename, 'w') as file:
+                json_module.dump(video_data, file, indent=4)
+            logging.info(f"Data for video {video_id} saved to {video_filename}")
+            if checkpoint:
+                checkpoint.mark(video_id, "searched")
+        if checkpoint and status:
+            checkpoint.mark_searched("youtube")
+        logging.info("Search finished.")
+    else:
+        logging.info("Resuming run, search skipped.")
 
-    # Format as ISO 8601 strings
-    published_after = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-    published_before = end_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-    
-    logging.info("Searching for videos given the features.")
-    status = video_search(YT_GOOGLE_DEV_API_KEY, SEARCH_URL, topic, specific_words, published_after, published_before, youtube_data_folder, max_results=YT_MAX_RESULTS)
-    logging.info("Search finished.")
     if status:
-        for filename in os.listdir(youtube_data_folder):
-            if filename.endswith('.json'):
-                video_id = filename.split('.')[0]
-                logging.info(f"Processing video: {video_id}")
-                
-                video_status = get_video_info(YT_GOOGLE_DEV_API_KEY, VIDEO_URL, youtube_data_folder, filename)
-                channel_status = get_channel_info(YT_GOOGLE_DEV_API_KEY, CHANNEL_URL, youtube_data_folder, filename)
-                check_status = check_and_delete_invalid_file(os.path.join(youtube_data_folder, filename), min_likes, min_followers)
-                if check_status:
-                    try:
-                        transcription_function(youtube_data_folder, filename, audio_data_folder, client)
-                    except DownloadError:
-                        raise
-                    except Exception as e:
-                        raise
-                logging.info(f"Process of video {video_id} concluded. Check status: {str(check_status)} / Search status: {str(status)} / Video status: {str(video_status)} / Channel status: {str(channel_status)}")
+        scheduler = scheduler or PriorityScheduler()
+        filenames = [filename for filename in os.listdir(youtube_data_folder) if filename.endswith('.json')]
+        filenames = resolve_channels(YT_GOOGLE_DEV_API_KEY, CHANNEL_URL, youtube_data_folder, filenames, min_followers)
+        # The counts the priority score needs come with the enrichment, done once per video:
+        # the videos whose enrichment failed are dropped here, and the second pass skips
+        # the requests of the others, with or without a checkpoint
+        enriched = {
+            filename for filename in filenames
+            if _process_video(filename, youtube_data_folder, min_likes, min_followers, checkpoint)
+        }
+        filenames = scheduler.schedule(youtube_data_folder, [
+            filename for filename in filenames
+            if filename in enriched and os.path.exists(os.path.join(youtube_data_folder, filename))
+        ])
+        filenames = [
+            filename for filename in filenames
+            if _process_video(filename, youtube_data_folder, min_likes, min_followers, checkpoint, enriched=True)
+        ]
+        transcribe_videos(youtube_data_folder, filenames, audio_data_folder, client, dedup, transcription_backend,
+                          checkpoint, governor, on_video)
+
+def _process_video(filename, youtube_data_folder, min_likes, min_followers, checkpoint=None, enriched=False):
+    """
+    Enrich one searched video and drop it if it misses the criteria.
+    A video already enriched (enriched, or recorded in the checkpoint) gets no further video or channel request.
+
+    Returns:
+        True if the video is enriched and meets the criteria (or is already transcribed)
+    """
+    video_id = filename.split('.')[0]
+    logging.info(f"Processing video: {video_id}")
+
+    if checkpoint and checkpoint.done(video_id, "transcribed"):
+        logging.info(f"Video {video_id} already transcribed, skipped.")
+        return True
+
+    video_status = channel_status = check_status = True
+    try:
+        if not (enriched or (checkpoint and checkpoint.done(video_id, "enriched"))):
+            video_status = get_video_info(YT_GOOGLE_DEV_API_KEY, VIDEO_URL, youtube_data_folder, filename)
+            channel_status = get_channel_info(YT_GOOGLE_DEV_API_KEY, CHANNEL_URL, youtube_data_folder, filename)
+            if checkpoint and video_status and channel_status:
+                checkpoint.mark(video_id, "enriched")
+        check_status = check_and_delete_invalid_file(os.path.join(youtube_data_folder, filename), min_likes, min_followers)
+    except Exception as e:
+        if not checkpoint:
+            raise
+        checkpoint.quarantine(video_id, youtube_data_folder, e)
+        return False
+    logging.info(f"Process of video {video_id} concluded. Check status: {str(check_status)} / Video status: {str(video_status)} / Channel status: {str(channel_status)}")
+    return bool(video_status and channel_status and check_status)
 
 
 def check_and_delete_invalid_file(file_path, min_likes, min_followers):
@@ -111,12 +167,12 @@ def check_and_delete_invalid_file(file_path, min_likes, min_followers):
             with open(file_path, 'r', encoding='utf-8') as file:
                 data = json_module.load(file)
             
-            # Extract and convert values
-            likes = int(data.get("likes", 0)) if data.get("likes") and data.get("likes").isdigit() else 0
-            subscribers = int(data.get("subscribers", 0)) if data.get("subscribers") and data.get("subscribers").isdigit() else 0
+            # Metrics are normalized to int/None at ingestion
+            likes = data.get("likes") or 0
+            subscribers = data.get("subscribers") or 0
 
             # Check conditions
-            if likes < min_likes or subscribers < min_followers:
+            if not meets_thresholds(data, min_likes, min_followers):
                 logging.info(f"Deleting {file_path}: Likes ({likes}) or Subscribers ({subscribers}) below minimum.")
                 os.remove(file_path)  # Uncomment this line to delete the file
                 return False
@@ -129,7 +185,94 @@ def check_and_delete_invalid_file(file_path, min_likes, min_followers):
     else:
         logging.info(f"Invalid file path: {file_path}")
 
-def video_search(API_KEY, SEARCH_URL, topic, specific_words, published_after, published_before, youtube_data_folder, max_results=YT_MAX_RESULTS):
+def resolve_search_window(start_date=None, end_date=None):
+    """
+    Return the (start, end) search window as timezone-aware UTC datetimes.
+    Dates may be datetimes, dates or ISO 8601 strings; a missing start defaults
+    to 5 years ago and a missing end to 1 week ago, or to now for a start within
+    the last week.
+
+    Raises:
+        ValueError: If the start is not before the end (e.g. a start in the future)
+    """
+    now_utc = datetime.datetime.now(datetime.timezone.utc)
+    start = _to_utc_datetime(start_date) if start_date else now_utc - relativedelta(years=5)
+    if end_date:
+        end = _to_utc_datetime(end_date, end_of_day=True)
+    else:
+        end = now_utc - datetime.timedelta(weeks=1)
+        if start >= end:
+            end = now_utc
+    if start >= end:
+        raise ValueError(f"Search window start ({start}) must be before its end ({end})")
+    return start, end
+
+def _to_utc_datetime(value, end_of_day=False):
+    if isinstance(value, str):
+        # "YYYY-MM-DD" is a whole day, anything longer a precise timestamp
+        value = datetime.date.fromisoformat(value) if len(value) == 10 else isoparse(value)
+    if not isinstance(value, datetime.datetime):
+        # A plain date covers the whole day
+        value = datetime.datetime.combine(value, datetime.time.max if end_of_day else datetime.time.min)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+def split_search_window(start, end, shards):
+    """Split [start, end) into `shards` contiguous sub-windows of equal length."""
+    shards = max(1, int(shards))
+    step = (end - start) / shards
+    bounds = [start + step * index for index in range(shards)] + [end]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def sharded_video_search(API_KEY, SEARCH_URL, topic, specific_words, start_date, end_date, shards=None, max_results=YT_MAX_RESULTS):
+    """
+    Search every sub-window of [start_date, end_date) concurrently and merge the
+    results by video id, so the whole period is covered instead of only its newest videos.
+
+    max_results (default 10) bounds the whole search, not each window: every window asks
+    for its share of it, and the merged results are taken in turn from each window up to it.
+
+    Returns:
+        Dict of video_id -> video data, or None if every sub-window search was rejected
+    """
+    max_results = int(max_results or 10)
+    windows = split_search_window(start_date, end_date, min(shards or YT_SEARCH_SHARDS, max_results))
+    per_window = math.ceil(max_results / len(windows))
+    logging.info(f"Searching {len(windows)} date windows concurrently, {per_window} videos each")
+
+    with run_thread_pool(len(windows), thread_name_prefix="search") as executor:
+        shard_results = list(executor.map(
+            lambda window: video_search(
+                API_KEY, SEARCH_URL, topic, specific_words,
+                window[0].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                window[1].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                max_results=per_window
+            ),
+            windows
+        ))
+
+    if all(result is None for result in shard_results):
+        return None
+
+    return merge_window_results(shard_results, max_results)
+
+def merge_window_results(shard_results, max_results):
+    """Merge the results of the windows by video id, one video of each window in turn, up to max_results."""
+    queues = [list((result or {}).items()) for result in shard_results]
+    videos = {}
+    for rank in range(max((len(queue) for queue in queues), default=0)):
+        for queue in queues:
+            if rank < len(queue) and len(videos) < max_results:
+                video_id, video_data = queue[rank]
+                videos.setdefault(video_id, video_data)
+    return videos
+
+def video_search(API_KEY, SEARCH_URL, topic, specific_words, published_after, published_before, max_results=YT_MAX_RESULTS):
+    """
+    Search one date window. Returns a dict of video_id -> video data,
+    or None if the request failed or was rejected.
+    """
     # Construct search query 
     # at least one specific_word_query should be present if specific_words is not empty
     # topic must be present as well in the title or hashtag
@@ -142,7 +285,7 @@ def video_search(API_KEY, SEARCH_URL, topic, specific_words, published_after, pu
         "part": "snippet",
         "q": query,
         "type": "video",
-        "maxResults": 10,  
+        "maxResults": min(50, int(max_results or 10)),  # the API allows at most 50 per page
         "order": "date",
         "videoDuration": "short",
         "publishedAfter": published_after,
@@ -152,13 +295,15 @@ def video_search(API_KEY, SEARCH_URL, topic, specific_words, published_after, pu
     
     try:
         response = requests.get(SEARCH_URL, params=search_params)
-    except:
-        logging.info(f"Error in yt search response: {response}")
+    except requests.RequestException as e:
+        logging.info(f"Error in yt search request: {e}")
+        return None
     if response.status_code == 200:
         data = response.json()
+        videos = {}
         for item in data.get("items", []):
             video_id = item['id']['videoId']
-            video_data = {
+            videos[video_id] = {
                 "platform": "youtube",
                 "title": item["snippet"]["title"],
                 "description": item["snippet"].get("description", ""),
@@ -167,19 +312,14 @@ def video_search(API_KEY, SEARCH_URL, topic, specific_words, published_after, pu
                 "channel_id": item["snippet"]["channelId"],
                 "video_id": video_id
             }
-
-            video_filename = f'{youtube_data_folder}/{video_id}.json'
-            with open(video_filename, 'w') as file:
-                json_module.dump(video_data, file, indent=4)
-            logging.info(f"Data for video {video_id} saved to {video_filename}")
         
-        logging.info("Search completed successfully")
+        logging.info(f"Search of window {published_after} - {published_before} completed successfully: {len(videos)} videos")
 
-        return True
+        return videos
     
     else:
         logging.info("Search API request rejected!")
-        return False
+        return None
 
 def get_video_info(API_KEY, VIDEO_URL, data_folder, filename):
     video_id = filename.split('.')[0]
@@ -204,11 +344,11 @@ def get_video_info(API_KEY, VIDEO_URL, data_folder, filename):
         statistics = video_details.get("statistics", {})
         snippet = video_details.get("snippet", {})
 
-        views = statistics.get("viewCount", "None")
-        likes = statistics.get("likeCount", "None")
-        comments = statistics.get("commentCount", "None")
-        saves = statistics.get("favoriteCount", "None")
-        shares = "None"  # No shareCount in API response
+        views = to_count(statistics.get("viewCount"))
+        likes = to_count(statistics.get("likeCount"))
+        comments = to_count(statistics.get("commentCount"))
+        saves = to_count(statistics.get("favoriteCount"))
+        shares = None  # No shareCount in API response
         tags = snippet.get("tags", [])  # Returns a list of tags
         
         video_data.update({
@@ -230,6 +370,90 @@ def get_video_info(API_KEY, VIDEO_URL, data_folder, filename):
         logging.info("Video API request rejected!")
         return False
 
+def resolve_channels(API_KEY, CHANNEL_URL, data_folder, filenames, min_followers=0):
+    """
+    Add the channel statistics to every searched video before any video-level request,
+    and delete the videos of channels below min_followers.
+
+    Statistics come from the channel cache, and the missing channels are fetched in
+    batches of CHANNEL_BATCH_SIZE. A channel whose request failed is left to
+    get_channel_info, so its videos are kept; one the API did not return is recorded
+    as unresolvable and its videos are deleted, without a request per video.
+
+    Returns:
+        File names of the videos kept
+    """
+    videos = {}
+    for filename in filenames:
+        with open(os.path.join(data_folder, filename), 'r') as file:
+            videos[filename] = json_module.load(file)
+
+    cache = get_channel_cache()
+    channel_ids = {video.get("channel_id") for video in videos.values() if video.get("channel_id")}
+    channels = cache.get_many("youtube", channel_ids)
+    missing = sorted(channel_ids - channels.keys())
+    for start in range(0, len(missing), CHANNEL_BATCH_SIZE):
+        channels.update(fetch_channel_statistics(API_KEY, CHANNEL_URL, missing[start:start + CHANNEL_BATCH_SIZE]))
+    cache.save()
+    logging.info(f"Resolved {len(channels)} of {len(channel_ids)} channels, {len(missing)} requested")
+
+    kept = []
+    for filename, video in videos.items():
+        statistics = channels.get(video.get("channel_id"))
+        video_filepath = os.path.join(data_folder, filename)
+        if statistics is None and cache.unresolvable("youtube", video.get("channel_id")):
+            logging.info(f"Deleting {video_filepath}: channel {video['channel_id']} could not be resolved.")
+            os.remove(video_filepath)
+            continue
+        if statistics is None:
+            kept.append(filename)
+            continue
+        if (statistics["subscribers"] or 0) < min_followers:
+            logging.info(f"Deleting {video_filepath}: channel has {statistics['subscribers']} subscribers, below minimum.")
+            os.remove(video_filepath)
+            continue
+        video.update(statistics)
+        with open(video_filepath, 'w') as file:
+            json_module.dump(video, file, indent=4)
+        kept.append(filename)
+    return kept
+
+def fetch_channel_statistics(API_KEY, CHANNEL_URL, channel_ids):
+    """
+    Fetch the statistics of up to 50 channels in one request and store them in the channel cache.
+
+    Returns:
+        Dict of channel_id -> {"subscribers", "total_videos"} (empty if the request failed)
+    """
+    channel_details_params = {
+        "part": "statistics",
+        "id": ",".join(channel_ids),
+        "key": API_KEY
+    }
+    try:
+        channel_response = requests.get(CHANNEL_URL, params=channel_details_params)
+    except requests.RequestException as e:
+        logging.info(f"Error in yt channels request: {e}")
+        return {}
+    if channel_response.status_code != 200:
+        logging.info("Channels API request rejected!")
+        return {}
+
+    cache = get_channel_cache()
+    channels = {}
+    for item in channel_response.json().get("items", []):
+        statistics = item.get("statistics", {})
+        channels[item["id"]] = {
+            "subscribers": to_count(statistics.get("subscriberCount")),
+            "total_videos": to_count(statistics.get("videoCount")),
+        }
+        cache.put("youtube", item["id"], **channels[item["id"]])
+    # A channel missing from a successful response no longer exists
+    for channel_id in set(channel_ids) - channels.keys():
+        logging.info(f"Channel {channel_id} not returned by the channels API")
+        cache.put_unresolvable("youtube", channel_id)
+    return channels
+
 def get_channel_info(API_KEY, CHANNEL_URL, data_folder, filename):
     # Fetch the channel's subscriber count and total video count
     video_id = filename.split('.')[0]
@@ -237,6 +461,19 @@ def get_channel_info(API_KEY, CHANNEL_URL, data_folder, filename):
     with open(video_filepath, 'r') as file:
         video_data = json_module.load(file)
 
+    cache = get_channel_cache()
+    statistics = cache.get("youtube", video_data["channel_id"])
+    if statistics is not None:
+        if any(video_data.get(field) != value for field, value in statistics.items()):
+            video_data.update(statistics)
+            with open(video_filepath, 'w') as file:
+                json_module.dump(video_data, file, indent=4)
+        logging.info(f"Channel data for {video_id} taken from the channel cache")
+        return True
+    if cache.unresolvable("youtube", video_data["channel_id"]):
+        logging.info(f"Channel of {video_id} could not be resolved, video skipped")
+        return False
+
     channel_details_params = {
         "part": "statistics,contentDetails",
         "id": video_data["channel_id"],
@@ -246,10 +483,18 @@ def get_channel_info(API_KEY, CHANNEL_URL, data_folder, filename):
     channel_response = requests.get(CHANNEL_URL, params=channel_details_params)
     if channel_response.status_code == 200:
         channel_data = channel_response.json()
-        statistics = channel_data.get("items", [])[0]["statistics"]
+        items = channel_data.get("items") or []
+        if not items:
+            logging.info(f"Channel of {video_id} not returned by the channels API, video skipped")
+            cache.put_unresolvable("youtube", video_data["channel_id"])
+            cache.save()
+            return False
+        statistics = items[0].get("statistics", {})
         
-        subscribers = statistics.get("subscriberCount", "None")
-        total_videos = statistics.get("videoCount", "None")
+        subscribers = to_count(statistics.get("subscriberCount"))
+        total_videos = to_count(statistics.get("videoCount"))
+        cache.put("youtube", video_data["channel_id"], subscribers, total_videos)
+        cache.save()
 
         video_data.update({
             "subscribers": subscribers,  # Add subscriber count
@@ -1,13 +1,12 @@
 
-from dotenv import load_dotenv
 import streamlit as st
-import os
 
+from utils.config import configure
 from ui.sidebar import sidebar
 from ui.main import main_display
 from utils.session import initialize_session_state
 
-load_dotenv(override=True)
+configure()
 
 def main():
 
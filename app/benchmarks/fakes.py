@@ -0,0 +1,299 @@
+"""
+Local stand-ins for the external services used by the fetch pipeline:
+the YouTube Data API (HTTP server), yt-dlp, TikTokApi and the OpenAI client.
+
+Each fake has configurable latency, error rate and payload size so that the
+pipeline can be benchmarked offline without spending any quota.
+"""
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import re
+import struct
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+@dataclass
+class FakeServiceConfig:
+    """Behaviour shared by all fakes."""
+    n_videos: int = 10
+    latency: float = 0.01  # seconds per request
+    error_rate: float = 0.0  # probability of a failed request
+    description_chars: int = 500  # size of each video description
+    audio_seconds: float = 30.0  # duration of each synthetic audio fixture
+    segment_seconds: float = 5.0  # transcription segment length
+    seed: int = 0
+
+class FakeServiceError(Exception):
+    """Raised by the fake clients to simulate a failed request."""
+
+class _Behaviour:
+    """Latency and error injection, thread-safe."""
+
+    def __init__(self, config: FakeServiceConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.config.latency:
+            time.sleep(self.config.latency)
+
+    def fails(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.config.error_rate
+
+def synthetic_audio(seconds: float, sample_rate: int = 8000, frequency: float = 440.0) -> bytes:
+    """A mono 16-bit sine tone as WAV bytes, used as the downloaded audio fixture."""
+    n_samples = int(seconds * sample_rate)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"".join(
+            struct.pack("<h", int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate)))
+            for i in range(n_samples)
+        ))
+    return buffer.getvalue()
+
+def audio_duration(path: str) -> float:
+    """Duration in seconds of a synthetic audio fixture."""
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+def _video_id(index: int) -> str:
+    return f"vid{index:07d}"
+
+def _tiktok_video_id(index: int) -> str:
+    # Numeric like real TikTok ids, so they never collide with the YouTube ones in a multi-platform run
+    return str(7000000000000000000 + index)
+
+class FakeYouTubeServer:
+    """
+    Local HTTP server answering the search, videos and channels endpoints of
+    the YouTube Data API v3 with synthetic data.
+    The search endpoint returns config.n_videos results regardless of maxResults.
+    """
+
+    def __init__(self, config: FakeServiceConfig):
+        self.config = config
+        self.behaviour = _Behaviour(config)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/youtube/v3"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.behaviour.wait()
+                if server.behaviour.fails():
+                    self._send(500, {"error": {"message": "injected failure"}})
+                    return
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                endpoint = parsed.path.rsplit("/", 1)[-1]
+                if endpoint == "search":
+                    self._send(200, server.search(params))
+                elif endpoint == "videos":
+                    self._send(200, server.videos(params))
+                elif endpoint == "channels":
+                    self._send(200, server.channels(params))
+                else:
+                    self._send(404, {"error": {"message": "unknown endpoint"}})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def search(self, params):
+        description = "d" * self.config.description_chars
+        return {"items": [
+            {
+                "id": {"videoId": _video_id(index)},
+                "snippet": {
+                    "title": f"Synthetic video {index}",
+                    "description": description,
+                    "publishedAt": "2024-01-01T00:00:00Z",
+                    "channelTitle": f"Channel {index % 50}",
+                    "channelId": f"chan{index % 50:03d}",
+                },
+            }
+            for index in range(self.config.n_videos)
+        ]}
+
+    def videos(self, params):
+        ids = params.get("id", "").split(",")
+        return {"items": [
+            {
+                "id": video_id,
+                "statistics": {"viewCount": "1000", "likeCount": "100", "commentCount": "10", "favoriteCount": "0"},
+                "snippet": {"tags": ["synthetic", "benchmark"]},
+            }
+            for video_id in ids if video_id
+        ]}
+
+    def channels(self, params):
+        ids = params.get("id", "").split(",")
+        return {"items": [
+            {"id": channel_id, "statistics": {"subscriberCount": "5000", "videoCount": "100"}}
+            for channel_id in ids if channel_id
+        ]}
+
+def make_fake_youtube_dl(config: FakeServiceConfig):
+    """
+    Build a yt_dlp.YoutubeDL stand-in that writes a synthetic audio fixture
+    where the real downloader + FFmpegExtractAudio would leave its output.
+    """
+    behaviour = _Behaviour(config)
+    fixture = synthetic_audio(config.audio_seconds)
+
+    class FakeYoutubeDL:
+        def __init__(self, params=None):
+            self.params = params or {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def download(self, urls):
+            from yt_dlp.utils import DownloadError
+
+            behaviour.wait()
+            if behaviour.fails():
+                raise DownloadError("injected download failure")
+            # The source "downloads" as webm and is converted to mp3, like yt-dlp's
+            # replace_extension: a matching extension is swapped, any other is appended to
+            video_id = re.split(r"[=/]", urls[0].rstrip("/"))[-1]
+            outtmpl = self.params.get("outtmpl", "%(id)s.%(ext)s")
+            downloaded = os.path.join(
+                self.params.get("paths", {}).get("home", ""),
+                outtmpl.replace("%(id)s", video_id).replace("%(ext)s", "webm")
+            )
+            root, ext = os.path.splitext(downloaded)
+            output = root + ".mp3" if ext == ".webm" else downloaded + ".mp3"
+            with open(output, "wb") as file:
+                file.write(fixture)
+            for hook in self.params.get("post_hooks", []):
+                hook(output)
+            return 0
+
+        def close(self):
+            pass
+
+    return FakeYoutubeDL
+
+class FakeOpenAIClient:
+    """Stand-in for openai.OpenAI covering audio.transcriptions and chat.completions."""
+
+    def __init__(self, config: FakeServiceConfig):
+        self.config = config
+        self.behaviour = _Behaviour(config)
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcribe))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+        self.models = SimpleNamespace(list=lambda: [])
+
+    def _transcribe(self, file, model=None, **kwargs):
+        self.behaviour.wait()
+        if self.behaviour.fails():
+            raise FakeServiceError("injected transcription failure")
+        duration = audio_duration(file.name)
+        n_segments = max(1, math.ceil(duration / self.config.segment_seconds))
+        segments = [
+            SimpleNamespace(
+                id=index,
+                start=index * self.config.segment_seconds,
+                end=min(duration, (index + 1) * self.config.segment_seconds),
+                text=f" Synthetic segment {index} about the topic.",
+            )
+            for index in range(n_segments)
+        ]
+        return SimpleNamespace(segments=segments, duration=duration, text="".join(s.text for s in segments))
+
+    def _complete(self, model=None, messages=None, **kwargs):
+        self.behaviour.wait()
+        if self.behaviour.fails():
+            raise FakeServiceError("injected completion failure")
+        prompt = messages[-1]["content"] if messages else ""
+        content = json.dumps({"choice": "neutral", "main": [0, 1], "analysis": "Synthetic analysis."})
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=usage,
+        )
+
+def make_fake_tiktok_api(config: FakeServiceConfig):
+    """Build a TikTokApi stand-in whose hashtag feed yields synthetic videos."""
+    behaviour = _Behaviour(config)
+    description = "d" * config.description_chars
+
+    class FakeVideo:
+        def __init__(self, index):
+            self.as_dict = {
+                "id": _tiktok_video_id(index),
+                "desc": description,
+                "createTime": 1704067200,
+                "author": {"uniqueId": f"user{index % 50:03d}", "nickname": f"User {index % 50}"},
+                "stats": {"playCount": 1000, "diggCount": 100, "commentCount": 10, "shareCount": 5, "collectCount": 1},
+                "textExtra": [{"type": 1, "hashtagName": "synthetic"}],
+                "authorStats": {"followerCount": 5000, "videoCount": 100},
+            }
+
+    class FakeHashtag:
+        def __init__(self, name):
+            self.name = name
+
+        async def videos(self, count=30, timeout=None):
+            for index in range(min(count, config.n_videos)):
+                await asyncio.sleep(config.latency)
+                yield FakeVideo(index)
+
+    class FakeTikTokApi:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def create_sessions(self, **kwargs):
+            await asyncio.sleep(config.latency)
+            if behaviour.fails():
+                raise FakeServiceError("injected session failure")
+
+        def hashtag(self, name):
+            return FakeHashtag(name)
+
+    return FakeTikTokApi
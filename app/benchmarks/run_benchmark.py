@@ -0,0 +1,237 @@
+"""
+Offline end-to-end benchmark of fetch_social_media_data.
+
+Drives the full pipeline against the local fakes in benchmarks/fakes.py and
+reports per-stage throughput, latency percentiles and peak memory.
+
+Usage (from the app folder):
+    python -m benchmarks.run_benchmark --sizes 10 100 1000 --platforms YouTube TikTok
+"""
+import argparse
+import contextlib
+import inspect
+import io
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+from benchmarks.fakes import (
+    FakeOpenAIClient,
+    FakeServiceConfig,
+    FakeYouTubeServer,
+    make_fake_tiktok_api,
+    make_fake_youtube_dl,
+)
+
+# (stage name, module, attribute) of every instrumented pipeline stage.
+# The attribute is patched where it is looked up, i.e. in the calling module.
+STAGES = [
+    ("search", "analytics.youtube", "video_search"),
+    ("video_info", "analytics.youtube", "get_video_info"),
+    ("channels", "analytics.youtube", "fetch_channel_statistics"),
+    ("channel_info", "analytics.youtube", "get_channel_info"),
+    ("tiktok_feed", "analytics.tiktok", "fetch_tiktok_videos"),
+    ("download", "analytics.transcript", "download_audio"),
+    ("transcription", "analytics.transcription_backends", "transcribe_audio_openAI"),
+    ("llm_analysis", "analytics.analysis", "send_to_chatgpt"),
+    ("json_load", "analytics.data_fetcher", "load_json_data"),
+    ("json_update", "analytics.data_fetcher", "update_json_files"),
+    ("search_index", "analytics.data_fetcher", "_index_for_search"),
+]
+
+class StageRecorder:
+    """Collects wall-clock durations of every call to the instrumented stages."""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.durations[stage].append(seconds)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            async def async_timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            return async_timed
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def summarize_stages(recorder: StageRecorder) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for stage, _, _ in STAGES:
+        durations = recorder.durations.get(stage)
+        if not durations:
+            continue
+        total = sum(durations)
+        summary[stage] = {
+            "calls": len(durations),
+            "total_s": total,
+            "throughput_per_s": len(durations) / total if total else float("inf"),
+            "p50_ms": _percentile(durations, 50) * 1000,
+            "p95_ms": _percentile(durations, 95) * 1000,
+            "p99_ms": _percentile(durations, 99) * 1000,
+        }
+    return summary
+
+@contextlib.contextmanager
+def offline_services(config: FakeServiceConfig, recorder: StageRecorder, dedup: bool = False):
+    """Point every external dependency of the pipeline at the local fakes."""
+    import importlib
+    from analytics import data_fetcher, tiktok, youtube
+
+    with FakeYouTubeServer(config) as server, contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(youtube, "SEARCH_URL", f"{server.base_url}/search"))
+        stack.enter_context(mock.patch.object(youtube, "VIDEO_URL", f"{server.base_url}/videos"))
+        stack.enter_context(mock.patch.object(youtube, "CHANNEL_URL", f"{server.base_url}/channels"))
+        stack.enter_context(mock.patch("yt_dlp.YoutubeDL", make_fake_youtube_dl(config)))
+        stack.enter_context(mock.patch.object(tiktok, "TikTokApi", make_fake_tiktok_api(config)))
+        stack.enter_context(mock.patch.object(tiktok, "TIKTOK_MAX_RESULTS", config.n_videos))
+        stack.enter_context(mock.patch.object(data_fetcher, "LLM_REQUEST_DELAY", 0))
+        # Synthetic videos share ids and transcripts across runs, so dedup would skip the work being measured
+        stack.enter_context(mock.patch.object(data_fetcher, "DEDUP_ENABLED", dedup))
+
+        for stage, module_name, attribute in STAGES:
+            module = importlib.import_module(module_name)
+            original = getattr(module, attribute, None)
+            if original is None:
+                print(f"warning: stage {stage} ({module_name}.{attribute}) not found, skipping")
+                continue
+            stack.enter_context(mock.patch.object(module, attribute, recorder.wrap(stage, original)))
+
+        # Every run must compute, not hit the cross-session result cache
+        data_fetcher._RESULT_CACHE.invalidate()
+        yield FakeOpenAIClient(config)
+
+def run_once(platform: str, config: FakeServiceConfig, trace_memory: bool = True, dedup: bool = False) -> Dict[str, Any]:
+    """Run one end-to-end fetch against the fakes and return its measurements."""
+    from analytics.data_fetcher import fetch_social_media_data
+    from analytics.progress import FetchProgress
+
+    recorder = StageRecorder()
+    error = None
+    items = []
+    with offline_services(config, recorder, dedup) as client:
+        if trace_memory:
+            tracemalloc.start()
+        # Created with the fetch, so the time to first result leaves out the fixtures' setup
+        progress = FetchProgress()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):  # keep pipeline prints out of the report
+                items = fetch_social_media_data(
+                    topic=f"benchmark-{platform}-{config.n_videos}",
+                    client=client,
+                    platform=platform,
+                    start_date=None,
+                    end_date=None,
+                    min_likes=0,
+                    min_followers=0,
+                    specific_words="",
+                    political_perspective="benchmark perspective",
+                    progress=progress,
+                ).items
+        except Exception as e:
+            error = repr(e)
+        wall = time.perf_counter() - start
+        peak_traced = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {
+        "platform": platform,
+        "videos": config.n_videos,
+        "results": len(items),
+        "error": error,
+        "wall_s": wall,
+        "first_result_s": progress.time_to_first_result,
+        "videos_per_s": len(items) / wall if wall else 0.0,
+        "peak_traced_mb": peak_traced / 2**20 if peak_traced is not None else None,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": summarize_stages(recorder),
+    }
+
+def print_report(run: Dict[str, Any]):
+    print(f"\n=== {run['platform']} / {run['videos']} videos ===")
+    print(f"results: {run['results']}  wall: {run['wall_s']:.2f}s  throughput: {run['videos_per_s']:.2f} videos/s")
+    if run["first_result_s"] is not None:
+        print(f"time to first result: {run['first_result_s']:.2f}s")
+    if run["peak_traced_mb"] is not None:
+        print(f"peak traced memory: {run['peak_traced_mb']:.1f} MB  max RSS: {run['max_rss_mb']:.1f} MB")
+    if run["error"]:
+        print(f"run aborted: {run['error']}")
+    print(f"{'stage':<14}{'calls':>7}{'total s':>10}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in run["stages"].items():
+        print(
+            f"{stage:<14}{stats['calls']:>7}{stats['total_s']:>10.2f}{stats['throughput_per_s']:>10.1f}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the fetch pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Number of videos per run")
+    parser.add_argument("--platforms", nargs="+", default=["YouTube", "TikTok"], choices=["YouTube", "TikTok"])
+    parser.add_argument("--latency", type=float, default=0.01, help="Latency of every fake request (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a failed fake request")
+    parser.add_argument("--description-chars", type=int, default=500, help="Size of each video description")
+    parser.add_argument("--audio-seconds", type=float, default=30.0, help="Duration of each synthetic audio file")
+    parser.add_argument("--segment-seconds", type=float, default=5.0, help="Length of each transcription segment")
+    parser.add_argument("--no-trace-memory", action="store_true", help="Disable tracemalloc (lower overhead)")
+    parser.add_argument("--dedup", action="store_true", help="Enable re-upload deduplication during the runs")
+    parser.add_argument("--output", help="Write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    runs = []
+    # Runs write into ./data relative to the working directory, so keep them out of the real data folder
+    with tempfile.TemporaryDirectory(prefix="social-bench-") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for size in args.sizes:
+                for platform in args.platforms:
+                    config = FakeServiceConfig(
+                        n_videos=size,
+                        latency=args.latency,
+                        error_rate=args.error_rate,
+                        description_chars=args.description_chars,
+                        audio_seconds=args.audio_seconds,
+                        segment_seconds=args.segment_seconds,
+                    )
+                    run = run_once(platform, config, trace_memory=not args.no_trace_memory, dedup=args.dedup)
+                    print_report(run)
+                    runs.append(run)
+        finally:
+            os.chdir(cwd)
+
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(runs, file, indent=4)
+        print(f"\nMeasurements written to {output}")
+
+if __name__ == "__main__":
+    main()
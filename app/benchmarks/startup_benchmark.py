@@ -0,0 +1,112 @@
+"""
+Cold-start and rerun latency benchmark of the Streamlit app.
+
+Measures, in fresh interpreters, the import time of the UI entry modules and
+which heavy dependencies they pull in, then drives app.py with Streamlit's
+AppTest to time the first script run and subsequent reruns.
+
+Usage (from the app folder):
+    python -m benchmarks.startup_benchmark --imports 5 --reruns 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.run_benchmark import _percentile
+
+# Dependencies that must not be loaded until a fetch (or report) actually needs them
+HEAVY_MODULES = ["yt_dlp", "TikTokApi", "playwright", "openai", "requests", "dateutil", "pandas", "numpy"]
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import ui.sidebar, ui.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+def measure_imports(repeats: int) -> Dict[str, Any]:
+    """Import ui.sidebar and ui.main in `repeats` fresh interpreters."""
+    app_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples, loaded = [], []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE % HEAVY_MODULES],
+            cwd=app_folder, capture_output=True, text=True, check=True
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        samples.append(probe["seconds"])
+        loaded = probe["loaded"]
+    return {
+        "import_median_ms": statistics.median(samples) * 1000,
+        "import_min_ms": min(samples) * 1000,
+        "heavy_modules_loaded": loaded,
+    }
+
+def measure_reruns(reruns: int) -> Dict[str, Any]:
+    """Time the first run of app.py and its reruns, before and after an API key is validated."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file("app.py", default_timeout=60)
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+
+    def rerun_times() -> List[float]:
+        durations = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            app.run()
+            durations.append(time.perf_counter() - start)
+        return durations
+
+    logged_out = rerun_times()
+    # Past the key check, every rerun renders the form, the result views and the report
+    app.session_state["openai_api_key"] = "sk-benchmark"
+    app.session_state["api_key_valid"] = True
+    # The first validated run loads the OpenAI client and the report's dependencies
+    start = time.perf_counter()
+    app.run()
+    first_validated_run = time.perf_counter() - start
+    logged_in = rerun_times()
+
+    return {
+        "first_run_ms": first_run * 1000,
+        "rerun_p50_ms": _percentile(logged_out, 50) * 1000,
+        "rerun_p95_ms": _percentile(logged_out, 95) * 1000,
+        "first_validated_run_ms": first_validated_run * 1000,
+        "validated_rerun_p50_ms": _percentile(logged_in, 50) * 1000,
+        "validated_rerun_p95_ms": _percentile(logged_in, 95) * 1000,
+        "exceptions": [str(exception.value) for exception in app.exception],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start and rerun latency benchmark of the Streamlit app.")
+    parser.add_argument("--imports", type=int, default=5, help="Fresh interpreters used to time the imports")
+    parser.add_argument("--reruns", type=int, default=20, help="Reruns timed per session state")
+    parser.add_argument("--output", help="Write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    results = {**measure_imports(args.imports), **measure_reruns(args.reruns)}
+
+    print(f"import ui (median):      {results['import_median_ms']:.0f} ms (min {results['import_min_ms']:.0f} ms)")
+    print(f"heavy modules at import: {', '.join(results['heavy_modules_loaded']) or 'none'}")
+    print(f"first script run:        {results['first_run_ms']:.0f} ms")
+    print(f"rerun p50 / p95:         {results['rerun_p50_ms']:.1f} / {results['rerun_p95_ms']:.1f} ms")
+    print(f"first validated run:     {results['first_validated_run_ms']:.0f} ms")
+    print(f"validated rerun p50/p95: {results['validated_rerun_p50_ms']:.1f} / {results['validated_rerun_p95_ms']:.1f} ms")
+    for exception in results["exceptions"]:
+        print(f"app raised: {exception}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+        print(f"\nMeasurements written to {args.output}")
+
+if __name__ == "__main__":
+    main()
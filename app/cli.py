@@ -0,0 +1,111 @@
+"""
+Headless batch runner: executes many fetch queries without Streamlit.
+
+The jobs file is JSON Lines or CSV with the fields of FetchQuery:
+    topic, platform, political_perspective, specific_words, min_likes,
+    min_followers, start_date, end_date, transcription_backend
+platform is "TikTok", "YouTube" or both, as a JSON list or comma separated.
+
+Usage (from the app folder):
+    python cli.py jobs.jsonl --output results.jsonl --concurrency 4
+    python cli.py --resume ./data/runs/<run id> --output results.jsonl
+    python cli.py --resume ./data/archive/<run id>.runarc   # restores an archived run, then resumes it
+    python cli.py jobs.jsonl --profile   # saves profile.folded/profile.json in each run folder
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, fields
+import argparse
+import logging
+import json
+import csv
+import os
+import sys
+from typing import Any, Dict, List
+
+from analytics.data_fetcher import FetchQuery, FetchResult, run_query, resume_run
+from utils.auth import get_shared_openai_client
+from utils.config import configure
+
+configure()
+
+INT_FIELDS = {"min_likes", "min_followers"}
+
+def load_jobs(path: str) -> List[FetchQuery]:
+    """Read FetchQuery jobs from a .jsonl/.json (one object per line) or .csv file."""
+    known = {field.name for field in fields(FetchQuery)}
+    with open(path, "r", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(file))
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+
+    jobs = []
+    for row in rows:
+        values = {key: value for key, value in row.items() if key in known and value not in (None, "")}
+        for key in INT_FIELDS & values.keys():
+            values[key] = int(values[key])
+        jobs.append(FetchQuery(**values))
+    return jobs
+
+def _job_entry(query: Dict[str, Any], result: FetchResult) -> Dict[str, Any]:
+    return {
+        "query": query,
+        "data_folder": result.data_folder,
+        "items": result.items,
+        "quarantined": result.quarantined,
+        "usage": result.usage,
+        "profile": result.profile,
+        "error": None,
+    }
+
+def run_job(query: FetchQuery, client, profile: bool = False) -> Dict[str, Any]:
+    """Run one job, turning failures into an error entry so the batch keeps going."""
+    logging.info(f"CLI job started: {query}")
+    try:
+        return _job_entry(asdict(query), run_query(query, client, profile))
+    except Exception as e:
+        logging.error(f"CLI job failed: {query}: {e}")
+        return {"query": asdict(query), "data_folder": None, "items": [], "quarantined": {}, "usage": None, "profile": None, "error": f"{type(e).__name__}: {e}"}
+
+def resume_job(run_folder: str, client, profile: bool = False) -> Dict[str, Any]:
+    """Resume a checkpointed run, turning failures into an error entry like run_job."""
+    logging.info(f"CLI resume started: {run_folder}")
+    try:
+        return _job_entry({"resume": run_folder}, resume_run(run_folder, client, profile=profile))
+    except Exception as e:
+        logging.error(f"CLI resume failed: {run_folder}: {e}")
+        return {"query": {"resume": run_folder}, "data_folder": None, "items": [], "quarantined": {}, "usage": None, "profile": None, "error": f"{type(e).__name__}: {e}"}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run fetch queries in batch without Streamlit.")
+    parser.add_argument("jobs", nargs="?", help="Jobs file (.jsonl or .csv)")
+    parser.add_argument("--resume", nargs="+", default=[], metavar="RUN_FOLDER", help="Resume these checkpointed runs (run folders, or archives of pruned runs)")
+    parser.add_argument("--output", default="results.jsonl", help="Results file, one JSON object per job")
+    parser.add_argument("--concurrency", type=int, default=2, help="Maximum number of jobs running at once")
+    parser.add_argument("--profile", action="store_true", help="Profile every run (profile.folded and profile.json in its run folder)")
+    parser.add_argument("--api-key", default=os.getenv("OPENAI_KEY"), help="OpenAI API key (default: OPENAI_KEY)")
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("No OpenAI API key: pass --api-key or set OPENAI_KEY")
+    if not args.jobs and not args.resume:
+        parser.error("Nothing to do: pass a jobs file and/or --resume")
+
+    jobs = load_jobs(args.jobs) if args.jobs else []
+    # One pooled client for all jobs; identical jobs are coalesced by the shared result cache
+    client = get_shared_openai_client(args.api_key)
+
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        resumed = executor.map(lambda run_folder: resume_job(run_folder, client, args.profile), args.resume)
+        started = executor.map(lambda query: run_job(query, client, args.profile), jobs)
+        results = list(resumed) + list(started)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        file.writelines(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+
+    failed = sum(1 for result in results if result["error"])
+    print(f"{len(results) - failed}/{len(results)} jobs succeeded, results written to {args.output}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
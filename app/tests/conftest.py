@@ -0,0 +1,54 @@
+import contextlib
+import json
+import os
+import sys
+
+import pytest
+
+# The app's modules are imported from the app folder (e.g. "from analytics.archive import ...")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def isolated_data(tmp_path, monkeypatch):
+    """Run every test in its own folder, so the ./data/... defaults never touch the app's data."""
+    monkeypatch.chdir(tmp_path)
+    from analytics import budget, channel_cache
+    monkeypatch.setattr(channel_cache, "_CACHE", None)
+    monkeypatch.setattr(budget, "_LEDGER", None)
+
+@pytest.fixture
+def offline():
+    """Start the benchmark fakes in place of the pipeline's external services: offline(n_videos=...) -> (client, stage recorder)."""
+    from benchmarks.fakes import FakeServiceConfig
+    from benchmarks.run_benchmark import StageRecorder, offline_services
+
+    with contextlib.ExitStack() as stack:
+        def start(**config):
+            recorder = StageRecorder()
+            client = stack.enter_context(offline_services(FakeServiceConfig(latency=0, **config), recorder))
+            return client, recorder
+
+        yield start
+
+@pytest.fixture
+def make_run(tmp_path):
+    """Create a run folder with the given videos: make_run("run-1", {"youtubeData": [item, ...]})."""
+
+    def make(name, videos, checkpoint=None):
+        run_folder = tmp_path / "runs" / name
+        for folder, items in videos.items():
+            (run_folder / folder).mkdir(parents=True, exist_ok=True)
+            for item in items:
+                (run_folder / folder / f"{item['video_id']}.json").write_text(json.dumps(item), encoding="utf-8")
+        run_folder.mkdir(parents=True, exist_ok=True)
+        if checkpoint is not None:
+            (run_folder / "checkpoint.json").write_text(json.dumps(checkpoint), encoding="utf-8")
+        return str(run_folder)
+
+    return make
+
+def age(path, hours):
+    """Set a file's or folder's mtime to hours ago."""
+    import time
+    stamp = time.time() - hours * 3600
+    os.utime(path, (stamp, stamp))
@@ -0,0 +1,63 @@
+import json
+import shutil
+
+from analytics import aggregate
+from analytics.aggregate import AnalysisAggregator
+from analytics.archive import archive_run
+from utils.utilities import update_json_files
+
+def _video(video_id, choice, channel="Channel"):
+    return {
+        "platform": "youtube", "video_id": video_id, "channel": channel, "published_at": "2025-01-06T00:00:00Z",
+        "views": 100, "likes": 10, "comments": 1, "tags": ["news"],
+        "political_perspective": "left", "llm_analysis": json.dumps({"choice": choice, "main": [], "analysis": ""}),
+    }
+
+def _aggregator(tmp_path):
+    return AnalysisAggregator(str(tmp_path / "runs"), str(tmp_path / "archive"))
+
+def test_frame_reads_runs_and_archives_of_pruned_runs(tmp_path, make_run):
+    make_run("run-new", {"youtubeData": [_video("a", "positive")]}, {"query": None, "searched": [], "videos": {}})
+    old = make_run("run-old", {"youtubeData": [_video("b", "negative"), _video("c", "neutral")]})
+    archive_run(old, str(tmp_path / "archive"))
+    shutil.rmtree(old)
+
+    frame = _aggregator(tmp_path).frame()
+
+    assert sorted(frame["video_id"]) == ["a", "b", "c"]
+    assert dict(zip(frame["video_id"], frame["choice"]))["b"] == "negative"
+
+def test_restored_run_is_read_once(tmp_path, make_run):
+    run_folder = make_run("run-1", {"youtubeData": [_video("a", "positive")]})
+    archive_run(run_folder, str(tmp_path / "archive"))
+    assert len(_aggregator(tmp_path).frame()) == 1
+
+def test_frame_is_cached_until_the_store_changes(tmp_path, make_run, monkeypatch):
+    run_folder = make_run("run-1", {"youtubeData": [_video("a", "positive")]})
+    aggregator = _aggregator(tmp_path)
+    loads = []
+    run_rows = aggregate._run_rows
+    monkeypatch.setattr(aggregate, "_run_rows", lambda folder: loads.append(folder) or run_rows(folder))
+
+    aggregator.frame()
+    aggregator.frame()
+    assert len(loads) == 1
+
+    update_json_files([_video("a", "negative")], f"{run_folder}/youtubeData")
+    assert aggregator.frame()["choice"].tolist() == ["negative"]
+    assert len(loads) == 2
+
+    make_run("run-2", {"youtubeData": [_video("b", "neutral")]})
+    assert sorted(aggregator.frame()["video_id"]) == ["a", "b"]
+
+def test_stance_summaries(tmp_path, make_run):
+    make_run("run-1", {"youtubeData": [
+        _video("a", "positive", "One"), _video("b", "negative", "One"), _video("c", "positive", "Two"),
+    ]})
+    aggregator = _aggregator(tmp_path)
+
+    by_channel = aggregator.stance_by_channel("left")
+    assert by_channel.loc["One", "total"] == 2 and by_channel.loc["Two", "positive"] == 1
+    weighted = aggregator.engagement_weighted_sentiment("channel", "left")
+    assert weighted.loc["One", "weighted_sentiment"] == 0.0
+    assert weighted.loc["Two", "weighted_sentiment"] == 1.0
@@ -0,0 +1,47 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from analytics.analysis import request_analysis, send_to_chatgpt
+from analytics.budget import BudgetGovernor, KeyLedger
+
+class FakeClient:
+    """Chat client answering with a fixed analysis, failing the requests whose prompt contains `fail_on`."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, temperature, max_tokens):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            raise ConnectionError("rate limited")
+        content = json.dumps({"choice": "support", "main": [1], "analysis": "ok"})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+def _post(chunks):
+    return {
+        "video_id": "v1", "title": "title", "description": "",
+        "transcription": [{"segment_number": number, "transcription": f"segment {number} " + "word " * 200} for number in range(1, chunks + 1)],
+    }
+
+def test_failed_request_raises_and_releases_its_reservation():
+    governor = BudgetGovernor(None, "key", run_limit=1.0, key_limit=0, ledger=KeyLedger("ledger.db"))
+    with pytest.raises(ConnectionError):
+        send_to_chatgpt("prompt", FakeClient(fail_on="prompt"), governor=governor)
+    assert governor.pressure() == 0
+
+def test_windowed_analysis_raises_the_failed_window_error():
+    client = FakeClient(fail_on="segment 3 ")
+    with pytest.raises(ConnectionError):
+        request_analysis(_post(6), ["left"], client, "gpt-4o", budget=1200)
+    assert any("segment 3 " in prompt for prompt in client.prompts)
+
+def test_windowed_analysis_merges_the_windows():
+    client = FakeClient()
+    analysis = request_analysis(_post(6), ["left"], client, "gpt-4o", budget=1200)
+    assert len(client.prompts) > 1
+    assert json.loads(analysis["left"])["choice"] == "support"
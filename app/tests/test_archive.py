@@ -0,0 +1,73 @@
+import json
+import os
+
+from analytics.archive import (
+    RunArchive, archive_run, archive_expired_runs, list_archives, restore_run, verify_archive, archive_path_of
+)
+from utils.utilities import prune_run_folders
+from conftest import age
+
+VIDEO = {
+    "platform": "youtube", "video_id": "abc", "title": "A video", "published_at": "2025-01-01T00:00:00Z",
+    "transcription": [{"segment_number": 1, "transcription": "hello"}, {"segment_number": 2, "transcription": "world"}],
+    "segment_index": {"1": 0, "2": 1}, "chatgpt_question": "prompt",
+}
+CHECKPOINT = {"query": {"topic": "t"}, "searched": ["YouTube"], "videos": {"abc": ["searched"]}}
+
+def test_round_trip(tmp_path, make_run):
+    run_folder = make_run("run-1", {"youtubeData": [VIDEO, dict(VIDEO, video_id="def")]}, CHECKPOINT)
+    path = archive_run(run_folder, str(tmp_path / "archive"))
+
+    with RunArchive(path) as archive:
+        assert archive.run_id == "run-1"
+        assert set(archive.videos()) == {"youtube:abc", "youtube:def"}
+        video = archive.load_video("youtube", "abc")
+        assert "chatgpt_question" not in video
+        assert video["segment_index"] == {"1": 0, "2": 1}
+        assert archive.load_file("checkpoint.json") == CHECKPOINT
+        assert archive.load_video("youtube", "missing") is None
+    assert verify_archive(path, run_folder)
+
+    restored = restore_run(path, str(tmp_path / "restored"))
+    with open(os.path.join(restored, "youtubeData", "def.json"), encoding="utf-8") as file:
+        assert json.load(file)["video_id"] == "def"
+    assert os.path.exists(os.path.join(restored, "checkpoint.json"))
+    assert list_archives(str(tmp_path / "archive")) == [path]
+
+def test_verify_fails_when_the_run_changed(tmp_path, make_run):
+    run_folder = make_run("run-1", {"youtubeData": [VIDEO]}, CHECKPOINT)
+    path = archive_run(run_folder, str(tmp_path / "archive"))
+    with open(os.path.join(run_folder, "youtubeData", "new.json"), "w", encoding="utf-8") as file:
+        json.dump(dict(VIDEO, video_id="new"), file)
+    assert not verify_archive(path, run_folder)
+
+def test_only_verified_runs_are_pruned(tmp_path, make_run):
+    archive_folder = str(tmp_path / "archive")
+    good = make_run("run-good", {"youtubeData": [VIDEO]}, CHECKPOINT)
+    bad = make_run("run-bad", {"youtubeData": [VIDEO]}, CHECKPOINT)
+    # An unreadable video cannot be archived, so its run must survive the pruning
+    with open(os.path.join(bad, "youtubeData", "broken.json"), "w", encoding="utf-8") as file:
+        file.write("{not json")
+    fresh = make_run("run-fresh", {"youtubeData": [VIDEO]})
+    for folder in (good, bad):
+        age(folder, 48)
+
+    archived = archive_expired_runs(str(tmp_path / "runs"), 24, archive_folder)
+    assert archived == [good]
+    prune_run_folders(str(tmp_path / "runs"), 24, only=archived)
+
+    assert not os.path.exists(good)
+    assert os.path.exists(bad) and os.path.exists(fresh)
+    assert os.path.exists(archive_path_of(good, archive_folder))
+    assert not [name for name in os.listdir(archive_folder) if name.endswith(".tmp")]
+
+def test_up_to_date_archive_is_not_rewritten(tmp_path, make_run):
+    archive_folder = str(tmp_path / "archive")
+    run_folder = make_run("run-1", {"youtubeData": [VIDEO]}, CHECKPOINT)
+    age(run_folder, 48)
+    path = archive_run(run_folder, archive_folder)
+    written = os.path.getmtime(path)
+    age(path, 1)
+
+    assert archive_expired_runs(str(tmp_path / "runs"), 24, archive_folder) == [run_folder]
+    assert os.path.getmtime(path) < written
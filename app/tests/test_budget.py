@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+
+import pytest
+
+from analytics import budget
+from analytics.budget import BudgetExceeded, BudgetGovernor, KeyLedger
+
+def test_hard_run_limit_refuses_the_call(tmp_path):
+    governor = BudgetGovernor(str(tmp_path), "key", run_limit=1.0, key_limit=0, mode="hard", ledger=KeyLedger("ledger.db"))
+    reserved = governor.reserve("analysis", 0.6)
+    with pytest.raises(BudgetExceeded):
+        governor.reserve("analysis", 0.6)
+
+    governor.record("analysis", reserved, 0.5, prompt_tokens=100, completion_tokens=10)
+    assert governor.spent == pytest.approx(0.5)
+    governor.check()
+    governor.reserve("analysis", 0.5)
+    with pytest.raises(BudgetExceeded):
+        governor.check()
+
+    governor.save()
+    usage = json.loads((tmp_path / budget.USAGE_FILENAME).read_text())
+    assert usage["exceeded"] == 1 and usage["stages"]["analysis"]["prompt_tokens"] == 100
+
+def test_soft_limit_only_logs(tmp_path):
+    governor = BudgetGovernor(None, "key", run_limit=1.0, key_limit=0, mode="soft", ledger=KeyLedger("ledger.db"))
+    governor.reserve("transcription", 2.0)
+    assert governor.pressure() == pytest.approx(2.0)
+    assert governor.report()["exceeded"] == 1
+
+def test_prompt_budget_shrinks_under_pressure():
+    governor = BudgetGovernor(None, "key", run_limit=1.0, key_limit=0, ledger=KeyLedger("ledger.db"))
+    assert governor.prompt_budget(10000) == 10000
+    governor.reserve("analysis", 0.95)
+    assert budget.BUDGET_MIN_PROMPT_TOKENS <= governor.prompt_budget(10000) < 10000
+
+def test_key_limit_is_shared_by_ledgers_of_the_same_store():
+    # Two processes open their own ledger on the same database
+    first = BudgetGovernor(None, "key", run_limit=0, key_limit=1.0, ledger=KeyLedger("ledger.db"))
+    second = BudgetGovernor(None, "key", run_limit=0, key_limit=1.0, ledger=KeyLedger("ledger.db"))
+
+    reserved = first.reserve("analysis", 0.7)
+    with pytest.raises(BudgetExceeded):
+        second.reserve("analysis", 0.5)
+
+    first.release(reserved)
+    reserved = second.reserve("analysis", 0.5)
+    second.record("analysis", reserved, 0.4)
+    assert first.ledger.spent_today(first.key_id) == pytest.approx(0.4)
+    assert first.pressure() == pytest.approx(0.4)
+
+    # Another key has its own limit
+    other = BudgetGovernor(None, "other key", run_limit=0, key_limit=1.0, ledger=KeyLedger("ledger.db"))
+    other.reserve("analysis", 0.9)
+
+def test_stale_reservations_expire(monkeypatch):
+    ledger = KeyLedger("ledger.db")
+    ledger.reserve("key", 0.9, limit=1.0)
+    assert ledger.committed_today("key") == pytest.approx(0.9)
+    monkeypatch.setattr(budget, "BUDGET_RESERVATION_TTL_SECONDS", -1)
+    assert ledger.committed_today("key") == 0
+    assert ledger.reserve("key", 0.9, limit=1.0)[0] is not None
+
+def test_concurrent_ledgers_do_not_lose_spending():
+    # One connection each, as separate processes would have: only SQLite's locking keeps the totals
+    def spend():
+        ledger = KeyLedger("ledger.db")
+        for _ in range(25):
+            reservation_id, _ = ledger.reserve("key", 0.01)
+            ledger.add("key", "analysis", 0.01, {"prompt_tokens": 1}, reservation_id=reservation_id)
+
+    threads = [threading.Thread(target=spend) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ledger = KeyLedger("ledger.db")
+    assert ledger.spent_today("key") == pytest.approx(1.0)
+    assert ledger.committed_today("key") == pytest.approx(1.0)
+
+def test_legacy_json_ledger_is_imported():
+    os.makedirs(os.path.dirname(budget.LEGACY_KEY_USAGE_PATH))
+    day = KeyLedger._today()
+    with open(budget.LEGACY_KEY_USAGE_PATH, 'w', encoding='utf-8') as file:
+        json.dump({"key": {day: {"cost": 0.25, "calls": 3, "stages": {"analysis": 0.25}}}}, file)
+
+    ledger = KeyLedger()
+    assert ledger.spent_today("key") == pytest.approx(0.25)
+    assert os.path.exists(budget.LEGACY_KEY_USAGE_PATH + ".imported")
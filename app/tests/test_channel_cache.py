@@ -0,0 +1,84 @@
+import json
+import time
+
+from analytics.channel_cache import ChannelCache
+
+def test_entries_expire_and_are_dropped_on_save():
+    cache = ChannelCache("channels.json", ttl=60)
+    cache.put("youtube", "fresh", 5000, 10)
+    cache.put("youtube", "", 1, 1)
+    cache.put("youtube", "stale", 10, 1)
+    cache._channels["youtube:stale"]["fetched_at"] = time.time() - 120
+
+    assert cache.get("youtube", "fresh") == {"subscribers": 5000, "total_videos": 10}
+    assert cache.get("tiktok", "fresh") is None
+    assert cache.get_many("youtube", ["fresh", "stale", "unknown"]) == {"fresh": {"subscribers": 5000, "total_videos": 10}}
+
+    cache.save()
+    with open("channels.json", encoding="utf-8") as file:
+        assert list(json.load(file)) == ["youtube:fresh"]
+    assert ChannelCache("channels.json", ttl=60).get("youtube", "fresh")["subscribers"] == 5000
+
+def test_youtube_channels_are_resolved_from_the_cache(tmp_path, offline):
+    from analytics.youtube import fetch_youtube_data
+
+    client, recorder = offline(n_videos=6)
+    for run in ("first", "second"):
+        fetch_youtube_data("topic", client, None, None, 0, 1000, "", str(tmp_path / run / "youtubeData"), str(tmp_path / run / "audio"))
+    # The second run's channels all come from the cache
+    assert len(recorder.durations["channels"]) == 1
+    assert len(recorder.durations["transcription"]) == 12
+
+def test_videos_of_small_channels_are_dropped_before_their_details(tmp_path, offline):
+    from analytics.youtube import fetch_youtube_data
+
+    client, recorder = offline(n_videos=6)
+    fetch_youtube_data("topic", client, None, None, 0, 10**6, "", str(tmp_path / "youtubeData"), str(tmp_path / "audio"))
+    assert not recorder.durations.get("video_info")
+    assert not list((tmp_path / "youtubeData").glob("*.json"))
+
+def test_channels_missing_from_the_batch_are_not_requested_per_video(tmp_path, offline, monkeypatch):
+    from analytics.channel_cache import get_channel_cache
+    from analytics.youtube import fetch_youtube_data
+    from benchmarks.fakes import FakeYouTubeServer
+
+    channels, requested = FakeYouTubeServer.channels, []
+
+    def without_chan001(self, params):
+        requested.append(params["id"])
+        return {"items": [item for item in channels(self, params)["items"] if item["id"] != "chan001"]}
+
+    monkeypatch.setattr(FakeYouTubeServer, "channels", without_chan001)
+    client, recorder = offline(n_videos=6)
+    fetch_youtube_data("topic", client, None, None, 0, 1000, "", str(tmp_path / "youtubeData"), str(tmp_path / "audio"))
+
+    # One batch request, and no request for the missing channel's video
+    assert len(requested) == 1
+    assert len(recorder.durations["transcription"]) == 5
+    assert len(list((tmp_path / "youtubeData").glob("*.json"))) == 5
+    assert get_channel_cache().unresolvable("youtube", "chan001")
+    assert ChannelCache(get_channel_cache().path).unresolvable("youtube", "chan001")
+
+def test_channel_fallback_saves_the_cache_and_handles_empty_items(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from analytics import youtube
+    from analytics.channel_cache import get_channel_cache
+
+    for video_id, channel_id in (("a", "live"), ("b", "gone")):
+        (tmp_path / f"{video_id}.json").write_text(json.dumps({"video_id": video_id, "channel_id": channel_id}))
+    responses = {"live": {"items": [{"statistics": {"subscriberCount": "7", "videoCount": "3"}}]}, "gone": {"items": []}}
+    requested = []
+
+    def get(url, params):
+        requested.append(params["id"])
+        return SimpleNamespace(status_code=200, json=lambda: responses[params["id"]])
+
+    monkeypatch.setattr(youtube.requests, "get", get)
+    assert youtube.get_channel_info("key", "url", str(tmp_path), "a.json")
+    assert not youtube.get_channel_info("key", "url", str(tmp_path), "b.json")
+    assert not youtube.get_channel_info("key", "url", str(tmp_path), "b.json")
+    assert requested == ["live", "gone"]
+
+    saved = ChannelCache(get_channel_cache().path)
+    assert saved.get("youtube", "live") == {"subscribers": 7, "total_videos": 3}
+    assert saved.unresolvable("youtube", "gone")
@@ -0,0 +1,24 @@
+from streamlit.testing.v1 import AppTest
+
+def _fetch_app(client):
+    import streamlit as st
+    from ui.components.action_buttons import render_action_buttons
+    from ui.components.data_display import render_data_display
+    from ui.components.input_form import FormData
+
+    st.session_state.cookie_uploaded = True
+    render_action_buttons(client, FormData(
+        topic="topic", platform=["YouTube"], min_likes=0, min_followers=0, specific_words="", political_perspective="left"
+    ))
+    render_data_display()
+
+def test_fetch_renders_the_live_and_final_views(offline):
+    client, _ = offline(n_videos=3)
+    app = AppTest.from_function(_fetch_app, args=(client,), default_timeout=60)
+    app.run()
+    app.button(key="fetch_data_button").click().run()
+
+    assert not app.exception
+    assert len(app.session_state.fetched_data) == 3
+    # The similarity widgets belong to the final view only
+    assert len([selectbox for selectbox in app.selectbox if selectbox.key.startswith("similar_segment_")]) == 3
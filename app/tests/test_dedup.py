@@ -0,0 +1,118 @@
+import json
+import os
+import random
+import shutil
+
+from analytics.archive import archive_run
+from analytics.dedup import (
+    DedupIndex, DedupRun, _audio_bands, fingerprint_similarity, minhash_similarity, transcript_minhash, video_key
+)
+
+WORDS = "the senate passed the bill after a long debate over spending on roads schools and hospitals in rural areas".split()
+
+def _transcription(words):
+    return [{"segment_number": 0, "start_time": 0.0, "end_time": 5.0, "transcription": " ".join(words)}]
+
+def _fingerprint(seed, length=400):
+    generator = random.Random(seed)
+    return [generator.getrandbits(32) for _ in range(length)]
+
+def _flip_bits(fingerprint, share, seed=1):
+    generator = random.Random(seed)
+    flipped = []
+    for value in fingerprint:
+        for bit in range(32):
+            if generator.random() < share:
+                value ^= 1 << bit
+        flipped.append(value)
+    return flipped
+
+def test_minhash_estimates_similarity():
+    first = transcript_minhash(" ".join(WORDS))
+    assert minhash_similarity(first, transcript_minhash(" ".join(WORDS))) == 1.0
+    assert minhash_similarity(first, transcript_minhash(" ".join(reversed(WORDS)))) < 0.2
+    assert transcript_minhash("too short") is None
+
+def test_audio_candidates_come_from_lsh_bands(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.db"))
+    original = _fingerprint(0)
+    index.add_canonical("youtube:a", {"platform": "youtube", "video_id": "a", "fingerprint": original})
+    for seed in range(1, 50):
+        index.add_canonical(f"youtube:n{seed}", {"platform": "youtube", "video_id": f"n{seed}", "fingerprint": _fingerprint(seed)})
+
+    reupload = _flip_bits(original, 0.05)
+    assert fingerprint_similarity(original, reupload) > 0.9
+    assert index.match_audio(reupload)["key"] == "youtube:a"
+    # Only a few canonicals are compared, not all 50
+    assert len(index._candidates("audio_bands", _audio_bands(reupload))) < 5
+    assert index.match_audio(_fingerprint(999)) is None
+
+def test_transcript_is_read_through_its_reference_even_after_pruning(tmp_path, make_run):
+    index = DedupIndex(str(tmp_path / "dedup.db"))
+    canonical = {"platform": "youtube", "video_id": "a", "transcription": _transcription(WORDS), "audio_seconds": 5.0}
+    run_folder = make_run("run-1", {"youtubeData": [canonical]})
+    path = os.path.join(run_folder, "youtubeData", "a.json")
+    DedupRun(index).register_transcription(dict(canonical), None, path)
+
+    with open(index.path, "rb") as file:
+        assert WORDS[3].encode() not in file.read()
+
+    archive_run(run_folder)
+    shutil.rmtree(run_folder)
+    again = {"platform": "youtube", "video_id": "a"}
+    run = DedupRun(index)
+    assert run.reuse_transcription(again, None)
+    assert again["transcription"] == canonical["transcription"]
+    assert run.report()["transcriptions_saved"] == 1
+
+def test_near_duplicate_transcript_reuses_the_analysis(tmp_path):
+    from analytics.data_fetcher import _resolve_important_chunks
+    from utils.utilities import build_segment_index
+
+    index = DedupIndex(str(tmp_path / "dedup.db"))
+    run = DedupRun(index)
+    # The original's transcription split the speech into two segments, the re-upload's into one
+    original = {"platform": "youtube", "video_id": "a", "transcription": [
+        dict(_transcription(WORDS[:10])[0], segment_number=1), dict(_transcription(WORDS[10:])[0], segment_number=2)
+    ]}
+    (tmp_path / "a.json").write_text(json.dumps(original), encoding="utf-8")
+    run.register_transcription(original, None, str(tmp_path / "a.json"))
+    analysis = '{"choice": "positive", "main": [2], "analysis": ""}'
+    run.register_analysis(dict(original, llm_analysis=analysis), "left")
+
+    reupload = {"platform": "tiktok", "video_id": "b", "transcription": _transcription(WORDS + ["today"])}
+    run.register_transcription(reupload, None, str(tmp_path / "b.json"))
+    assert reupload["duplicate_of"] == video_key(original)
+    assert run.reuse_analysis(reupload, "left") and reupload["llm_analysis"] == analysis
+    assert index.canonical_count() == 1
+
+    # The reused analysis's segment numbers point into the canonical transcript the duplicate now has
+    assert reupload["transcription"] == original["transcription"]
+    reupload["segment_index"] = build_segment_index(reupload["transcription"])
+    assert _resolve_important_chunks(reupload) == [1]
+
+    # Everything is on disk without an explicit save
+    reopened = DedupIndex(index.path)
+    assert reopened.get_analysis("youtube:a", "left") == analysis
+
+def test_transcript_match_without_the_canonical_transcript_is_a_new_canonical(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.db"))
+    run = DedupRun(index)
+    run.register_transcription({"platform": "youtube", "video_id": "a", "transcription": _transcription(WORDS)}, None, "missing.json")
+
+    reupload = {"platform": "tiktok", "video_id": "b", "transcription": _transcription(WORDS + ["today"])}
+    run.register_transcription(reupload, None, "b.json")
+    assert "duplicate_of" not in reupload
+    assert index.canonical_count() == 2
+
+def test_legacy_json_index_is_imported(tmp_path):
+    from analytics import dedup
+
+    os.makedirs("data")
+    with open(dedup.LEGACY_DEDUP_INDEX_PATH, "w", encoding="utf-8") as file:
+        json.dump([{"key": "youtube:a", "platform": "youtube", "video_id": "a", "fingerprint": None,
+                    "minhash": None, "transcription": [], "analyses": {"left": "analysis"}}], file)
+
+    index = DedupIndex(dedup.DEDUP_INDEX_PATH)
+    assert index.get_analysis("youtube:a", "left") == "analysis"
+    assert not os.path.exists(dedup.LEGACY_DEDUP_INDEX_PATH)
@@ -0,0 +1,36 @@
+import threading
+import time
+
+from analytics.profiling import RunProfiler, current_profiler, run_thread_pool
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+def test_only_the_run_threads_are_sampled():
+    stop = threading.Event()
+    # Another session's work, started while the run is profiled
+    foreign = threading.Thread(target=lambda: stop.wait(5), name="other_session")
+
+    profiler = RunProfiler(interval=0.002).start()
+    try:
+        foreign.start()
+        with run_thread_pool(2, thread_name_prefix="collector") as pool:
+            # A pool opened by a run thread's worker belongs to the run too
+            nested = pool.submit(lambda: run_thread_pool(1, thread_name_prefix="nested").submit(_spin, 0.2).result())
+            pool.submit(_spin, 0.2).result()
+            nested.result()
+    finally:
+        profiler.stop()
+        stop.set()
+        foreign.join()
+
+    roots = {stack.split(";", 1)[0] for stack in profiler.folded().splitlines()}
+    assert "collector" in roots and "nested" in roots
+    assert "other_session" not in roots
+    assert current_profiler() is None
+
+def test_pools_outside_a_profiled_run_are_plain():
+    with run_thread_pool(1, thread_name_prefix="plain") as pool:
+        assert pool.submit(current_profiler).result() is None
@@ -0,0 +1,90 @@
+import time
+
+from analytics.progress import FetchProgress
+
+def test_start_resets_the_clock():
+    progress = FetchProgress()
+    progress.publish({"video_id": "a"})
+    time.sleep(0.05)
+    progress.start()
+    assert progress.time_to_first_result is None
+    progress.publish({"video_id": "b"})
+    assert progress.time_to_first_result < 0.05
+
+def test_publish_replaces_earlier_versions():
+    progress = FetchProgress()
+    progress.publish({"video_id": "a", "llm_analysis": "first"})
+    progress.publish({"video_id": "a", "llm_analysis": "second"})
+    assert progress.items_since(0) == [{"video_id": "a", "llm_analysis": "second"}]
+
+def test_benchmark_first_result_is_within_the_run():
+    from benchmarks.fakes import FakeServiceConfig
+    from benchmarks.run_benchmark import run_once
+
+    run = run_once("YouTube", FakeServiceConfig(n_videos=4, latency=0), trace_memory=False)
+    assert run["error"] is None and run["results"] == 4
+    assert 0 < run["first_result_s"] <= run["wall_s"]
+
+def test_attached_progress_gets_the_past_and_next_events():
+    owner, follower = FetchProgress(), FetchProgress()
+    owner.on_stage("a", "searched")
+    owner.on_failure("b", {"type": "DownloadError"})
+    owner.publish({"video_id": "a"})
+
+    owner.attach(follower)
+    owner.on_stage("a", "analysed")
+    owner.publish({"video_id": "c"})
+    assert follower.items_since(0) == [{"video_id": "a"}, {"video_id": "c"}]
+    assert follower.counts() == dict(owner.counts())
+
+def test_a_joined_computation_shares_its_context():
+    import threading
+
+    from analytics.result_cache import ResultCache
+
+    cache, release, joined = ResultCache(), threading.Event(), []
+
+    def compute():
+        release.wait(5)
+        return "value"
+
+    owner = threading.Thread(target=cache.get_or_compute, args=("key", compute), kwargs={"context": "owner progress"})
+    owner.start()
+    while not cache._in_flight:
+        pass
+    waiter = threading.Thread(target=cache.get_or_compute, args=("key", lambda: "other"), kwargs={"on_join": joined.append})
+    waiter.start()
+    while not joined and waiter.is_alive():
+        pass
+    # The waiter follows the owner's progress before the computation finishes
+    assert joined == ["owner progress"]
+    release.set()
+    owner.join()
+    waiter.join()
+
+def test_cached_and_shared_fetches_feed_every_progress(offline):
+    import threading
+
+    from analytics.data_fetcher import _RESULT_CACHE, fetch_social_media_data
+
+    _RESULT_CACHE.invalidate()
+    client, _ = offline(n_videos=3)
+    query = dict(topic="topic", client=client, platform="YouTube", start_date=None, end_date=None, min_likes=0, min_followers=0,
+                 specific_words="", political_perspective="left")
+    progresses = [FetchProgress(), FetchProgress()]
+    results = [None, None]
+
+    def fetch(position):
+        results[position] = fetch_social_media_data(progress=progresses[position], **query)
+
+    threads = [threading.Thread(target=fetch, args=(position,)) for position in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cached = FetchProgress()
+    fetch_social_media_data(progress=cached, **query)
+    for progress in progresses + [cached]:
+        assert {item["video_id"] for item in progress.items_since(0)} == {item["video_id"] for item in results[0].items}
+        assert progress.counts()["analysed"] == 3
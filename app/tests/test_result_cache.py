@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+
+from analytics.data_fetcher import FetchQuery
+from analytics.result_cache import ResultCache, make_query_key
+
+def test_equivalent_queries_share_a_key():
+    first = make_query_key(" Topic ", "YouTube", None, None, 0, 0, "b, a", "Left  wing", "openai", "key")
+    second = make_query_key("topic", "YouTube", None, None, 0, 0, "A、B", "left wing", "OpenAI", "key")
+    assert first == second
+
+def test_queries_of_different_api_keys_do_not_share_results():
+    query = FetchQuery(topic="topic", political_perspective="left", platform="YouTube")
+    first, second = SimpleNamespace(api_key="sk-first"), SimpleNamespace(api_key="sk-second")
+    assert query.cache_key(first) == query.cache_key(SimpleNamespace(api_key="sk-first"))
+    assert query.cache_key(first) != query.cache_key(second)
+    # Only a fingerprint of the key is kept
+    assert "sk-first" not in repr(query.cache_key(first))
+
+    cache, calls = ResultCache(), []
+    for client in (first, second, first):
+        cache.get_or_compute(query.cache_key(client), lambda: calls.append(client.api_key))
+    assert calls == ["sk-first", "sk-second"]
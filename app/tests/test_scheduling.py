@@ -0,0 +1,45 @@
+import datetime
+import json
+
+from analytics.scheduling import SKIPPED_FOLDER, PriorityScheduler, parse_weights
+
+def _published(days_ago):
+    return (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_ago)).isoformat()
+
+def test_parse_weights():
+    assert parse_weights("views=1, likes=0.5") == {"views": 1.0, "likes": 0.5}
+    assert parse_weights("") == {}
+
+def test_order_by_engagement_and_recency():
+    records = [
+        {"video_id": "small", "views": 10, "published_at": _published(1)},
+        {"video_id": "viral", "views": 10**6, "published_at": _published(1)},
+        {"video_id": "missing"},
+    ]
+    order = [record["video_id"] for record in PriorityScheduler(weights={"views": 1}).order(records)]
+    assert order == ["viral", "small", "missing"]
+
+    old, new = {"video_id": "old", "published_at": _published(365)}, {"video_id": "new", "published_at": _published(0)}
+    assert PriorityScheduler(weights={"recency": 1}).order([old, new])[0] is new
+    # Without weights the order is kept
+    assert PriorityScheduler(weights={}).order(records) == records
+
+def _write_videos(folder, views):
+    folder.mkdir(parents=True)
+    for index, count in enumerate(views):
+        (folder / f"v{index}.json").write_text(json.dumps({"video_id": f"v{index}", "views": count}), encoding="utf-8")
+    return sorted(path.name for path in folder.iterdir())
+
+def test_tail_sampling_is_stable_and_moves_the_skipped_videos(tmp_path):
+    data_folder = tmp_path / "run" / "youtubeData"
+    filenames = _write_videos(data_folder, [10 ** index for index in range(12)])
+    scheduler = PriorityScheduler(weights={"views": 1}, head_size=3, tail_sample_rate=0.5)
+
+    selected, skipped = scheduler.plan(str(data_folder), filenames)
+    assert selected[:3] == ["v11.json", "v10.json", "v9.json"]
+    assert skipped and sorted(selected + skipped) == filenames
+    assert scheduler.plan(str(data_folder), filenames) == (selected, skipped)
+
+    assert scheduler.schedule(str(data_folder), filenames) == selected
+    assert sorted(path.name for path in (tmp_path / "run" / SKIPPED_FOLDER).iterdir()) == sorted(skipped)
+    assert sorted(path.name for path in data_folder.iterdir()) == sorted(selected)
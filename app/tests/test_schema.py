@@ -0,0 +1,41 @@
+from analytics.schema import filter_records, meets_thresholds, metric_array, normalize_metrics, to_count
+
+def test_to_count():
+    assert to_count(12) == 12
+    assert to_count(" 34 ") == 34
+    assert to_count(5.9) == 5
+    assert to_count(None) is None
+    assert to_count(True) is None
+    assert to_count("1.2K") is None
+
+def test_normalize_metrics_converts_present_fields_only():
+    record = normalize_metrics({"views": "100", "likes": None, "title": "7", "subscribers": "hidden"})
+    assert record == {"views": 100, "likes": None, "title": "7", "subscribers": None}
+
+def test_metric_array_counts_missing_as_zero():
+    assert metric_array([{"views": 3}, {"views": None}, {}], "views").tolist() == [3, 0, 0]
+    assert metric_array([], "views").tolist() == []
+
+def test_filter_records_matches_meets_thresholds():
+    records = [
+        {"video_id": "a", "likes": 10, "subscribers": 100},
+        {"video_id": "b", "likes": 5, "subscribers": 1000},
+        {"video_id": "c", "likes": None, "subscribers": 500},
+        {"video_id": "d", "likes": 50},
+    ]
+    for min_likes, min_followers in ((0, 0), (10, 0), (0, 200), (10, 100)):
+        expected = [record for record in records if meets_thresholds(record, min_likes, min_followers)]
+        assert filter_records(records, min_likes, min_followers) == expected
+    assert filter_records([], 1, 1) == []
+
+def test_tiktok_search_applies_the_minimums(tmp_path, offline):
+    from analytics.tiktok import fetch_tiktok_data
+
+    client, _ = offline(n_videos=8)
+    data_folder = tmp_path / "tiktokData"
+    fetch_tiktok_data("topic", client, min_likes=10**12, tiktok_data_folder=str(data_folder),
+                      audio_data_folder=str(tmp_path / "audio"))
+    assert not list(data_folder.glob("*.json"))
+
+    fetch_tiktok_data("topic", client, tiktok_data_folder=str(data_folder), audio_data_folder=str(tmp_path / "audio"))
+    assert list(data_folder.glob("*.json"))
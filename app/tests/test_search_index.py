@@ -0,0 +1,39 @@
+from analytics.search_index import SearchIndex, index_stored_runs, segment_url, to_match_query
+
+def _video(video_id, text, platform="youtube", **fields):
+    return dict({
+        "platform": platform, "video_id": video_id, "title": f"Video {video_id}", "description": "",
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "transcription": [{"segment_number": 1, "start_time": 0.0, "end_time": 5.0, "transcription": "opening words"},
+                          {"segment_number": 2, "start_time": 65.4, "end_time": 70.0, "transcription": text}],
+    }, **fields)
+
+def test_match_query_quotes_every_term():
+    assert to_match_query('tax "carbon price" refor* AND') == '"tax" "carbon price" "refor"* "AND"'
+    assert to_match_query('" "') == ""
+
+def test_segment_url_points_at_the_segment():
+    assert segment_url("https://www.youtube.com/watch?v=a", "youtube", 65.4) == "https://www.youtube.com/watch?v=a&t=65s"
+    assert segment_url("https://tiktok.com/v", "tiktok", 3.0) == "https://tiktok.com/v"
+
+def test_search_finds_segments_and_reindexing_replaces_them():
+    index = SearchIndex("search.db")
+    index.index_items([_video("a", "the carbon tax debate"), _video("b", "a cooking show", tags=["carbon"])])
+
+    results = index.search('"carbon tax"')
+    assert [(result["video_id"], result["segment_number"]) for result in results] == [("a", 2)]
+    assert results[0]["url"].endswith("t=65s") and results[0]["snippet"] == "the **carbon tax** debate"
+    assert {result["video_id"] for result in index.search("carbon")} == {"a", "b"}
+    assert [result["field"] for result in index.search("carbon", field="tags")] == ["tags"]
+    assert index.search("carbon", platform="tiktok") == []
+
+    index.index_items([_video("a", "a new transcript")])
+    assert index.video_count() == 2
+    assert [result["video_id"] for result in index.search("carbon")] == ["b"]
+    assert [result["video_id"] for result in index.search("transcri*")] == ["a"]
+
+def test_stored_runs_are_indexed(make_run):
+    make_run("run-1", {"youtubeData": [_video("a", "carbon tax")], "tiktokData": [_video("t", "dance", platform="tiktok")]})
+    index = SearchIndex("search.db")
+    assert index_stored_runs(index, "runs") == 2
+    assert index.search("dance")[0]["platform"] == "tiktok"
@@ -0,0 +1,24 @@
+import json
+
+from analytics.data_fetcher import _resolve_important_chunks
+from utils.utilities import build_segment_index, resolve_segment_offsets
+
+TRANSCRIPTION = [{"segment_number": number, "transcription": f"segment {number}"} for number in (3, 4, 7)]
+
+def test_index_survives_a_json_round_trip():
+    index = build_segment_index(TRANSCRIPTION)
+    assert index == {"3": 0, "4": 1, "7": 2}
+    assert json.loads(json.dumps(index)) == index
+
+def test_unknown_segments_are_skipped():
+    index = build_segment_index(TRANSCRIPTION)
+    assert resolve_segment_offsets(index, [7, "3", 5]) == [2, 0]
+    assert resolve_segment_offsets(index, None) == []
+
+def test_important_chunks_resolved_from_the_analysis():
+    item = {"transcription": TRANSCRIPTION, "llm_analysis": json.dumps({"choice": "support", "main": [4, 9], "analysis": ""})}
+    assert _resolve_important_chunks(item) == [1]
+    # The precomputed index is used when present
+    item["segment_index"] = {"4": 2}
+    assert _resolve_important_chunks(item) == [2]
+    assert _resolve_important_chunks({"llm_analysis": "not json"}) == []
@@ -0,0 +1,74 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+from analytics import semantic_index
+from analytics.semantic_index import SEGMENTS_FILENAME, VECTORS_FILENAME, SemanticIndex
+
+class WordEmbedder:
+    """Normalized bag of hashed words, standing in for the transformer model."""
+    model_name = "test-words"
+    dim = 64
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+TOPICS = ["carbon tax climate policy", "football match goal score", "bread recipe flour oven", "election vote ballot campaign"]
+
+def _video(video_id, texts, platform="youtube"):
+    return {
+        "platform": platform, "video_id": video_id, "title": video_id, "url": f"https://www.youtube.com/watch?v={video_id}",
+        "transcription": [{"segment_number": number, "start_time": 10.0 * number, "transcription": text}
+                          for number, text in enumerate(texts, 1)],
+    }
+
+def _index(**kwargs):
+    index = SemanticIndex("semantic", embedder=WordEmbedder(), **kwargs)
+    for number in range(20):
+        index.add_video(_video(f"v{number}", [TOPICS[(number + offset) % len(TOPICS)] + f" v{number}" for offset in range(3)]))
+    return index
+
+def test_more_like_text_ranks_by_meaning():
+    index = _index()
+    results = index.more_like_text("a new carbon tax", limit=5)
+    assert len(results) == 5
+    assert all("carbon" in result["text"] for result in results)
+    assert results == sorted(results, key=lambda result: -result["score"])
+
+def test_lsh_candidates_agree_with_the_full_scan(monkeypatch):
+    index = _index()
+    scanned = index.more_like_text("football goal", limit=3)
+    monkeypatch.setattr(semantic_index, "SEMANTIC_MIN_CANDIDATES", 1)
+    probed = index.more_like_text("football goal", limit=3)
+    assert [result["score"] for result in probed] == [result["score"] for result in scanned]
+
+def test_more_like_segment_leaves_out_the_video_itself():
+    index = _index()
+    results = index.more_like_segment("youtube", "v0", 1, limit=10)
+    assert results and all(result["video_id"] != "v0" for result in results)
+    assert results[0]["url"].endswith(f"t={int(results[0]['start_time'])}s")
+    assert index.more_like_segment("youtube", "unknown", 1) == []
+
+def test_index_is_reloaded_and_repaired_from_disk():
+    index = _index()
+    assert index.add_video(_video("v0", ["again"])) == 0
+    count, videos = index.count, index.video_count()
+
+    # An interrupted append: the metadata line of a segment whose vector was never written
+    with open(os.path.join("semantic", SEGMENTS_FILENAME), "a", encoding="utf-8") as file:
+        file.write('{"key": "youtube:broken", "segment_number": 1}\n{"key": ')
+    reloaded = SemanticIndex("semantic", embedder=WordEmbedder())
+    assert (reloaded.count, reloaded.video_count()) == (count, videos)
+    assert os.path.getsize(os.path.join("semantic", VECTORS_FILENAME)) == count * WordEmbedder.dim * 2
+    assert reloaded.more_like_text("bread oven", limit=1)[0]["text"].startswith("bread")
+
+    other_model = WordEmbedder()
+    other_model.model_name = "another-model"
+    with pytest.raises(ValueError):
+        SemanticIndex("semantic", embedder=other_model)
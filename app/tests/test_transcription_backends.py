@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+from analytics.transcription_backends import HybridTranscriptionBackend, TranscriptionBackend
+from analytics.transcript import transcribe_videos
+
+def _result(audio_path):
+    return {"duration": 1.0, "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": audio_path}]}
+
+class FakeLocal:
+    """Stands in for LocalWhisperBackend: workers slots, futures resolved at once."""
+
+    def __init__(self, workers, failing=()):
+        self.concurrency = workers
+        self.slots = threading.BoundedSemaphore(workers)
+        self.failing = set(failing)
+        self.submitted = []
+
+    def submit(self, audio_path):
+        self.submitted.append(audio_path)
+        future = Future()
+        if audio_path in self.failing:
+            future.set_exception(RuntimeError("local engine failed"))
+        else:
+            future.set_result(_result(audio_path))
+        return future
+
+class FakeRemote(TranscriptionBackend):
+    name = "remote"
+    concurrency = 3
+
+    def __init__(self):
+        self.transcribed = []
+
+    def transcribe(self, audio_path):
+        self.transcribed.append(audio_path)
+        return SimpleNamespace(duration=1.0, segments=[SimpleNamespace(id=0, start=0.0, end=1.0, text=audio_path)])
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        TranscriptionBackend()
+
+def test_hybrid_sends_the_overflow_to_the_remote_api():
+    local, remote = FakeLocal(workers=2), FakeRemote()
+    hybrid = HybridTranscriptionBackend(local, remote)
+    assert hybrid.concurrency == 5
+
+    results = hybrid.transcribe_batch(["a", "b", "c", "d"])
+
+    assert local.submitted == ["a", "b"]
+    assert remote.transcribed == ["c", "d"]
+    assert [result.segments[0].text for result in results] == ["a", "b", "c", "d"]
+    # Every local slot is free again
+    assert all(local.slots.acquire(blocking=False) for _ in range(2))
+
+def test_hybrid_falls_back_to_remote_on_local_failure():
+    local, remote = FakeLocal(workers=2, failing={"b"}), FakeRemote()
+    results = HybridTranscriptionBackend(local, remote).transcribe_batch(["a", "b"])
+    assert remote.transcribed == ["b"]
+    assert [result.segments[0].text for result in results] == ["a", "b"]
+
+class RecordingBackend(TranscriptionBackend):
+    concurrency = 2
+
+    def __init__(self, failing=()):
+        self.batches = []
+        self.failing = set(failing)
+
+    def transcribe(self, audio_path):
+        if audio_path.endswith(tuple(self.failing)):
+            raise RuntimeError("transcription failed")
+        return SimpleNamespace(duration=2.0, segments=[SimpleNamespace(id=0, start=0.0, end=2.0, text="text")])
+
+    def transcribe_batch(self, audio_paths):
+        self.batches.append(list(audio_paths))
+        return super().transcribe_batch(audio_paths)
+
+def test_videos_are_transcribed_in_batches(tmp_path, monkeypatch):
+    import json
+    from analytics import transcript
+    from analytics.checkpoint import RunCheckpoint
+
+    data_folder, audio_folder = tmp_path / "run" / "youtubeData", tmp_path / "run" / "audio"
+    data_folder.mkdir(parents=True)
+    filenames = []
+    for index in range(5):
+        (data_folder / f"v{index}.json").write_text(json.dumps({"video_id": f"v{index}", "url": f"https://youtube.com/{index}"}))
+        filenames.append(f"v{index}.json")
+
+    def download(url, output_path, video_id):
+        path = tmp_path / f"{video_id}.mp3"
+        path.write_bytes(b"audio")
+        return str(path)
+
+    monkeypatch.setattr(transcript, "download_audio", download)
+    monkeypatch.setattr(transcript, "index_video", lambda video_data: None)
+    backend = RecordingBackend(failing={"v3.mp3"})
+    checkpoint = RunCheckpoint(str(tmp_path / "run"))
+    done = []
+
+    transcribe_videos(str(data_folder), filenames, str(audio_folder), None, transcription_backend=backend,
+                      checkpoint=checkpoint, on_video=done.append)
+
+    assert [len(batch) for batch in backend.batches] == [2, 2, 1]
+    assert sorted(done) == ["v0", "v1", "v2", "v4"]
+    assert "v3" in checkpoint.quarantined()
+    with open(data_folder / "v0.json", encoding="utf-8") as file:
+        assert json.load(file)["segment_index"] == {"0": 0}
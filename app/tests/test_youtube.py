@@ -0,0 +1,77 @@
+import datetime
+from unittest import mock
+
+import pytest
+
+from analytics.youtube import (
+    fetch_youtube_data, merge_window_results, resolve_search_window, sharded_video_search, split_search_window
+)
+
+def test_videos_are_enriched_once_without_checkpoint(tmp_path, offline):
+    client, recorder = offline(n_videos=6)
+    fetch_youtube_data(
+        "topic", client, None, None, 0, 0, "", str(tmp_path / "youtubeData"), str(tmp_path / "audio")
+    )
+
+    assert len(recorder.durations["video_info"]) == 6
+    assert len(recorder.durations["transcription"]) == 6
+
+def test_videos_whose_enrichment_failed_are_not_requested_again(tmp_path, offline, monkeypatch):
+    from analytics import youtube
+
+    client, recorder = offline(n_videos=6)
+    get_video_info, requested = youtube.get_video_info, []
+
+    def failing_once(API_KEY, VIDEO_URL, data_folder, filename):
+        requested.append(filename)
+        return len(requested) > 1 and get_video_info(API_KEY, VIDEO_URL, data_folder, filename)
+
+    monkeypatch.setattr(youtube, "get_video_info", failing_once)
+    fetch_youtube_data(
+        "topic", client, None, None, 0, 0, "", str(tmp_path / "youtubeData"), str(tmp_path / "audio")
+    )
+
+    assert len(requested) == len(set(requested)) == 6
+    assert len(recorder.durations["transcription"]) == 5
+
+def test_search_window_defaults():
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start, end = resolve_search_window()
+    assert end < now - datetime.timedelta(days=6) and start < end
+
+    # A start within the last week used to be after the default end
+    recent = (now - datetime.timedelta(days=2)).date().isoformat()
+    start, end = resolve_search_window(recent)
+    assert start < end and end >= now - datetime.timedelta(seconds=5)
+
+    with pytest.raises(ValueError):
+        resolve_search_window((now + datetime.timedelta(days=3)).date().isoformat())
+
+def test_split_search_window_covers_the_period():
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime(2024, 1, 5, tzinfo=datetime.timezone.utc)
+    windows = split_search_window(start, end, 4)
+    assert windows[0][0] == start and windows[-1][1] == end
+    assert all(previous[1] == following[0] for previous, following in zip(windows, windows[1:]))
+
+def test_merged_windows_are_capped_in_turn():
+    shards = [{f"a{index}": {} for index in range(5)}, {"b0": {}}, None, {f"c{index}": {} for index in range(5)}]
+    assert list(merge_window_results(shards, 5)) == ["a0", "b0", "c0", "a1", "c1"]
+
+def test_sharded_search_is_bounded_by_max_results(offline):
+    from analytics import youtube
+
+    offline(n_videos=30)
+    start, end = resolve_search_window()
+    requested = []
+    search = youtube.video_search
+
+    def recording_search(*args, max_results=None):
+        requested.append(max_results)
+        return search(*args, max_results=max_results)
+
+    with mock.patch.object(youtube, "video_search", recording_search):
+        videos = sharded_video_search("key", youtube.SEARCH_URL, "topic", "", start, end, shards=4, max_results=10)
+
+    assert requested == [3, 3, 3, 3]
+    assert len(videos) == 10
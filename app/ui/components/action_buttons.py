@@ -1,11 +1,13 @@
 import streamlit as st
+import datetime
 import os
-from yt_dlp.utils import DownloadError
+from concurrent.futures import ThreadPoolExecutor
 
-from analytics.data_fetcher import fetch_social_media_data
 from utils.session import is_cookie_uploaded, reset_data_states
-from utils.utilities import fetch_graphrag
+from utils.utilities import fetch_graphrag, run_folder_of
+from utils.records import ResultSet
 from ui.components.input_form import FormData
+from ui.components.data_display import render_live_results
 
 def render_action_buttons(client, form_data: FormData):
     """
@@ -32,22 +34,34 @@ def _render_fetch_button(client, form_data: FormData):
             return
         
         reset_data_states()
+
+        # The fetch pipeline (yt-dlp, TikTokApi, requests...) is only loaded once a fetch runs
+        from yt_dlp.utils import DownloadError
+        from analytics.data_fetcher import fetch_social_media_data
+        from analytics.progress import FetchProgress
         
-        # Fetch data
+        # Fetch data in the background and show each video as soon as it is analysed
         with st.spinner("Crawling and analyzing the video..."):
+            progress = FetchProgress()
+            executor = ThreadPoolExecutor(max_workers=1)
             try:
-                data = fetch_social_media_data(
+                future = executor.submit(
+                    fetch_social_media_data,
                     topic=form_data.topic,
                     client=client,
                     platform=form_data.platform,
-                    start_date=None,
-                    end_date=None,
+                    start_date=form_data.start_date.isoformat() if form_data.start_date else None,
+                    end_date=form_data.end_date.isoformat() if form_data.end_date else None,
                     min_likes=form_data.min_likes,
                     min_followers=form_data.min_followers,
                     specific_words=form_data.specific_words,
-                    political_perspective=form_data.political_perspective
+                    political_perspective=form_data.political_perspective,
+                    transcription_backend=form_data.transcription_backend,
+                    progress=progress,
+                    profile=form_data.profile
                 )
-                st.session_state.fetched_data = data if data else None
+                render_live_results(progress, future.done)
+                _store_fetch_result(future.result())
                 
             except DownloadError:
                 st.error("Your cookie.txt file has expired. Please load a new file.")
@@ -55,6 +69,45 @@ def _render_fetch_button(client, form_data: FormData):
             except Exception:
                 st.error("An error occurred while retrieving data.")
                 st.session_state.fetched_data = None
+            finally:
+                # If the session stops waiting (e.g. a rerun), the fetch still completes into the result cache
+                executor.shutdown(wait=False)
+
+    _render_quarantine(client)
+
+def _store_fetch_result(result):
+    st.session_state.data_folder = result.data_folder
+    st.session_state.dedup_report = result.dedup_report
+    st.session_state.quarantined = result.quarantined
+    st.session_state.usage = result.usage
+    st.session_state.profile = result.profile
+    st.session_state.fetched_data = ResultSet.from_items(result.items, result.data_folder) if result.items else None
+
+def _render_quarantine(client):
+    """List the videos that failed during the run and offer to resume it for them."""
+    quarantined = st.session_state.get("quarantined")
+    if not quarantined or not st.session_state.get("data_folder"):
+        return
+
+    st.warning(f"{len(quarantined)} videos failed and were set aside; the other videos were processed.")
+    with st.expander("⚠️ Failed videos"):
+        for video_id, error in quarantined.items():
+            st.write(f"**{video_id}** ({error['stage']}): {error['type']}: {error['message']}")
+
+    if st.button("Retry failed videos", key="resume_run_button"):
+        from yt_dlp.utils import DownloadError
+        from analytics.data_fetcher import resume_run
+
+        with st.spinner("Resuming the run..."):
+            try:
+                _store_fetch_result(resume_run(run_folder_of(st.session_state.data_folder), client))
+            except DownloadError:
+                st.error("Your cookie.txt file has expired. Please load a new file.")
+                return
+            except Exception:
+                st.error("An error occurred while resuming the run.")
+                return
+        st.rerun()
 
 def _render_graph_button():
     """Render the generate graph button and handle its logic."""
@@ -82,16 +135,21 @@ def _render_download_button():
     rag_graph_path = os.path.join(rag_folder, "output/graph.graphml")
     
     if os.path.exists(rag_graph_path):
-        with open(rag_graph_path, "rb") as file:
-            st.download_button(
-                label="Download the graphml file",
-                data=file,
-                file_name=os.path.basename(rag_graph_path),
-                mime="application/octet-stream"
-            )
+        st.download_button(
+            label="Download the graphml file",
+            data=_read_graph_file(rag_graph_path, os.path.getmtime(rag_graph_path)),
+            file_name=os.path.basename(rag_graph_path),
+            mime="application/octet-stream"
+        )
     else:
         st.write("Graph File does not exist.")
 
+@st.cache_data(show_spinner=False, max_entries=1)
+def _read_graph_file(path: str, mtime: float) -> bytes:
+    """The graphml file is read again only when GraphRAG rewrites it (mtime is the cache key)."""
+    with open(path, "rb") as file:
+        return file.read()
+
 def _validate_form_data(form_data: FormData) -> str:
     """
     Validate form data and return error message if invalid.
@@ -109,7 +167,13 @@ def _validate_form_data(form_data: FormData) -> str:
         return "Political stance not specified, please enter one."
     
     if not form_data.platform:
-        return "No platform selected, please choose TikTok or YouTube."
+        return "No platform selected, please choose TikTok, YouTube or both."
+
+    if form_data.start_date and form_data.end_date and form_data.start_date > form_data.end_date:
+        return "The start date must not be after the end date."
+
+    if form_data.start_date and form_data.start_date > datetime.date.today():
+        return "The start date must not be in the future."
     
     return ""
 
@@ -1,6 +1,8 @@
 import streamlit as st
-from typing import List, Dict, Any
-from utils.utilities import get_llm_json_values
+import time
+import os
+from typing import Callable, List, Dict, Any, Optional
+from utils.utilities import get_llm_json_values, build_segment_index, resolve_segment_offsets
 
 def render_data_display():
     """Render the fetched data display section."""
@@ -11,12 +13,55 @@ def render_data_display():
     
     data = st.session_state.fetched_data
     st.write("### Data obtained:")
+    _render_dedup_summary(st.session_state.get('dedup_report'))
+    _render_usage_summary(st.session_state.get('usage'))
+    _render_profile_summary(st.session_state.get('profile'))
     
     for index, item in enumerate(data, start=1):
         _render_video_item(item, index)
 
-def _render_video_item(item: Dict[str, Any], index: int):
-    """Render a single video item with its analysis and information."""
+def render_live_results(progress, is_done: Callable[[], bool], poll_seconds: float = 0.5):
+    """
+    Render the videos of a running fetch as they complete, under its stage counters,
+    until is_done() returns True. The live view is then cleared: the complete result
+    is rendered by render_data_display.
+
+    Args:
+        progress: FetchProgress of the running fetch
+        is_done: Returns True once the fetch has finished
+        poll_seconds: Interval between two refreshes
+    """
+    live = st.empty()
+    with live.container():
+        counters = st.empty()
+        results = st.container()
+
+    shown = 0
+    while True:
+        finished = is_done()
+        counters.caption(_format_progress(progress.counts()))
+        new_items = progress.items_since(shown)
+        with results:
+            if new_items and not shown:
+                st.write("### Data obtained so far:")
+            for index, item in enumerate(new_items, start=shown + 1):
+                _render_video_item(item, index, live=True)
+        shown += len(new_items)
+        if finished:
+            break
+        time.sleep(poll_seconds)
+    live.empty()
+
+def _format_progress(counts: Dict[str, int]) -> str:
+    text = " · ".join(f"{stage}: {count}" for stage, count in counts.items() if stage != "failed")
+    return text + (f" · failed: {counts['failed']}" if counts.get("failed") else "")
+
+def _render_video_item(item: Dict[str, Any], index: int, live: bool = False):
+    """
+    Render a single video item with its analysis and information.
+    The live view of a running fetch has no widgets: render_data_display renders the
+    same items in the same rerun, and their widget keys must stay unique.
+    """
     video_title = item.get('title') or f"Video {index}"
     choice, main, analysis = get_llm_json_values(item.get('llm_analysis', 'No analysis available'))
     
@@ -27,7 +72,52 @@ def _render_video_item(item: Dict[str, Any], index: int):
 
     _render_video_info_section(item)
     
-    _render_transcription_section(item)
+    _render_transcription_section(item, similar=not live)
+
+def _render_dedup_summary(report: Optional[Dict[str, Any]]):
+    """Render how much work deduplication saved in this run."""
+    if not report or not (report['duplicates'] or report['transcriptions_saved'] or report['llm_calls_saved']):
+        return
+    st.info(
+        f"♻️ {report['duplicates']} re-uploads linked to {len(report['clusters'])} original videos. "
+        f"Saved {report['transcriptions_saved']} transcriptions "
+        f"({round(report['audio_seconds_saved'] / 60, 1)} min of audio) and {report['llm_calls_saved']} LLM calls."
+    )
+
+def _render_usage_summary(usage: Optional[Dict[str, Any]]):
+    """Render what the run's API calls cost, and the calls refused by its budget."""
+    if not usage or not usage['total']['calls']:
+        return
+    total = usage['total']
+    text = (
+        f"💲 {total['cost']:.4f} USD spent on {total['calls']} API calls "
+        f"({round(total['audio_seconds'] / 60, 1)} min of audio, {total['prompt_tokens']} prompt tokens)"
+    )
+    limit = usage['limits']['run']
+    if limit:
+        text += f" of a {limit:.2f} USD budget"
+    if usage['exceeded']:
+        text += f"; {usage['exceeded']} calls were over budget"
+    st.caption(text + ".")
+
+def _render_profile_summary(profile: Optional[Dict[str, Any]]):
+    """Render where a profiled run spent its time, with its folded stacks for download."""
+    if not profile:
+        return
+    with st.expander(f"⏱️ Run profile ({profile['duration_s']:.1f} s, {profile['samples']} samples)"):
+        st.write("**Time per component** (summed over the run's threads)")
+        st.dataframe(profile['components'], use_container_width=True, hide_index=True)
+        st.write("**CPU hotspots**")
+        st.dataframe(profile['cpu_hotspots'], use_container_width=True, hide_index=True)
+        st.write("**Wall-clock hotspots** (including waits on I/O, subprocesses and locks)")
+        st.dataframe(profile['wall_hotspots'], use_container_width=True, hide_index=True)
+        folded_path = profile.get('folded_path')
+        if folded_path and os.path.exists(folded_path):
+            with open(folded_path, 'rb') as file:
+                st.download_button(
+                    "Download folded stacks (flamegraph.pl, speedscope)", file.read(),
+                    file_name=os.path.basename(folded_path), mime="text/plain", key="profile_download"
+                )
 
 def _render_sentiment_indicator(choice: str):
     """Render the sentiment indicator based on analysis choice."""
@@ -64,18 +154,55 @@ def _render_video_info_section(item: Dict[str, Any]):
         st.write(f"**Comments:** {item.get('comments', 'N/A')}")
         st.write(f"**[Views]({item.get('url', '#')})**")
 
-def _render_transcription_section(item: Dict[str, Any]):
-    """Render the transcription chunks section."""
+def _render_transcription_section(item: Dict[str, Any], similar: bool = True):
+    """Render the transcription chunks section, with the similar segments search unless similar is False."""
     with st.expander("🧩 Transcription Chunks"):
         st.write(item.get('transcription', 'N/A'))
+        if similar:
+            _render_similar_segments(item)
+
+def _render_similar_segments(item: Dict[str, Any]):
+    """Render the segments of other videos closest in meaning to a chosen segment of this one."""
+    from analytics.semantic_index import SEMANTIC_INDEX_ENABLED
+
+    chunks = [chunk for chunk in item.get('transcription') or [] if isinstance(chunk, dict) and chunk.get('transcription')]
+    if not SEMANTIC_INDEX_ENABLED or not chunks:
+        return
+    key = f"{item.get('platform')}_{item.get('video_id')}"
+    labels = {f"{chunk.get('segment_number')}: {chunk['transcription'].strip()[:80]}": chunk.get('segment_number') for chunk in chunks}
+    label = st.selectbox("Segment", list(labels), key=f"similar_segment_{key}")
+    if not st.button("More like this", key=f"similar_button_{key}"):
+        return
+
+    from ui.components.search_panel import get_semantic_index_or_none
+
+    index = get_semantic_index_or_none()
+    results = index.more_like_segment(item.get('platform'), item.get('video_id'), labels[label]) if index else []
+    if not results:
+        st.write("No similar segments indexed yet.")
+    for result in results:
+        render_similar_segment(result)
+
+def render_similar_segment(result: Dict[str, Any]):
+    """Render one segment returned by the semantic index, with its similarity."""
+    title = result['title'] or result['video_id']
+    link = f"[{title}]({result['url']})" if result['url'] else title
+    st.markdown(f"📹 **{link}** · {result['channel'] or 'N/A'} · similarity {result['score']:.2f}")
+    st.markdown(f"> {result['text']}")
 
 def _get_important_transcriptions(item: Dict[str, Any], main: List[int]) -> List[str]:
     """Extract important transcription chunks based on main segment numbers."""
     transcription_list = item.get('transcription', [])
+
+    # Offsets are resolved once at analysis time; older items fall back to the segment index
+    offsets = item.get('important_chunks')
+    if offsets is None:
+        segment_index = item.get('segment_index') or build_segment_index(transcription_list)
+        offsets = resolve_segment_offsets(segment_index, main)
+
     return [
         f"{round(chunk['start_time'], 1)} - {round(chunk['end_time'], 1)}: {chunk['transcription']}\n\n"
-        for chunk in transcription_list 
-        if chunk['segment_number'] in main
+        for chunk in (transcription_list[offset] for offset in offsets)
     ]
 
 def _has_fetched_data() -> bool:
@@ -0,0 +1,43 @@
+import streamlit as st
+
+def render_graph_explorer():
+    """Render the neighbourhood, top-entity and community views of the generated graph."""
+    if not st.session_state.get("graph_generated", False):
+        return
+
+    from analytics.graph_service import get_graph_index
+
+    index = get_graph_index()
+    if index is None:
+        return
+
+    with st.expander("🕸️ Explore the graph"):
+        st.caption(f"{len(index.entities)} entities, {index.relationship_count} relationships, {len(index.communities)} communities")
+
+        entity_type = st.selectbox("Entity type", ["All"] + index.entity_types(), key="graph_entity_type")
+        top = index.top_entities(limit=200, entity_type=None if entity_type == "All" else entity_type)
+        st.write("**Most connected entities**")
+        st.dataframe(
+            [{"entity": entity["title"], "type": entity.get("type"), "degree": entity["degree"]} for entity in top[:20]],
+            use_container_width=True, hide_index=True
+        )
+
+        if top:
+            name = st.selectbox("Entity", [entity["title"] for entity in top], key="graph_entity")
+            entity = index.entity(name)
+            st.write(f"**{name}** ({entity.get('type') or 'unknown type'}): {entity.get('description') or ''}")
+            st.write("**Related entities**")
+            st.dataframe(
+                [{"entity": neighbour["title"], "type": neighbour["type"], "weight": neighbour["weight"], "relationship": neighbour["description"]}
+                 for neighbour in index.neighbours(name)],
+                use_container_width=True, hide_index=True
+            )
+            for community in index.communities_of(name):
+                st.write(f"🏘️ Level {community['level']} · **{community['title']}** ({len(community['entities'])} entities)")
+
+        communities = index.top_communities(limit=50)
+        if communities:
+            titles = {f"{community['title']} (level {community['level']})": community["id"] for community in communities}
+            community = index.community(titles[st.selectbox("Community", list(titles), key="graph_community")])
+            st.write(community["summary"] or "No report available.")
+            st.caption(", ".join(community["entities"][:50]))
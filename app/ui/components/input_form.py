@@ -1,16 +1,22 @@
 import streamlit as st
+import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
+import datetime
 
 @dataclass
 class FormData:
     """Data class to hold form input values."""
     topic: str
-    platform: Optional[str]
+    platform: List[str]
     min_likes: int
     min_followers: int
     specific_words: str
     political_perspective: str
+    start_date: Optional[datetime.date] = None
+    end_date: Optional[datetime.date] = None
+    transcription_backend: Optional[str] = None
+    profile: bool = False
 
 def render_input_form() -> FormData:
     """
@@ -21,13 +27,25 @@ def render_input_form() -> FormData:
     """
     topic = st.text_input("Topic", key="topic_input")
     
-    platform = st.radio(
+    # Several platforms are fetched concurrently into one merged result
+    platform = st.multiselect(
         "Select Platforms", 
         ["TikTok", "YouTube"], 
-        index=None, 
         key="platform_select"
     )
     
+    start_date = st.date_input(
+        "Published after (YouTube, optional)",
+        value=None,
+        key="start_date_input"
+    )
+
+    end_date = st.date_input(
+        "Published before (YouTube, optional)",
+        value=None,
+        key="end_date_input"
+    )
+
     min_likes = st.number_input(
         "Min Likes", 
         min_value=0, 
@@ -52,11 +70,35 @@ def render_input_form() -> FormData:
         key="political_perspective_area"
     )
     
+    backends = ["openai", "local", "hybrid"]
+    default_backend = os.getenv('TRANSCRIPTION_BACKEND', 'openai')
+    transcription_backend = st.selectbox(
+        "Transcription",
+        backends,
+        index=backends.index(default_backend) if default_backend in backends else 0,
+        format_func=lambda name: {
+            "openai": "OpenAI API (remote)",
+            "local": "Local Whisper (CPU)",
+            "hybrid": "Hybrid (local, overflow to OpenAI)",
+        }[name],
+        key="transcription_backend_select"
+    )
+
+    profile = st.checkbox(
+        "Profile this run",
+        help="Sample where the run spends its time and show the hotspots with the results",
+        key="profile_checkbox"
+    )
+
     return FormData(
         topic=topic,
         platform=platform,
         min_likes=min_likes,
         min_followers=min_followers,
         specific_words=specific_words,
-        political_perspective=political_perspective
+        political_perspective=political_perspective,
+        start_date=start_date,
+        end_date=end_date,
+        transcription_backend=transcription_backend,
+        profile=profile
     )
\ No newline at end of file
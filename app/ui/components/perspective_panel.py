@@ -0,0 +1,67 @@
+import streamlit as st
+from typing import Any, Dict, List
+
+from utils.records import ResultSet
+from utils.utilities import get_llm_json_values
+
+def render_perspective_panel(client):
+    """
+    Render the multi-perspective analysis of the fetched data: evaluate it against
+    a list of perspectives without fetching again, and compare the stances side by side.
+
+    Args:
+        client: OpenAI client instance
+    """
+    if not _has_fetched_data():
+        return
+
+    with st.expander("⚖️ Compare perspectives"):
+        perspectives_text = st.text_area(
+            "Perspectives (one per line)",
+            key="perspectives_input"
+        )
+        perspectives = [line.strip() for line in perspectives_text.splitlines() if line.strip()]
+
+        if st.button("Analyse perspectives", key="analyse_perspectives_button"):
+            if not perspectives:
+                st.error("No perspective entered, please enter at least one.")
+            else:
+                from analytics.data_fetcher import analyse_perspectives
+
+                with st.spinner("Analyzing the fetched videos against each perspective..."):
+                    try:
+                        data_folder = st.session_state.data_folder
+                        items = analyse_perspectives(data_folder, perspectives, client)
+                        st.session_state.fetched_data = ResultSet.from_items(items, data_folder) if items else None
+                    except Exception:
+                        st.error("An error occurred while analyzing the perspectives.")
+                        return
+
+        for index, item in enumerate(st.session_state.fetched_data or [], start=1):
+            _render_perspective_comparison(item, index, perspectives)
+
+def _render_perspective_comparison(item, index: int, perspectives: List[str]):
+    """Render the stance of one video for each perspective, in columns."""
+    analyses: Dict[str, Any] = item.get('perspective_analyses') or {}
+    shown = [perspective for perspective in perspectives if perspective in analyses] or list(analyses)
+    if not shown:
+        return
+
+    st.write(f"📹 **{item.get('title') or f'Video {index}'}**")
+    for column, perspective in zip(st.columns(len(shown)), shown):
+        with column:
+            st.write(f"**{perspective}**")
+            try:
+                choice, _, analysis = get_llm_json_values(analyses[perspective]['llm_analysis'])
+            except (ValueError, AttributeError, KeyError):
+                st.info("No analysis available")
+                continue
+            st.write(f"{_stance_icon(choice)} {choice}")
+            st.caption(analysis)
+
+def _stance_icon(choice: str) -> str:
+    return {"positive": "🟢", "negative": "🔴", "neutral": "⚪"}.get(choice, "❔")
+
+def _has_fetched_data() -> bool:
+    """Check if data has been fetched."""
+    return hasattr(st.session_state, 'fetched_data') and st.session_state.fetched_data
@@ -0,0 +1,49 @@
+import streamlit as st
+
+@st.cache_resource(show_spinner=False)
+def _get_aggregator():
+    """
+    One aggregator for the whole server: aggregates are cached inside it until new analyses
+    are stored. pandas is only loaded when the report is first rendered.
+    """
+    from analytics.aggregate import AnalysisAggregator
+    return AnalysisAggregator()
+
+def render_report_display():
+    """Render aggregate stance reporting over every stored analysis."""
+    with st.expander("📈 Aggregate report"):
+        aggregator = _get_aggregator()
+        frame = aggregator.frame()
+        if frame.empty:
+            st.write("No stored analyses yet.")
+            return
+
+        perspectives = aggregator.perspectives()
+        perspective = st.selectbox("Perspective", perspectives, key="report_perspective_select") if perspectives else None
+        freq = st.selectbox(
+            "Time bucket",
+            ["D", "W", "M"],
+            index=1,
+            format_func=lambda value: {"D": "Day", "W": "Week", "M": "Month"}[value],
+            key="report_freq_select"
+        )
+
+        st.write(f"**Analysed videos:** {len(frame)}")
+
+        st.write("**Stance distribution over time**")
+        _render_chart(aggregator.stance_over_time(freq, perspective))
+
+        st.write("**Stance per channel**")
+        st.dataframe(aggregator.stance_by_channel(perspective))
+
+        st.write("**Stance per tag**")
+        st.dataframe(aggregator.stance_by_tag(perspective))
+
+        st.write("**Engagement-weighted sentiment per channel** (-1 negative, +1 positive)")
+        st.dataframe(aggregator.engagement_weighted_sentiment("channel", perspective))
+
+def _render_chart(data):
+    if data.empty:
+        st.write("None")
+    else:
+        st.bar_chart(data)
@@ -0,0 +1,89 @@
+import streamlit as st
+
+PLATFORMS = {"All": None, "YouTube": "youtube", "TikTok": "tiktok"}
+FIELDS = {"Everything": None, "Transcripts": "transcript", "Titles": "title", "Descriptions": "description", "Tags": "tags"}
+
+@st.cache_resource(show_spinner=False)
+def _get_index():
+    """The search index is opened once per server, on first use."""
+    from analytics.search_index import get_search_index
+    return get_search_index()
+
+@st.cache_resource(show_spinner=False)
+def _get_semantic_index():
+    from analytics.semantic_index import get_semantic_index
+    return get_semantic_index()
+
+def get_semantic_index_or_none():
+    """The semantic index, or None if it is disabled or its embedding model cannot be loaded."""
+    from analytics.semantic_index import SEMANTIC_INDEX_ENABLED
+    if not SEMANTIC_INDEX_ENABLED:
+        return None
+    try:
+        return _get_semantic_index()
+    except Exception as e:
+        st.warning(f"Similarity search is unavailable: {e}")
+        return None
+
+def render_search_panel():
+    """Render full-text search over the transcripts, titles, descriptions and tags of every fetched video."""
+    with st.expander("🔎 Search all transcripts"):
+        index = _get_index()
+        st.caption(f"{index.video_count()} videos indexed. Use \"quotes\" for phrases and word* for prefixes.")
+
+        query = st.text_input("Search", key="search_query")
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            platform = st.selectbox("Platform", list(PLATFORMS), key="search_platform")
+        with col2:
+            field = st.selectbox("Search in", list(FIELDS), key="search_field")
+
+        if st.button("Index stored runs", key="search_reindex_button"):
+            from analytics.search_index import index_stored_runs
+            with st.spinner("Indexing stored runs..."):
+                st.success(f"{index_stored_runs(index)} videos indexed.")
+            semantic_index = get_semantic_index_or_none()
+            if semantic_index:
+                from analytics.semantic_index import index_stored_runs as embed_stored_runs
+                with st.spinner("Embedding stored transcripts..."):
+                    st.success(f"{embed_stored_runs(semantic_index)} segments added to the similarity index.")
+
+        _render_similarity_search()
+
+        if not query:
+            return
+
+        results = index.search(query, platform=PLATFORMS[platform], field=FIELDS[field])
+        if not results:
+            st.write("No matches.")
+            return
+
+        for result in results:
+            title = result["title"] or result["video_id"]
+            if result["start_time"] is not None:
+                minutes, seconds = divmod(int(result["start_time"]), 60)
+                location = f"[{minutes:02d}:{seconds:02d}]({result['url']})" if result["url"] else f"{minutes:02d}:{seconds:02d}"
+            else:
+                location = result["field"]
+            st.markdown(f"📹 **{title}** · {result['channel'] or 'N/A'} · {location}")
+            st.markdown(f"> {result['snippet']}")
+
+def _render_similarity_search():
+    """Render search by meaning: transcript segments closest to a sentence, in any wording."""
+    from analytics.semantic_index import SEMANTIC_INDEX_ENABLED
+    if not SEMANTIC_INDEX_ENABLED:
+        return
+    text = st.text_input("Find segments making the same point", key="similarity_query")
+    if not text:
+        return
+    index = get_semantic_index_or_none()
+    if index is None:
+        return
+
+    from ui.components.data_display import render_similar_segment
+
+    results = index.more_like_text(text)
+    if not results:
+        st.write("No similar segments indexed yet.")
+    for result in results:
+        render_similar_segment(result)
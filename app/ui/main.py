@@ -2,11 +2,20 @@ import streamlit as st
 import os
 
 from utils.session import is_api_key_valid, get_api_key
-from utils.auth import get_openai_client
+from utils.auth import get_shared_openai_client
 from utils.utilities import save_txt_file
 from ui.components.input_form import render_input_form
 from ui.components.action_buttons import render_action_buttons
 from ui.components.data_display import render_data_display
+from ui.components.perspective_panel import render_perspective_panel
+from ui.components.report_display import render_report_display
+from ui.components.search_panel import render_search_panel
+from ui.components.graph_explorer import render_graph_explorer
+
+@st.cache_resource(show_spinner=False)
+def _get_client(api_key: str):
+    """One OpenAI client per API key, reused across reruns and sessions."""
+    return get_shared_openai_client(api_key)
 
 def main_display():
     """
@@ -18,7 +27,7 @@ def main_display():
         st.info("🔑 Please enter your OpenAI API Key in the sidebar to continue.")
         return
 
-    client = get_openai_client(get_api_key())
+    client = _get_client(get_api_key())
     
     form_data = render_input_form()
     
@@ -26,8 +35,16 @@ def main_display():
 
     render_action_buttons(client, form_data)
 
+    render_graph_explorer()
+
     render_data_display()
 
+    render_perspective_panel(client)
+
+    render_report_display()
+
+    render_search_panel()
+
 def _handle_cookie_upload():
     """Handle cookie file upload logic."""
     cookies_folder = os.getenv('COOKIES_FOLDER')
@@ -36,6 +53,7 @@ def _handle_cookie_upload():
     if uploaded_file:
         try:
             save_txt_file(uploaded_file, cookies_folder)
+            st.success("File successfully uploaded and saved as cookies.txt")
             st.session_state.cookie_uploaded = True
         except ValueError:
             st.error("The file is not in txt format, please try again.")
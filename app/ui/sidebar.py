@@ -1,13 +1,29 @@
 import streamlit as st
 from utils.auth import validate_openai_key
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def _check_openai_key(api_key: str) -> bool:
+    """
+    A valid key is only checked against the API once per hour, not on every click.
+    Invalid keys raise, so they are not cached and can be retried right away.
+    """
+    if not validate_openai_key(api_key):
+        raise ValueError("Invalid OpenAI API key")
+    return True
+
+def _validate_openai_key(api_key: str) -> bool:
+    try:
+        return _check_openai_key(api_key)
+    except ValueError:
+        return False
+
 def sidebar():
     with st.sidebar:
         st.header("🔐 OpenAI API Key")
         user_api_key = st.text_input("Enter your OpenAI API Key", type="password", key="openai_api_key")
 
         if st.button("Validate API Key", key="validate_api_button"):
-            if validate_openai_key(user_api_key):
+            if _validate_openai_key(user_api_key):
                 st.session_state.api_key_valid = True
                 st.success("API Key validated successfully!")
             else:
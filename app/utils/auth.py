@@ -1,5 +1,7 @@
 # auth.py
-import openai
+from functools import lru_cache
+
+# openai is imported on first use: it is one of the slowest imports of the app
 
 def validate_openai_key(api_key: str) -> bool:
     """
@@ -7,15 +9,25 @@ def validate_openai_key(api_key: str) -> bool:
     Returns True if valid, False otherwise.
     """
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = get_shared_openai_client(api_key)
         client.models.list()  # Light test
         return True
     except Exception:
         return False
 
-def get_openai_client(api_key: str) -> openai.OpenAI:
+def get_openai_client(api_key: str):
     """
     Returns a configured OpenAI client using the provided API key.
     Assumes the key is already validated.
     """
+    import openai
     return openai.OpenAI(api_key=api_key)
+
+
+@lru_cache(maxsize=None)
+def get_shared_openai_client(api_key: str):
+    """
+    Returns one OpenAI client per API key for the whole process.
+    The client is thread-safe, so concurrent jobs share its connection pool.
+    """
+    return get_openai_client(api_key)
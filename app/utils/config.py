@@ -0,0 +1,24 @@
+from dotenv import load_dotenv
+import threading
+import logging
+
+_configured = False
+_lock = threading.Lock()
+
+def configure():
+    """
+    Load the .env settings and set up the app log, once per process.
+    Every module calls it before reading its settings with os.getenv.
+    """
+    global _configured
+    with _lock:
+        if _configured:
+            return
+        load_dotenv(override=True)
+        logging.basicConfig(
+            filename="app.log",  # Log file name
+            level=logging.INFO,  # Log level (INFO or higher)
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
+        _configured = True
@@ -0,0 +1,94 @@
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.utilities import video_json_path
+
+# Fields kept in memory for every fetched video
+SUMMARY_FIELDS = (
+    "platform",
+    "video_id",
+    "title",
+    "channel",
+    "channel_id",
+    "published_at",
+    "url",
+    "views",
+    "likes",
+    "comments",
+    "shares",
+    "saves",
+    "tags",
+    "subscribers",
+    "total_videos",
+    "llm_analysis",
+    "important_chunks",
+    "perspective_analyses",
+)
+
+# Fields only read from the video's JSON file when they are accessed
+LAZY_FIELDS = ("description", "transcription", "segment_index", "chatgpt_question")
+
+@lru_cache(maxsize=8)
+def _load_stored_item(file_path: str, mtime: float) -> Dict[str, Any]:
+    """Load a stored video JSON file. The mtime is part of the cache key so rewrites are picked up."""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+class VideoSummary:
+    """
+    Compact in-session view of a fetched video.
+
+    Only the summary fields are held in memory; transcripts, descriptions and
+    prompts are lazy handles into the video's JSON file on disk.
+    Supports the dict-style `get` used by the display components.
+    """
+    __slots__ = SUMMARY_FIELDS + ("file_path",)
+
+    def __init__(self, item: Dict[str, Any], file_path: Optional[str]):
+        for field in SUMMARY_FIELDS:
+            if field in item:
+                setattr(self, field, item[field])
+        self.file_path = file_path
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in SUMMARY_FIELDS:
+            return getattr(self, key, default)
+        if key in LAZY_FIELDS:
+            return self._load().get(key, default)
+        return default
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.file_path or not os.path.exists(self.file_path):
+            return {}
+        return _load_stored_item(self.file_path, os.path.getmtime(self.file_path))
+
+class ResultSet:
+    """Sequence of VideoSummary records held in st.session_state.fetched_data."""
+    __slots__ = ("records", "data_folder")
+
+    def __init__(self, records: List[VideoSummary], data_folder: Optional[str]):
+        self.records = records
+        self.data_folder = data_folder
+
+    @classmethod
+    def from_items(cls, items: List[Dict[str, Any]], data_folder: Optional[str]) -> "ResultSet":
+        """
+        Build a result set from full fetched items stored as <video_id>.json inside data_folder
+        (or inside the <platform>Data folders of a multi-platform run folder).
+        """
+        records = []
+        for item in items:
+            file_path = video_json_path(data_folder, item) if data_folder else None
+            records.append(VideoSummary(item, file_path))
+        return cls(records, data_folder)
+
+    def __iter__(self) -> Iterator[VideoSummary]:
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> VideoSummary:
+        return self.records[index]
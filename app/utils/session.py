@@ -9,6 +9,18 @@ def initialize_session_state():
     if 'fetched_data' not in st.session_state:
         st.session_state.fetched_data = None
     
+    if 'dedup_report' not in st.session_state:
+        st.session_state.dedup_report = None
+
+    if 'quarantined' not in st.session_state:
+        st.session_state.quarantined = {}
+
+    if 'usage' not in st.session_state:
+        st.session_state.usage = None
+
+    if 'profile' not in st.session_state:
+        st.session_state.profile = None
+
     if 'data_folder' not in st.session_state:
         st.session_state.data_folder = None
     
@@ -39,6 +51,10 @@ def initialize_session_state():
 def reset_data_states():
     """Reset data-related states when starting a new fetch."""
     st.session_state.fetched_data = None
+    st.session_state.dedup_report = None
+    st.session_state.quarantined = {}
+    st.session_state.usage = None
+    st.session_state.profile = None
     st.session_state.graph_generated = False
 
 def is_api_key_valid():
@@ -1,26 +1,25 @@
-from dotenv import load_dotenv
-import streamlit as st
 import datetime
 import logging
 import time
 import json
 import os
-from openai import OpenAI
 import subprocess
 import shutil
 import csv
+import glob
+import uuid
+from utils.config import configure
 
-# LOGGING
-logging.basicConfig(
-    filename="app.log",  # Log file name
-    level=logging.INFO,  # Log level (INFO or higher)
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+configure()
 
-load_dotenv(override=True)
 OPENAI_KEY = os.getenv('OPENAI_KEY')
 RAG_FOLDER = os.getenv('RAG_FOLDER')
+RUNS_FOLDER = os.getenv('RUNS_FOLDER', './data/runs')
+RUN_RETENTION_HOURS = float(os.getenv('RUN_RETENTION_HOURS', 24))
+
+def is_debug_mode() -> bool:
+    """Debug mode keeps diagnostic fields (e.g. the full LLM prompt) in persisted records."""
+    return os.getenv('DEBUG_MODE', 'false').lower() in ('1', 'true', 'yes')
 
 def set_up_graphrag():
     # initialize RAG
@@ -65,14 +64,26 @@ def load_json_data(directory):
                     item = json.load(file)
                     data.append(item)
             except Exception as e:
-                st.error(f"Error loading {filename}: {str(e)}")
+                logging.error(f"Error loading {filename}: {str(e)}")
     
     return data
 
+# Incremented whenever this process rewrites stored video records, so readers of the
+# stored records (e.g. analytics.aggregate) know when to reload them
+_records_generation = 0
+
+def mark_records_changed():
+    global _records_generation
+    _records_generation += 1
+
+def records_generation():
+    return _records_generation
+
 def update_json_files(data, directory):
     """
     Update JSON files with LLM analysis
     """
+    mark_records_changed()
     for item in data:
         video_id = item.get("video_id", "unknown")
         file_path = os.path.join(directory, f"{video_id}.json")
@@ -82,7 +93,7 @@ def update_json_files(data, directory):
                 with open(file_path, 'w', encoding='utf-8') as file:
                     json.dump(item, file, indent=4, ensure_ascii=False)
             except Exception as e:
-                st.error(f"Error updating {file_path}: {str(e)}")
+                logging.error(f"Error updating {file_path}: {str(e)}")
 
 def get_llm_json_values(llm_output):
     # Parse the JSON
@@ -95,6 +106,25 @@ def get_llm_json_values(llm_output):
 
     return choice, main, analysis
 
+def build_segment_index(transcription):
+    """
+    Map each segment number to its offset in the transcription list.
+    Keys are strings so the index survives a JSON round trip unchanged.
+    """
+    return {str(chunk["segment_number"]): offset for offset, chunk in enumerate(transcription)}
+
+def resolve_segment_offsets(segment_index, segment_numbers):
+    """
+    Resolve segment numbers (e.g. the LLM "main" list) to transcription offsets.
+    Unknown segment numbers are skipped.
+    """
+    offsets = []
+    for number in segment_numbers or []:
+        offset = segment_index.get(str(number))
+        if offset is not None:
+            offsets.append(offset)
+    return offsets
+
 def ensure_folder_exists(folder_path):
     """Check if a folder exists; if not, create it."""
     if not os.path.exists(folder_path):
@@ -117,6 +147,54 @@ def delete_files(folder):
 
     logging.info(f"Initialization of {folder} complete")
 
+def create_run_folder(runs_folder=RUNS_FOLDER):
+    """Create an isolated working folder for a single fetch run and return its path."""
+    run_id = f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    run_folder = os.path.join(runs_folder, run_id)
+    ensure_folder_exists(run_folder)
+    return run_folder
+
+def prune_run_folders(runs_folder=RUNS_FOLDER, max_age_hours=RUN_RETENTION_HOURS, only=None):
+    """
+    Delete run folders older than max_age_hours.
+    If only is given, the other run folders are kept whatever their age.
+    """
+    if not os.path.exists(runs_folder):
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    allowed = None if only is None else {os.path.normpath(folder) for folder in only}
+    for name in os.listdir(runs_folder):
+        run_folder = os.path.join(runs_folder, name)
+        if allowed is not None and os.path.normpath(run_folder) not in allowed:
+            continue
+        if os.path.isdir(run_folder) and os.path.getmtime(run_folder) < cutoff:
+            shutil.rmtree(run_folder, ignore_errors=True)
+            logging.info(f"Pruned expired run folder {run_folder}")
+
+def is_platform_data_folder(folder):
+    """True for a <platform>Data folder of a run, False for a (multi-platform) run folder."""
+    return os.path.basename(os.path.normpath(folder)).endswith("Data")
+
+def data_folders(folder):
+    """
+    Folders holding the video JSON files of a fetch result: the platform data folder
+    itself, or the <platform>Data folders of a multi-platform run folder.
+    """
+    if is_platform_data_folder(folder):
+        return [folder]
+    return sorted(path for path in glob.glob(os.path.join(folder, "*Data")) if os.path.isdir(path))
+
+def video_json_path(folder, item):
+    """Path of a video's JSON file in a platform data folder or a multi-platform run folder."""
+    filename = f"{item.get('video_id', 'unknown')}.json"
+    if is_platform_data_folder(folder):
+        return os.path.join(folder, filename)
+    return os.path.join(folder, f"{item.get('platform', 'unknown')}Data", filename)
+
+def run_folder_of(folder):
+    """Run folder of a fetch result's data folder."""
+    return os.path.dirname(os.path.normpath(folder)) if is_platform_data_folder(folder) else folder
+
 def save_txt_file(uploaded_file, save_path):
     """Save the uploaded file to save_path if it's a valid .txt file."""
     try:
@@ -126,7 +204,6 @@ def save_txt_file(uploaded_file, save_path):
             if uploaded_file.name.endswith(".txt"):  # Check if it's a txt file
                 with open(save_path, "wb") as f:
                     f.write(uploaded_file.getbuffer())  # Save file content
-                st.success("File successfully uploaded and saved as cookies.txt")
             else:
                 raise ValueError("Invalid file format. Please upload a .txt file.")
     except ValueError as e:
@@ -180,7 +257,8 @@ def fetch_graphrag(source_folder, destination_folder):
     ensure_folder_exists(os.path.join(RAG_FOLDER, "output"))
     set_up_graphrag()
 
-    process_json_to_txt(source_folder, destination_folder)
+    for folder in data_folders(source_folder):
+        process_json_to_txt(folder, destination_folder)
     logging.info("Make of txt completed. Start indexing graphrag.")
     command = ["graphrag", "index", "--root", RAG_FOLDER] 
     result = subprocess.run(command, capture_output=True, text=True)